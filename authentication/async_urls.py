@@ -0,0 +1,10 @@
+from django.urls import path
+from .async_views import AsyncLoginView, AsyncTokenRefreshView, AsyncUserInfoView
+
+app_name = 'authentication_async'
+
+urlpatterns = [
+    path('login/', AsyncLoginView.as_view(), name='login'),
+    path('token/refresh/', AsyncTokenRefreshView.as_view(), name='token_refresh'),
+    path('user-info/', AsyncUserInfoView.as_view(), name='user_info'),
+]
@@ -0,0 +1,225 @@
+"""
+Async views for the hottest authentication endpoints.
+
+Served under ``/api/async/`` for deployments running ASGI (e.g. uvicorn),
+where they are awaited on the event loop instead of being handed to a
+worker thread per request. Responses match their synchronous
+counterparts.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, permissions
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import StatelessJWTAuthentication
+from .cache import token_versions, user_cache
+from .hashing import amake_password, averify_password
+from .models import User
+from .revocation import revocation_list
+from .serializers import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer
+from .throttling import CREDENTIAL_THROTTLES, afirst_rejection
+from .tokens import RefreshToken
+from .views import UserInfoView
+
+
+class AsyncAPIView(View):
+    """
+    A small async counterpart of DRF's APIView.
+
+    Authenticates with the stateless JWT claims (the database is only
+    touched, off-loop, for tokens issued without them), applies the usual
+    DRF permission classes and renders JSON with DRF's renderer. API
+    exceptions become the same ``{"detail": ...}`` responses DRF returns.
+    """
+    authentication_class = StatelessJWTAuthentication
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = []
+    filter_backends = []
+    queryset = None
+    renderer = JSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token authenticated like DRF views, so no CSRF cookie is involved
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Filter backends and view mixins read DRF's query_params
+        request.query_params = request.GET
+        try:
+            request.user = await self.authenticate(request)
+            self.check_permissions(request)
+            await self.check_throttles(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(request, exc)
+
+    async def authenticate(self, request):
+        if self.authentication_class is None:
+            return AnonymousUser()
+        authenticator = self.authentication_class()
+        header = authenticator.get_header(request)
+        raw_token = authenticator.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            return AnonymousUser()
+        validated_token = authenticator.decode_token(raw_token)
+        if await revocation_list.ais_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise authenticator.revoked()
+        if not authenticator.has_user_claims(validated_token):
+            return await sync_to_async(authenticator.get_user)(validated_token)
+        user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        return authenticator.get_claims_user(validated_token, await token_versions.aget(user_id))
+
+    def check_permissions(self, request):
+        for permission in [permission() for permission in self.permission_classes]:
+            if not permission.has_permission(request, self):
+                if not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    async def check_throttles(self, request):
+        throttle = await afirst_rejection([throttle() for throttle in self.throttle_classes], request, self)
+        if throttle is not None:
+            raise exceptions.Throttled(throttle.wait())
+
+    def handle_exception(self, request, exc):
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+        response = self.render(data, status=exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            if self.authentication_class is not None:
+                response['WWW-Authenticate'] = self.authentication_class().authenticate_header(request)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = '%d' % exc.wait
+        return response
+
+    def render(self, data, status=200):
+        return HttpResponse(
+            self.renderer.render(data), status=status, content_type='application/json'
+        )
+
+    @staticmethod
+    def parse_body(request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError as exc:
+            raise exceptions.ParseError(f'JSON parse error - {exc}')
+        if not isinstance(data, dict):
+            raise exceptions.ParseError('Expected a JSON object.')
+        return data
+
+    @staticmethod
+    def require(data, *fields):
+        """Raise the DRF validation error for missing fields"""
+        missing = {field: ['This field is required.'] for field in fields if not data.get(field)}
+        if missing:
+            raise exceptions.ValidationError(missing)
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    async def afilter_queryset(self, queryset):
+        for backend in [backend() for backend in self.filter_backends]:
+            if hasattr(backend, 'afilter_queryset'):
+                queryset = await backend.afilter_queryset(self.request, queryset, self)
+            else:
+                queryset = backend.filter_queryset(self.request, queryset, self)
+        return queryset
+
+
+class AsyncLoginView(AsyncAPIView):
+    """
+    Async login: same request and response as ``/api/auth/login/``, with
+    the password verified in the hashing pool
+    """
+    authentication_class = None
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = CREDENTIAL_THROTTLES
+    throttle_scope = 'login'
+    throttle_hash_cost = 1
+
+    async def post(self, request):
+        data = self.parse_body(request)
+        self.require(data, User.USERNAME_FIELD, 'password')
+
+        user = await User._default_manager.filter(
+            **{User.USERNAME_FIELD: data[User.USERNAME_FIELD]}
+        ).afirst()
+        if user is None:
+            # Spend the same hashing time as a wrong password would
+            await amake_password(data['password'])
+        elif (
+            await averify_password(user, data['password'])
+            and api_settings.USER_AUTHENTICATION_RULE(user)
+        ):
+            await token_versions.aprime(user)
+            refresh = CustomTokenObtainPairSerializer.claims_token(user)
+            if api_settings.UPDATE_LAST_LOGIN:
+                await User._default_manager.filter(pk=user.pk).aupdate(last_login=timezone.now())
+            return self.render({
+                'refresh': str(refresh),
+                'access': str(refresh.access_token),
+                'user': CustomTokenObtainPairSerializer.user_data(user),
+            })
+
+        raise exceptions.AuthenticationFailed(
+            TokenObtainSerializer.default_error_messages['no_active_account'],
+            'no_active_account',
+        )
+
+
+class AsyncTokenRefreshView(AsyncAPIView):
+    """
+    Async token refresh: same request and response as
+    ``/api/auth/token/refresh/``, reading the user through the user cache
+    """
+    authentication_class = None
+    permission_classes = [permissions.AllowAny]
+
+    async def post(self, request):
+        data = self.parse_body(request)
+        self.require(data, 'refresh')
+        try:
+            refresh = RefreshToken(data['refresh'])
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+        if await revocation_list.ais_revoked(refresh.get(api_settings.JTI_CLAIM)):
+            raise StatelessJWTAuthentication.revoked()
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id:
+            user_id = User._meta.pk.to_python(user_id)
+            version = await token_versions.aget(user_id)
+            user = await user_cache.aget(user_id, version) if version is not None else None
+            CustomTokenRefreshSerializer.check_user(refresh, user, version)
+
+        response = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not await sync_to_async(revocation_list.revoke)(refresh):
+                raise StatelessJWTAuthentication.revoked()
+            CustomTokenRefreshSerializer.rotate(refresh)
+            response['refresh'] = str(refresh)
+        return self.render(response)
+
+
+class AsyncUserInfoView(AsyncAPIView):
+    """
+    Async ``/api/auth/user-info/``
+    """
+
+    async def get(self, request):
+        user = await user_cache.aget(request.user.pk, request.user.token_version)
+        if user is None:
+            raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+        return self.render(UserInfoView.user_info(user))
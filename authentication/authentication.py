@@ -0,0 +1,172 @@
+"""
+Authentication backends for the API
+"""
+from django.utils.functional import LazyObject, empty
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import token_versions, user_cache
+from .models import User
+from .revocation import revocation_list
+# Shared with the offline verifier used by other services
+from .verifier import IS_ACTIVE_CLAIM, ROLE_CLAIM, TOKEN_VERSION_CLAIM
+
+
+def add_user_claims(token, user):
+    """
+    Embed the claims needed to authorize a request without loading the user
+    """
+    token[ROLE_CLAIM] = user.role
+    token[IS_ACTIVE_CLAIM] = user.is_active
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+class TokenBackedUser(LazyObject):
+    """
+    User built from access token claims.
+
+    `id`, `role`, `is_active` and the role helpers used by the permission
+    classes are answered from the token. Any other attribute access resolves
+    the full User through the user cache once and proxies to it from then on.
+    """
+
+    def __init__(self, validated_token):
+        self.__dict__['_token'] = validated_token
+        super().__init__()
+
+    def _setup(self):
+        user = user_cache.get(self.pk, self.token_version)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        self._wrapped = user
+
+    def _claim(self, name, claim):
+        if self._wrapped is not empty:
+            return getattr(self._wrapped, name)
+        return self.__dict__['_token'][claim]
+
+    @property
+    def pk(self):
+        # simplejwt stores the id claim as a string
+        return User._meta.pk.to_python(self._claim('pk', api_settings.USER_ID_CLAIM))
+
+    id = pk
+
+    @property
+    def role(self):
+        return self._claim('role', ROLE_CLAIM)
+
+    @property
+    def is_active(self):
+        return self._claim('is_active', IS_ACTIVE_CLAIM)
+
+    @property
+    def token_version(self):
+        return self._claim('token_version', TOKEN_VERSION_CLAIM)
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_moderator(self):
+        return self.role == 'moderator'
+
+    @property
+    def is_regular_user(self):
+        return self.role == 'user'
+
+    @property
+    def is_loaded(self):
+        """Whether the full User row has been fetched"""
+        return self._wrapped is not empty
+
+    def __bool__(self):
+        return True
+
+    def __eq__(self, other):
+        if isinstance(other, TokenBackedUser):
+            return self.pk == other.pk
+        if isinstance(other, User):
+            return other.pk is not None and self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __repr__(self):
+        if self._wrapped is empty:
+            return f"<TokenBackedUser: {self.pk} ({self.role})>"
+        return f"<TokenBackedUser: {self._wrapped!r}>"
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the user claims embedded at login.
+
+    Tokens issued before the claims were added fall back to the regular
+    database lookup. Revoked tokens are rejected (see
+    authentication.revocation).
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = self.decode_token(raw_token)
+        if revocation_list.is_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise self.revoked()
+        return validated_token
+
+    def decode_token(self, raw_token):
+        """Verify the signature and claims, without the revocation check"""
+        return super().get_validated_token(raw_token)
+
+    @staticmethod
+    def revoked():
+        return InvalidToken({
+            'detail': _('Token has been revoked'),
+            'code': 'token_revoked',
+        })
+
+    @staticmethod
+    def has_user_claims(validated_token):
+        """Whether the token carries the claims needed to skip the user lookup"""
+        return ROLE_CLAIM in validated_token and api_settings.USER_ID_CLAIM in validated_token
+
+    def get_user(self, validated_token):
+        if not self.has_user_claims(validated_token):
+            user = super().get_user(validated_token)
+            self.check_token_version(validated_token, user.token_version)
+            return user
+
+        user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        return self.get_claims_user(validated_token, token_versions.get(user_id))
+
+    def get_claims_user(self, validated_token, current_version):
+        """
+        The user of a token carrying the user claims, given the user's
+        current token version (None if the user no longer exists)
+        """
+        if current_version is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        self.check_token_version(validated_token, current_version)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not validated_token.get(IS_ACTIVE_CLAIM, True):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return TokenBackedUser(validated_token)
+
+    @classmethod
+    def check_token_version(cls, validated_token, current_version):
+        """Reject tokens issued before the user's last password change or deactivation"""
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) != current_version:
+            raise cls.revoked()
@@ -0,0 +1,259 @@
+"""
+Caching helpers for the authentication app
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from .models import User
+
+STATS_CACHE_DEFAULTS = {
+    'TTL': 30,
+    'CACHE_ALIAS': 'default',
+}
+
+USER_CACHE_DEFAULTS = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 300,
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'auth:user',
+    'VERSION_TTL': 300,
+}
+
+
+class UserCache:
+    """
+    Two-tier cache of resolved users.
+
+    The first tier is a bounded in-process LRU with a TTL, the second is the
+    Django cache named by ``USER_CACHE['CACHE_ALIAS']`` so that processes
+    share fetched rows. Entries are keyed by user id and remember the token
+    version they were loaded with; a lookup for a different version is a
+    miss. Callers always receive their own copy of the cached instance.
+    """
+
+    def __init__(self, **options):
+        self._options = options
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ['local_hits', 'shared_hits', 'misses', 'invalidations'], 0
+        )
+
+    def _setting(self, name):
+        if name in self._options:
+            return self._options[name]
+        return getattr(settings, 'USER_CACHE', {}).get(name, USER_CACHE_DEFAULTS[name])
+
+    @property
+    def shared(self):
+        return caches[self._setting('CACHE_ALIAS')]
+
+    def _key(self, user_id):
+        return f"{self._setting('KEY_PREFIX')}:{user_id}"
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _get_local(self, user_id, token_version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            version, user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            if token_version is not None and version != token_version:
+                return None
+            self._entries.move_to_end(user_id)
+            self._counters['local_hits'] += 1
+            return user
+
+    def _set_local(self, user):
+        expires_at = time.monotonic() + self._setting('TTL')
+        with self._lock:
+            self._entries[user.pk] = (user.token_version, user, expires_at)
+            self._entries.move_to_end(user.pk)
+            while len(self._entries) > self._setting('MAX_ENTRIES'):
+                self._entries.popitem(last=False)
+
+    def get(self, user_id, token_version=None):
+        """
+        Return a copy of the user with the given id, or None if it does not exist.
+
+        When ``token_version`` is given, cached entries loaded for another
+        version are ignored and the row is fetched again.
+        """
+        user = self._get_local(user_id, token_version)
+        if user is not None:
+            return copy.copy(user)
+
+        entry = self.shared.get(self._key(user_id))
+        if entry is not None and (token_version is None or entry[0] == token_version):
+            self._count('shared_hits')
+            user = entry[1]
+        else:
+            self._count('misses')
+            user = User.objects.filter(pk=user_id).first()
+            if user is None:
+                return None
+            self.shared.set(self._key(user_id), (user.token_version, user), self._setting('TTL'))
+
+        self._set_local(user)
+        return copy.copy(user)
+
+    async def aget(self, user_id, token_version=None):
+        """Async ``get``: the shared tier and the database are awaited"""
+        user = self._get_local(user_id, token_version)
+        if user is not None:
+            return copy.copy(user)
+
+        entry = await self.shared.aget(self._key(user_id))
+        if entry is not None and (token_version is None or entry[0] == token_version):
+            self._count('shared_hits')
+            user = entry[1]
+        else:
+            self._count('misses')
+            user = await User.objects.filter(pk=user_id).afirst()
+            if user is None:
+                return None
+            await self.shared.aset(self._key(user_id), (user.token_version, user), self._setting('TTL'))
+
+        self._set_local(user)
+        return copy.copy(user)
+
+    def invalidate(self, user_id):
+        """Drop the user from both tiers"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._counters['invalidations'] += 1
+        self.shared.delete(self._key(user_id))
+
+    async def ainvalidate(self, user_id):
+        """Async ``invalidate``"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._counters['invalidations'] += 1
+        await self.shared.adelete(self._key(user_id))
+
+    def clear(self):
+        """Drop every locally cached user and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        with self._lock:
+            stats = dict(self._counters, size=len(self._entries))
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = (
+            (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        )
+        return stats
+
+
+user_cache = UserCache()
+
+
+class TokenVersionMap:
+    """
+    Current ``token_version`` of each user, kept in the user cache's Django
+    cache so that checking a token is a single cache lookup.
+
+    Bumping the version is one row update and makes every token issued
+    before it invalid (see StatelessJWTAuthentication). Entries expire
+    after ``USER_CACHE['VERSION_TTL']`` seconds, which bounds how long a
+    process with its own local-memory cache can miss a bump made by
+    another.
+    """
+
+    def _key(self, user_id):
+        return f"{user_cache._setting('KEY_PREFIX')}:version:{user_id}"
+
+    def _fetch(self, user_id):
+        return User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+
+    def get(self, user_id):
+        """The user's token version, or None if the user does not exist"""
+        version = user_cache.shared.get(self._key(user_id))
+        if version is None:
+            version = self._fetch(user_id)
+            if version is not None:
+                user_cache.shared.set(self._key(user_id), version, user_cache._setting('VERSION_TTL'))
+        return version
+
+    async def aget(self, user_id):
+        """Async ``get``; only misses leave the event loop"""
+        version = await user_cache.shared.aget(self._key(user_id))
+        if version is None:
+            version = await sync_to_async(self._fetch)(user_id)
+            if version is not None:
+                await user_cache.shared.aset(self._key(user_id), version, user_cache._setting('VERSION_TTL'))
+        return version
+
+    def prime(self, user):
+        """Record the version of a freshly loaded user, unless one is cached"""
+        user_cache.shared.add(self._key(user.pk), user.token_version, user_cache._setting('VERSION_TTL'))
+
+    async def aprime(self, user):
+        """Async ``prime``"""
+        await user_cache.shared.aadd(self._key(user.pk), user.token_version, user_cache._setting('VERSION_TTL'))
+
+    def bump(self, user_id):
+        """Invalidate every token issued to the user so far; returns the new version"""
+        User.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
+        version = self._fetch(user_id)
+        user_cache.invalidate(user_id)
+        user_cache.shared.set(self._key(user_id), version, user_cache._setting('VERSION_TTL'))
+        return version
+
+    def invalidate(self, user_id):
+        user_cache.shared.delete(self._key(user_id))
+
+
+token_versions = TokenVersionMap()
+
+
+def _stats_setting(name):
+    return getattr(settings, 'STATS_CACHE', {}).get(name, STATS_CACHE_DEFAULTS[name])
+
+
+def cached_snapshot(key, compute):
+    """
+    Return the cached result of ``compute()`` for ``key``, computing and
+    storing it for ``STATS_CACHE['TTL']`` seconds on a miss
+    """
+    cache = caches[_stats_setting('CACHE_ALIAS')]
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = compute()
+        cache.set(key, snapshot, _stats_setting('TTL'))
+    return snapshot
+
+
+async def acached_snapshot(key, compute):
+    """
+    Async ``cached_snapshot``: hits are read from the cache without leaving
+    the event loop, misses run ``compute()`` in a worker thread
+    """
+    cache = caches[_stats_setting('CACHE_ALIAS')]
+    snapshot = await cache.aget(key)
+    if snapshot is None:
+        snapshot = await sync_to_async(compute)()
+        await cache.aset(key, snapshot, _stats_setting('TTL'))
+    return snapshot
+
+
+def invalidate_snapshots(*keys):
+    """Drop cached snapshots so the next read recomputes them"""
+    caches[_stats_setting('CACHE_ALIAS')].delete_many(keys)
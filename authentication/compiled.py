@@ -0,0 +1,114 @@
+"""
+Compiled read-only serialization for list endpoints
+"""
+from functools import cached_property
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .metrics import serializer_timer
+
+
+class CompiledSerializer:
+    """
+    Read-only fast path for a ModelSerializer used on list endpoints.
+
+    The serializer's fields are inspected once and turned into a list of
+    ``values()`` lookups plus one accessor per output field, so rows are
+    read as dicts and converted without building model instances or
+    running DRF's per-field machinery. Plain values are copied as is; only
+    fields whose representation differs from the database value (decimals,
+    dates) go through the DRF field's ``to_representation``.
+
+    Fields backed by model properties have no column to read and must be
+    given in ``computed`` as ``name: (lookups, function(row))``.
+    """
+    passthrough_fields = (
+        serializers.CharField,
+        serializers.IntegerField,
+        serializers.BooleanField,
+        serializers.ChoiceField,
+        serializers.ReadOnlyField,
+    )
+
+    def __init__(self, serializer_class, computed=None):
+        self.serializer_class = serializer_class
+        self.computed = computed or {}
+
+    @cached_property
+    def _compiled(self):
+        lookups = []
+        accessors = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in self.computed:
+                dependencies, function = self.computed[name]
+                lookups.extend(dependencies)
+                accessors.append((name, function))
+                continue
+            if isinstance(field, (serializers.SerializerMethodField, serializers.Serializer)):
+                raise ImproperlyConfigured(
+                    f'{self.serializer_class.__name__}.{name} cannot be compiled; '
+                    f'provide it in `computed`.'
+                )
+            lookup = '__'.join(field.source_attrs)
+            lookups.append(lookup)
+            accessors.append((name, self.accessor(lookup, field)))
+        return list(dict.fromkeys(lookups)), accessors
+
+    @property
+    def lookups(self):
+        return self._compiled[0]
+
+    def accessor(self, lookup, field):
+        if isinstance(field, self.passthrough_fields):
+            return itemgetter(lookup)
+        to_representation = field.to_representation
+
+        def convert(row):
+            value = row[lookup]
+            return None if value is None else to_representation(value)
+        return convert
+
+    def values(self, queryset, extra=()):
+        """``queryset`` as dict rows carrying every lookup plus ``extra``"""
+        return queryset.values(*dict.fromkeys([*self.lookups, *extra]))
+
+    def to_representation(self, row):
+        return {name: accessor(row) for name, accessor in self._compiled[1]}
+
+    def serialize(self, rows):
+        to_representation = self.to_representation
+        with serializer_timer():
+            return [to_representation(row) for row in rows]
+
+
+class CompiledListMixin:
+    """
+    Serves ``list()`` through ``compiled_serializer`` instead of the
+    regular serializer class, keeping filtering and pagination intact
+    """
+    compiled_serializer = None
+
+    @staticmethod
+    def ordering_lookups(queryset):
+        """Fields the rows must carry for keyset pagination positions"""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return [
+            'id' if field.lstrip('-') == 'pk' else field.lstrip('-')
+            for field in ordering if isinstance(field, str)
+        ]
+
+    def list(self, request, *args, **kwargs):
+        if self.compiled_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.compiled_serializer.values(queryset, ['id', *self.ordering_lookups(queryset)])
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.compiled_serializer.serialize(page))
+        return Response(self.compiled_serializer.serialize(rows))
@@ -0,0 +1,159 @@
+"""
+Incrementally maintained counters backing the statistics endpoints.
+
+Each app registers a counter source: a key prefix plus a function that
+computes the exact values of its counters from the database. Writes keep
+the stored values current by applying deltas with ``F()`` expressions;
+the sources are only used to rebuild or verify the table.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Counter
+from .query_patterns import repeated_queries_expected
+from .stored_state import UNCHANGED, stored_state
+
+_sources = {}
+
+def register_source(prefix, compute):
+    """
+    Register ``compute()`` as the source of truth for counters under ``prefix``
+    """
+    _sources[prefix] = compute
+
+
+def get_deltas(contribute, old, new):
+    """
+    Return the counter changes caused by a row moving from ``old`` to ``new``.
+
+    ``contribute(state)`` maps a row state to the counters it adds to; a
+    ``None`` state (row missing before a create or after a delete)
+    contributes nothing.
+    """
+    deltas = defaultdict(Decimal)
+    if new is not None:
+        for key, value in contribute(new).items():
+            deltas[key] += Decimal(value)
+    if old is not None:
+        for key, value in contribute(old).items():
+            deltas[key] -= Decimal(value)
+    return {key: value for key, value in deltas.items() if value}
+
+
+def row_state(instance, fields):
+    """Current values of the counted fields of ``instance``"""
+    return {field: getattr(instance, field) for field in fields}
+
+
+def apply_saved_state(instance, fields, contribute, update_fields=None):
+    """
+    Apply the counter deltas of a save (post_save); ``fields`` must be
+    tracked with ``stored_state.track_fields``
+    """
+    previous = stored_state(instance, fields, update_fields)
+    if previous is UNCHANGED:
+        return
+    apply_deltas(get_deltas(contribute, previous, row_state(instance, fields)))
+
+
+def apply_deleted_state(instance, fields, contribute):
+    """Apply the counter deltas of a delete (post_delete)"""
+    apply_deltas(get_deltas(contribute, row_state(instance, fields), None))
+
+
+def merge_deltas(*all_deltas):
+    """Sum several delta dicts into one"""
+    merged = defaultdict(Decimal)
+    for deltas in all_deltas:
+        for key, value in deltas.items():
+            merged[key] += value
+    return {key: value for key, value in merged.items() if value}
+
+
+def apply_deltas(deltas):
+    """
+    Add ``deltas`` to the stored counters in a single transaction
+    """
+    if not deltas:
+        return
+    now = timezone.now()
+    with transaction.atomic(), repeated_queries_expected():
+        # A fixed order keeps concurrent writers from deadlocking on row locks
+        for key in sorted(deltas):
+            changes = {'value': F('value') + deltas[key], 'updated_at': now}
+            if not Counter.objects.filter(key=key).update(**changes):
+                Counter.objects.get_or_create(key=key)
+                Counter.objects.filter(key=key).update(**changes)
+
+
+def read_counters(keys):
+    """Return the stored values for ``keys``, defaulting to zero"""
+    values = dict(Counter.objects.filter(key__in=keys).values_list('key', 'value'))
+    return {key: values.get(key, Decimal(0)) for key in keys}
+
+
+def bump_version(key):
+    """
+    Increment the version counter ``key``; its ``updated_at`` records when
+    the versioned data last changed
+    """
+    apply_deltas({key: Decimal(1)})
+
+
+def read_version(key):
+    """Return ``(version, last_modified)`` for ``key``, ``(0, None)`` if never bumped"""
+    row = Counter.objects.filter(key=key).values_list('value', 'updated_at').first()
+    if row is None:
+        return 0, None
+    return int(row[0]), row[1]
+
+
+def compute_counters(prefixes=None):
+    """Compute the exact value of every registered counter (or of ``prefixes``)"""
+    expected = {}
+    for prefix, compute in _sources.items():
+        if prefixes is None or prefix in prefixes:
+            expected.update(compute())
+    # Rounded to the stored precision: SQLite sums decimals as floats
+    cents = Decimal('0.01')
+    return {key: Decimal(value).quantize(cents) for key, value in expected.items()}
+
+
+def verify_counters():
+    """
+    Compare stored counters against their sources.
+
+    Returns ``{key: (stored, expected)}`` for every counter that drifted.
+    Missing keys count as zero on either side.
+    """
+    expected = compute_counters()
+    stored = {}
+    for prefix in _sources:
+        stored.update(Counter.objects.filter(key__startswith=prefix).values_list('key', 'value'))
+    drift = {}
+    for key in expected.keys() | stored.keys():
+        stored_value = stored.get(key, Decimal(0))
+        expected_value = expected.get(key, Decimal(0))
+        if stored_value != expected_value:
+            drift[key] = (stored_value, expected_value)
+    return drift
+
+
+def rebuild_counters(prefixes=None):
+    """
+    Replace every registered counter (or those under ``prefixes``) with its
+    freshly computed value
+    """
+    expected = compute_counters(prefixes)
+    with transaction.atomic():
+        for prefix in _sources:
+            if prefixes is None or prefix in prefixes:
+                Counter.objects.filter(key__startswith=prefix).delete()
+        Counter.objects.bulk_create(
+            Counter(key=key, value=value) for key, value in sorted(expected.items())
+        )
+    return expected
@@ -0,0 +1,114 @@
+"""
+Password hashing: tunable hashers and an off-loop worker pool.
+
+``PASSWORD_HASHERS`` lists the hashers below with the preferred one first
+(``PASSWORD_HASHER`` environment variable). Passwords stored with any other
+listed hasher, or with different cost settings, still verify and are
+rehashed with the preferred hasher on the next successful login.
+
+Hashing is CPU bound; async code runs it through ``run_in_pool`` so the
+event loop keeps serving other requests. The pool is bounded by
+``PASSWORD_HASHING['MAX_WORKERS']`` (default: one thread per CPU).
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from .cache import user_cache
+
+PASSWORD_HASHING_DEFAULTS = {
+    'MAX_WORKERS': None,
+    'PBKDF2_ITERATIONS': None,
+    'SCRYPT_WORK_FACTOR': None,
+    'ARGON2_TIME_COST': None,
+    'ARGON2_MEMORY_COST': None,
+}
+
+
+def _setting(name):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, PASSWORD_HASHING_DEFAULTS[name])
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with ``PASSWORD_HASHING['PBKDF2_ITERATIONS']``"""
+
+    @property
+    def iterations(self):
+        return _setting('PBKDF2_ITERATIONS') or hashers.PBKDF2PasswordHasher.iterations
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """scrypt with ``PASSWORD_HASHING['SCRYPT_WORK_FACTOR']`` (N, a power of 2)"""
+
+    @property
+    def work_factor(self):
+        return _setting('SCRYPT_WORK_FACTOR') or hashers.ScryptPasswordHasher.work_factor
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2id with ``PASSWORD_HASHING['ARGON2_TIME_COST']`` and
+    ``['ARGON2_MEMORY_COST']`` (KiB); needs the ``argon2-cffi`` package
+    """
+
+    @property
+    def time_cost(self):
+        return _setting('ARGON2_TIME_COST') or hashers.Argon2PasswordHasher.time_cost
+
+    @property
+    def memory_cost(self):
+        return _setting('ARGON2_MEMORY_COST') or hashers.Argon2PasswordHasher.memory_cost
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def pool_size():
+    """Number of threads in the hashing pool"""
+    return _setting('MAX_WORKERS') or os.cpu_count()
+
+
+def get_executor():
+    """The shared, bounded pool that runs password hashing"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=pool_size(),
+                thread_name_prefix='password-hashing',
+            )
+        return _executor
+
+
+async def run_in_pool(function, *args, **kwargs):
+    """Run ``function`` in the hashing pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(function, *args, **kwargs))
+
+
+async def amake_password(raw_password):
+    """Async ``make_password`` that hashes in the pool"""
+    return await run_in_pool(hashers.make_password, raw_password)
+
+
+async def averify_password(user, raw_password):
+    """
+    Async ``user.check_password``: verifies in the pool and upgrades the
+    stored hash when the preferred hasher or its cost settings changed
+    """
+    is_correct, must_update = await run_in_pool(
+        hashers.verify_password, raw_password, user.password
+    )
+    if is_correct and must_update:
+        user.password = await amake_password(raw_password)
+        # A rehash is not a credential change: the base manager's update
+        # leaves the token version alone (see UserQuerySet.update)
+        await type(user)._base_manager.filter(pk=user.pk).aupdate(password=user.password)
+        await user_cache.ainvalidate(user.pk)
+    return is_correct
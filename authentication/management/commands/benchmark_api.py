@@ -0,0 +1,313 @@
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from authentication.models import User
+from authentication.serializers import CustomTokenObtainPairSerializer
+from products.models import Category, Product
+from products.seeding import SEED_PASSWORD, WORDS, seed_catalogue
+
+# Reported per scenario; `--compare` shows their relative change
+COMPARED = ('rps', 'p50_ms', 'p99_ms', 'queries_per_request')
+
+
+class Scenario:
+    """
+    One benchmarked request: ``build(i)`` returns the ``(path, data)`` of
+    the i-th request, sent as ``role``
+    """
+
+    def __init__(self, name, method, build, role='user', status=200):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.role = role
+        self.status = status
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the API in-process against a seeded throwaway database and '
+        'report requests/sec, p50/p99 latency and queries per request as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Synthetic users to seed')
+        parser.add_argument('--categories', type=int, default=50, help='Synthetic categories to seed')
+        parser.add_argument('--products', type=int, default=10000, help='Synthetic products to seed')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the synthetic data')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario at most')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Time per scenario at most')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per scenario')
+        parser.add_argument('--bulk-size', type=int, default=100, help='Rows per bulk upsert request')
+        parser.add_argument(
+            '--scenario', action='append', metavar='NAME',
+            help='Scenario to run (repeatable, prefix match); all by default',
+        )
+        parser.add_argument(
+            '--response-cache', action='store_true',
+            help='Keep the response and statistics caches on (measures cache hits)',
+        )
+        parser.add_argument(
+            '--database-file',
+            help='SQLite file for the benchmark database (in memory by default); reused with --keepdb',
+        )
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database and its data')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as fh:
+                    baseline = json.load(fh)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read {options["compare"]}: {exc}')
+
+        if options['database_file']:
+            if connection.vendor != 'sqlite':
+                raise CommandError('--database-file only applies to SQLite')
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = options['database_file']
+
+        # A test database, so the benchmark never touches real data
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'])
+        try:
+            with override_settings(**self.benchmark_settings(options['response_cache'])):
+                self.seed(options)
+                results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        if baseline is not None:
+            self.compare(baseline, results)
+
+    @staticmethod
+    def benchmark_settings(response_cache):
+        rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+        overrides = {
+            'DEBUG': False,
+            'ALLOWED_HOSTS': ['testserver'],
+            # Every request comes from one client; a missing rate disables the throttle
+            'REST_FRAMEWORK': rest_framework,
+        }
+        if not response_cache:
+            # A zero TTL expires entries as they are stored
+            overrides['RESPONSE_CACHE'] = {**getattr(settings, 'RESPONSE_CACHE', {}), 'TTL': 0}
+            overrides['STATS_CACHE'] = {**getattr(settings, 'STATS_CACHE', {}), 'TTL': 0}
+        return overrides
+
+    def seed(self, options):
+        if Product.objects.exists() or User.objects.exists():
+            self.stderr.write('Reusing the data of the kept benchmark database')
+            return
+        start = time.perf_counter()
+        seed_catalogue(
+            options['users'], options['categories'], options['products'], seed=options['seed'], drop_indexes=True
+        )
+        self.stderr.write(
+            f"Seeded {options['users']} users, {options['categories']} categories and "
+            f"{options['products']} products in {time.perf_counter() - start:.1f}s"
+        )
+
+    def scenarios(self, options):
+        user = User.objects.filter(role='user', is_active=True).order_by('id').first()
+        admin = User.objects.filter(role='admin', is_active=True).order_by('id').first()
+        if user is None or admin is None:
+            raise CommandError('The benchmark needs an active admin and an active user; seed at least 2 users')
+        category_ids = list(Category.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+        skus = list(Product.objects.order_by('id').values_list('sku', flat=True)[:1000])
+        if not category_ids or not skus:
+            raise CommandError('The benchmark needs active categories and products')
+        refresh = {'token': str(CustomTokenObtainPairSerializer.get_token(user))}
+        bulk_size = options['bulk_size']
+
+        def get(path):
+            return lambda i: (path, None)
+
+        def refresh_body(i):
+            return '/api/auth/token/refresh/', {'refresh': refresh['token']}
+
+        def bulk_body(i):
+            # Alternate updating seeded products and inserting new ones
+            if i % 2:
+                rows = [{'sku': sku, 'stock_quantity': i % 50} for sku in skus[:bulk_size]]
+            else:
+                rows = [
+                    {
+                        'sku': f'BENCH-{i:06d}-{n:04d}',
+                        'name': f'Benchmark product {i}-{n}',
+                        'category': category_ids[n % len(category_ids)],
+                        'price': '19.99',
+                        'stock_quantity': n,
+                    }
+                    for n in range(bulk_size)
+                ]
+            return '/api/products/bulk/', rows
+
+        scenarios = [
+            Scenario('login', 'post', lambda i: ('/api/auth/login/', {'email': user.email, 'password': SEED_PASSWORD}), None),
+            Scenario('refresh', 'post', refresh_body, None),
+            Scenario('user_info', 'get', get('/api/auth/user-info/')),
+            Scenario('products_list', 'get', get('/api/products/')),
+        ]
+        for field in ('id', 'name', 'price', 'created_at', 'stock_quantity'):
+            for ordering in (field, f'-{field}'):
+                scenarios.append(Scenario(
+                    f'products_order_{ordering.replace("-", "desc_")}', 'get', get(f'/api/products/?ordering={ordering}')
+                ))
+        scenarios += [
+            Scenario('products_filter_price', 'get', get('/api/products/?min_price=10&max_price=100')),
+            Scenario('products_filter_in_stock', 'get', get('/api/products/?in_stock=true')),
+            Scenario('products_filter_out_of_stock', 'get', get('/api/products/?in_stock=false')),
+            Scenario('products_filter_combined', 'get', get('/api/products/?min_price=10&in_stock=true&ordering=-price')),
+            Scenario('products_cursor', 'get', get('/api/products/?pagination=cursor')),
+            Scenario('products_search', 'get', lambda i: (f'/api/products/?search={WORDS[i % len(WORDS)]}', None)),
+            Scenario('products_search_sku', 'get', lambda i: (f'/api/products/?search={skus[i % len(skus)]}', None)),
+            Scenario('categories_list', 'get', get('/api/categories/'), 'admin'),
+            Scenario('product_stats', 'get', get('/api/products/stats/')),
+            Scenario('category_stats', 'get', get('/api/categories/stats/'), 'admin'),
+            Scenario('products_bulk', 'post', bulk_body, 'admin'),
+        ]
+
+        selected = options['scenario']
+        if selected:
+            scenarios = [s for s in scenarios if any(s.name.startswith(name) for name in selected)]
+            if not scenarios:
+                raise CommandError(f'No scenario matches {", ".join(selected)}')
+        return scenarios, {'user': user, 'admin': admin}, refresh
+
+    def run(self, options):
+        scenarios, users, refresh = self.scenarios(options)
+        # Before the bulk scenario adds products
+        meta = self.meta(options)
+        results = {}
+        for scenario in scenarios:
+            client = Client()
+            headers = {}
+            if scenario.role is not None:
+                token = CustomTokenObtainPairSerializer.get_token(users[scenario.role]).access_token
+                headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+            def send(i):
+                path, data = scenario.build(i)
+                if scenario.method == 'get':
+                    response = client.get(path, **headers)
+                else:
+                    response = client.post(path, data, content_type='application/json', **headers)
+                if scenario.name == 'refresh' and response.status_code == 200:
+                    # Refresh tokens are rotated: the next request uses the new one
+                    refresh['token'] = response.json().get('refresh', refresh['token'])
+                return response
+
+            for i in range(options['warmup']):
+                send(i)
+            results[scenario.name] = self.measure(scenario, send, options)
+            self.stderr.write(
+                f"{scenario.name}: {results[scenario.name]['rps']:.1f} req/s, "
+                f"p50 {results[scenario.name]['p50_ms']:.2f} ms, "
+                f"{results[scenario.name]['queries_per_request']:.1f} queries"
+            )
+
+        return {'meta': meta, 'scenarios': results}
+
+    def measure(self, scenario, send, options):
+        latencies, queries, errors = [], [], 0
+        counted = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            counted[0] += 1
+            return execute(sql, params, many, context)
+
+        deadline = time.perf_counter() + options['seconds']
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            for i in range(options['warmup'], options['warmup'] + options['requests']):
+                counted[0] = 0
+                start = time.perf_counter()
+                response = send(i)
+                latencies.append(time.perf_counter() - start)
+                queries.append(counted[0])
+                if response.status_code != scenario.status:
+                    errors += 1
+                if time.perf_counter() >= deadline:
+                    break
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': round(len(latencies) / elapsed, 2),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'max_ms': round(latencies[-1] * 1000, 3),
+            'queries_per_request': round(sum(queries) / len(queries), 2),
+            'max_queries': max(queries),
+        }
+
+    @staticmethod
+    def meta(options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=5,
+            ).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {
+            'commit': commit,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'password_hasher': settings.PASSWORD_HASHERS[0].rsplit('.', 1)[-1],
+            'response_cache': options['response_cache'],
+            'data': {
+                'seed': options['seed'],
+                'users': User.objects.count(),
+                'categories': Category.objects.count(),
+                'products': Product.objects.count(),
+            },
+            'argv': sys.argv[1:],
+        }
+
+    def compare(self, baseline, results):
+        self.stderr.write(f"\nAgainst {baseline.get('meta', {}).get('commit') or 'baseline'}:")
+        for name, current in results['scenarios'].items():
+            previous = baseline.get('scenarios', {}).get(name)
+            if previous is None:
+                self.stderr.write(f'{name}: new')
+                continue
+            changes = []
+            for metric in COMPARED:
+                before, after = previous.get(metric), current[metric]
+                if before:
+                    changes.append(f'{metric} {before:g} -> {after:g} ({(after - before) / before:+.0%})')
+                else:
+                    changes.append(f'{metric} {before} -> {after:g}')
+            self.stderr.write(f'{name}: ' + ', '.join(changes))
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an ascending list"""
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
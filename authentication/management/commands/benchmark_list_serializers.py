@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authentication.models import User
+from products.models import Product
+from products.serializers import ProductListSerializer, compiled_product_list
+from users.serializers import UserListSerializer, compiled_user_list
+
+
+class Command(BaseCommand):
+    help = (
+        'Report rows/sec for the compiled list serializers and the DRF '
+        'serializers they replace (parity is covered by the test suite)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per run (a page of the list)')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per serializer; the best is reported')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        cases = [
+            (
+                'products',
+                Product.objects.filter(is_active=True).select_related('category', 'created_by').order_by('id'),
+                ProductListSerializer,
+                compiled_product_list,
+            ),
+            (
+                'users',
+                User.objects.order_by('-created_at', '-id'),
+                UserListSerializer,
+                compiled_user_list,
+            ),
+        ]
+        for name, queryset, serializer_class, compiled in cases:
+            def drf():
+                return serializer_class(list(queryset[:rows]), many=True).data
+
+            def fast():
+                return compiled.serialize(compiled.values(queryset)[:rows])
+
+            count = len(fast())
+            if not count:
+                self.stdout.write(f'{name}: no rows to benchmark (seed some data first)')
+                continue
+
+            drf_time = self.best_time(drf, repeat)
+            fast_time = self.best_time(fast, repeat)
+            self.stdout.write(
+                f'{name}: {count} rows | '
+                f'{serializer_class.__name__}: {count / drf_time:,.0f} rows/s | '
+                f'compiled: {count / fast_time:,.0f} rows/s | '
+                f'{drf_time / fast_time:.1f}x'
+            )
+
+    @staticmethod
+    def best_time(function, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+        return best
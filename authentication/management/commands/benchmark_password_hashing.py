@@ -0,0 +1,75 @@
+import asyncio
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from authentication.hashing import pool_size, run_in_pool
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure password verifications (logins) per second for the configured '
+        'hashers, on one thread and through the hashing pool'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hasher',
+            action='append',
+            choices=sorted(settings.PASSWORD_HASHER_CLASSES),
+            help='Hasher to measure (repeatable); defaults to the preferred one',
+        )
+        parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each measurement')
+
+    def handle(self, *args, **options):
+        names = options['hasher'] or [settings.PASSWORD_HASHER]
+        seconds = options['seconds']
+        workers = pool_size()
+        cores = os.cpu_count()
+        self.stdout.write(f'{cores} CPU(s), hashing pool of {workers} thread(s)')
+
+        for name in names:
+            algorithm = import_string(settings.PASSWORD_HASHER_CLASSES[name]).algorithm
+            try:
+                encoded = make_password('benchmark-password', hasher=algorithm)
+            except ValueError as exc:
+                # e.g. argon2 without argon2-cffi installed
+                self.stdout.write(self.style.WARNING(f'{name}: skipped ({exc})'))
+                continue
+            if not verify_password('benchmark-password', encoded, preferred=algorithm)[0]:
+                raise CommandError(f'{name}: hash does not verify')
+
+            single = self.measure_single(encoded, algorithm, seconds)
+            pooled = asyncio.run(self.measure_pool(encoded, algorithm, seconds, workers))
+            self.stdout.write(
+                f'{name} ({algorithm}): {1000 / single:.1f} ms per verification | '
+                f'1 thread: {single:.1f}/s | '
+                f'pool: {pooled:.1f}/s = {pooled / min(workers, cores):.1f}/s per core'
+            )
+
+    @staticmethod
+    def measure_single(encoded, algorithm, seconds):
+        count, start = 0, time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            verify_password('benchmark-password', encoded, preferred=algorithm)
+            count += 1
+        return count / (time.perf_counter() - start)
+
+    @staticmethod
+    async def measure_pool(encoded, algorithm, seconds, workers):
+        count = 0
+        deadline = time.perf_counter() + seconds
+
+        async def login_loop():
+            nonlocal count
+            while time.perf_counter() < deadline:
+                await run_in_pool(verify_password, 'benchmark-password', encoded, preferred=algorithm)
+                count += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(login_loop() for _ in range(workers * 2)))
+        return count / (time.perf_counter() - start)
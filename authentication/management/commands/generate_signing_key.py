@@ -0,0 +1,61 @@
+import json
+import os
+import secrets
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from jwt import algorithms
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a signing key and append it to the JWKS file; it signs new '
+        'tokens from the next reload unless JWT_ACTIVE_KID names another key'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', choices=['RS256', 'ES256', 'EdDSA'], default='EdDSA')
+        parser.add_argument('--kid', help='Key id; random by default')
+        parser.add_argument(
+            '--jwks-file',
+            default=getattr(settings, 'JWT_SIGNING', {}).get('JWKS_FILE'),
+            help='Defaults to JWT_JWKS_FILE',
+        )
+
+    def handle(self, *args, **options):
+        path = options['jwks_file']
+        if not path:
+            raise CommandError('Pass --jwks-file or set JWT_JWKS_FILE.')
+        if not algorithms.has_crypto:
+            raise CommandError('Install "cryptography" to generate asymmetric keys.')
+
+        document = {'keys': []}
+        if os.path.exists(path):
+            with open(path) as fh:
+                document = json.load(fh)
+        kid = options['kid'] or secrets.token_hex(8)
+        if any(key.get('kid') == kid for key in document['keys']):
+            raise CommandError(f'Key {kid!r} already exists in {path}.')
+
+        jwk = self.generate(options['algorithm'])
+        jwk.update(kid=kid, alg=options['algorithm'], use='sig')
+        document['keys'].append(jwk)
+
+        # Private keys: readable by the owner only
+        fd = os.open(path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(document, fh, indent=2)
+        os.replace(path + '.tmp', path)
+        self.stdout.write(self.style.SUCCESS(f'Added {options["algorithm"]} key {kid!r} to {path}.'))
+
+    @staticmethod
+    def generate(algorithm):
+        from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+        if algorithm == 'RS256':
+            return algorithms.RSAAlgorithm.to_jwk(
+                rsa.generate_private_key(public_exponent=65537, key_size=2048), as_dict=True
+            )
+        if algorithm == 'ES256':
+            return algorithms.ECAlgorithm.to_jwk(ec.generate_private_key(ec.SECP256R1()), as_dict=True)
+        return algorithms.OKPAlgorithm.to_jwk(ed25519.Ed25519PrivateKey.generate(), as_dict=True)
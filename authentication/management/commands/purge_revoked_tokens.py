@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from authentication.revocation import revocation_list
+
+
+class Command(BaseCommand):
+    help = 'Delete revoked tokens that have expired anyway; run it periodically (e.g. from cron)'
+
+    def handle(self, *args, **options):
+        deleted = revocation_list.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} expired revoked token(s).'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.counters import rebuild_counters, verify_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized statistics counters, or verify them with --verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only compare stored counters with the tables and report drift',
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            drift = verify_counters()
+            for key, (stored, expected) in sorted(drift.items()):
+                self.stdout.write(f'{key}: stored {stored}, expected {expected}')
+            if drift:
+                raise CommandError(f'{len(drift)} counter(s) out of sync; run rebuild_counters to fix them.')
+            self.stdout.write(self.style.SUCCESS('All counters are in sync.'))
+            return
+
+        counters = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(counters)} counter(s).'))
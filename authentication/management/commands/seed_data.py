@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.seeding import SEED_PASSWORD, seed_catalogue
+
+# Rows between progress lines at the default verbosity
+REPORT_EVERY = 100000
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with deterministic synthetic users, categories and '
+        'products through batched bulk inserts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Users to create (the first is an admin)')
+        parser.add_argument('--categories', type=int, default=1000, help='Categories to create')
+        parser.add_argument('--products', type=int, default=100000, help='Products to create')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT and per transaction')
+        parser.add_argument(
+            '--password', default=SEED_PASSWORD,
+            help=f'Password of every synthetic user (default: {SEED_PASSWORD})',
+        )
+        parser.add_argument(
+            '--drop-indexes', action='store_true',
+            help=(
+                'Drop the secondary indexes (Meta.indexes, foreign key and db_index indexes) '
+                'during the load and rebuild them afterwards; unique constraints are kept'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if options['users'] < 1 and (options['categories'] or options['products']):
+            raise CommandError('Categories and products need at least one user')
+        if options['categories'] < 1 and options['products']:
+            raise CommandError('Products need at least one category')
+        self.verbosity = options['verbosity']
+        self.reported = {}
+
+        start = time.perf_counter()
+        try:
+            counts = seed_catalogue(
+                options['users'],
+                options['categories'],
+                options['products'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                password=options['password'],
+                drop_indexes=options['drop_indexes'],
+                progress=self.progress,
+            )
+        except ValueError as exc:
+            raise CommandError(f'{exc}; run `manage.py flush` first to seed again')
+
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['users']} users, {counts['categories']} categories and "
+            f"{counts['products']} products in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)."
+        ))
+
+    def progress(self, model, inserted):
+        step = inserted // REPORT_EVERY
+        if self.verbosity > 1 or (self.verbosity and step > self.reported.get(model, 0)):
+            self.reported[model] = step
+            self.stderr.write(f'{model._meta.verbose_name_plural}: {inserted} inserted')
@@ -0,0 +1,255 @@
+"""
+Per-route request metrics in Prometheus' text format.
+
+``RequestMetricsMiddleware`` records, for each resolved URL name (e.g.
+``products:product-list-create``), the wall time, the number and total
+time of database queries, the time spent serializing and the response
+size into fixed-bucket histograms. Queries are timed by a database
+execute wrapper that reads the current request from a context variable,
+so queries run by async views in worker threads are counted too.
+
+Metrics are kept per process; scrape every worker, or run one per
+container.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+METRICS_DEFAULTS = {
+    'ENABLED': True,
+    'EXCLUDE_ROUTES': ['authentication:metrics'],
+}
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Wall time of the request', SECONDS_BUCKETS),
+    'http_request_queries': ('Database queries per request', QUERY_BUCKETS),
+    'http_request_db_seconds': ('Database time per request', SECONDS_BUCKETS),
+    'http_request_serializer_seconds': ('Serializer time per request', SECONDS_BUCKETS),
+    'http_response_size_bytes': ('Response body size', BYTES_BUCKETS),
+}
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def _setting(name):
+    return getattr(settings, 'METRICS', {}).get(name, METRICS_DEFAULTS[name])
+
+
+class Histogram:
+    """Cumulative-bucket histogram; callers hold the registry lock"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    """Measurements of the request being handled"""
+    __slots__ = ('queries', 'db_time', 'serializer_time', '_serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self._serializing = False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._responses = {}
+
+    def record(self, route, status, duration, metrics, size):
+        with self._lock:
+            histograms = self._routes.get(route)
+            if histograms is None:
+                histograms = self._routes[route] = {
+                    name: Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()
+                }
+            histograms['http_request_duration_seconds'].observe(duration)
+            histograms['http_request_queries'].observe(metrics.queries)
+            histograms['http_request_db_seconds'].observe(metrics.db_time)
+            histograms['http_request_serializer_seconds'].observe(metrics.serializer_time)
+            if size is not None:
+                histograms['http_response_size_bytes'].observe(size)
+            key = (route, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+            self._responses.clear()
+
+    def render(self, gauges=()):
+        """
+        Prometheus text exposition of the histograms, response counters and
+        ``gauges`` (``(name, help, {labels tuple: value})`` items)
+        """
+        lines = []
+        with self._lock:
+            for name, (help_text, _) in HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for route, histograms in sorted(self._routes.items()):
+                    histogram = histograms[name]
+                    label = f'route="{_escape(route)}"'
+                    for bound, total in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{{label},le="{bound}"}} {total}')
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum:g}')
+                    lines.append(f'{name}_count{{{label}}} {histogram.count}')
+
+            lines += ['# HELP http_responses_total Responses by route and status', '# TYPE http_responses_total counter']
+            for (route, status), count in sorted(self._responses.items()):
+                lines.append(f'http_responses_total{{route="{_escape(route)}",status="{status}"}} {count}')
+
+        for name, help_text, values in gauges:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+            for labels, value in sorted(values.items()):
+                label = ','.join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+                lines.append(f'{name}{{{label}}} {value:g}' if label else f'{name} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+def time_queries(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def install_query_timer(connection, **kwargs):
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+@contextmanager
+def serializer_timer():
+    """Count the enclosed block as serializer time (outermost block only)"""
+    metrics = _current.get()
+    if metrics is None or metrics._serializing:
+        yield
+        return
+    metrics._serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - start
+        metrics._serializing = False
+
+
+def instrument_serializers():
+    """Time DRF's ``serializer.data``, which every serializer goes through"""
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data
+    if getattr(data.fget, 'instrumented', False):
+        return
+
+    def timed_data(self):
+        with serializer_timer():
+            return data.fget(self)
+
+    timed_data.instrumented = True
+    BaseSerializer.data = property(timed_data)
+
+
+def setup():
+    """Hook the query timer and serializer timing in (from AppConfig.ready)"""
+    if not _setting('ENABLED'):
+        return
+    connection_created.connect(install_query_timer, dispatch_uid='metrics_query_timer')
+    for alias in connections:
+        install_query_timer(connections[alias])
+    instrument_serializers()
+
+
+class RequestMetricsMiddleware:
+    """
+    Records per-route request metrics into ``registry``; add it near the
+    top of ``MIDDLEWARE`` so the timing covers the other middleware
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = _setting('ENABLED')
+        self.exclude = set(_setting('EXCLUDE_ROUTES'))
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        metrics, token, start = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics, start)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        metrics, token, start = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics, start)
+        return response
+
+    @staticmethod
+    def start(request):
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, start):
+        duration = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match is not None else '<unresolved>'
+        if route in self.exclude:
+            return
+        size = None if response.streaming else len(response.content)
+        registry.record(route, response.status_code, duration, metrics, size)
@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def populate_user_counters(apps, schema_editor):
+    User = apps.get_model('authentication', 'User')
+    Counter = apps.get_model('authentication', 'Counter')
+
+    totals = User.objects.aggregate(total=Count('id'), active=Count('id', filter=Q(is_active=True)))
+    counters = {'users:total': totals['total'], 'users:active': totals['active']}
+    for role, count in User.objects.order_by().values_list('role').annotate(count=Count('id')):
+        counters[f'users:role:{role}'] = count
+
+    Counter.objects.filter(key__startswith='users:').delete()
+    Counter.objects.bulk_create(Counter(key=key, value=value) for key, value in counters.items())
+
+
+def remove_user_counters(apps, schema_editor):
+    Counter = apps.get_model('authentication', 'Counter')
+    Counter.objects.filter(key__startswith='users:').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0005_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_user_counters, remove_user_counters),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:31
+
+import authentication.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', authentication.models.UserManager()),
+            ],
+        ),
+    ]
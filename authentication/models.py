@@ -1,5 +1,37 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
 from django.db import models
+from django.db.models import F
+
+# Changes that must sign the user out everywhere: tokens carry the role and
+# status claims, and a password change ends every other session (a save
+# only counts a new password from set_password, not a rehash on login)
+CREDENTIAL_FIELDS = frozenset({'role', 'is_active', 'password'})
+
+
+class UserQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        """
+        Bulk updates of a role, status or password bump the token version of
+        the updated users, as saving them does (see authentication.signals)
+        """
+        if 'token_version' in kwargs or not CREDENTIAL_FIELDS & kwargs.keys():
+            return super().update(**kwargs)
+
+        from .cache import token_versions, user_cache
+
+        user_ids = list(self.values_list('pk', flat=True))
+        rows = super().update(token_version=F('token_version') + 1, **kwargs)
+        for user_id in user_ids:
+            user_cache.invalidate(user_id)
+            token_versions.invalidate(user_id)
+        return rows
+
+    update.alters_data = True
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
 
 
 class User(AbstractUser):
@@ -27,6 +59,9 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    token_version = models.PositiveIntegerField(default=0)
+
+    objects = UserManager()
     
     # Make email the username field
     USERNAME_FIELD = 'email'
@@ -36,6 +71,10 @@ class User(AbstractUser):
         db_table = 'auth_user'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Supports the newest-first user listing and its keyset pages
+            models.Index(fields=['created_at', 'id'], name='user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.email} ({self.get_role_display()})"
@@ -59,3 +98,39 @@ class User(AbstractUser):
     def full_name(self):
         """Get user's full name"""
         return f"{self.first_name} {self.last_name}".strip()
+
+
+class Counter(models.Model):
+    """
+    Denormalized counter maintained incrementally (see authentication.counters)
+    """
+    key = models.CharField(max_length=100, unique=True)
+    value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Counter'
+        verbose_name_plural = 'Counters'
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class RevokedToken(models.Model):
+    """
+    A revoked access or refresh token, kept until it would have expired
+    (see authentication.revocation)
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    token_type = models.CharField(max_length=20)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    expires_at = models.DateTimeField(db_index=True)
+    # Incremental filter refreshes read by revocation time
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Revoked token'
+        verbose_name_plural = 'Revoked tokens'
+
+    def __str__(self):
+        return f"{self.token_type} {self.jti}"
@@ -0,0 +1,196 @@
+"""
+Pagination classes shared by the list endpoints
+"""
+import datetime
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    JSON encoder for cursor positions. Unlike DjangoJSONEncoder it keeps full
+    microsecond precision, otherwise rows sharing a truncated timestamp would
+    be skipped or repeated.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class FlexiblePagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset (cursor) mode.
+
+    - ``?page=N`` works as before.
+    - ``?pagination=cursor`` (or any request carrying ``cursor``) switches to
+      keyset pagination: pages are fetched with a ``WHERE`` on the last seen
+      ordering values instead of an ``OFFSET``, so deep pages cost the same
+      as the first one. The primary key is appended as a tiebreaker to
+      whatever ordering the view applied.
+    - ``?count=false`` skips the ``COUNT(*)`` query in either mode and drops
+      ``count`` from the response.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.cursor_mode = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+        self.include_count = request.query_params.get(self.count_query_param, '').lower() not in ('false', '0')
+
+        if not self.cursor_mode and self.include_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.count = queryset.count() if self.include_count else None
+        if self.cursor_mode:
+            return self.paginate_keyset(queryset)
+        return self.paginate_offset(queryset)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode and self.include_count:
+            return super().get_paginated_response(data)
+
+        response = {}
+        if self.include_count:
+            response['count'] = self.count
+        response.update({
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
+        return Response(response)
+
+    # Page numbers without COUNT(*)
+
+    def paginate_offset(self, queryset):
+        try:
+            page_number = _positive_int(
+                self.request.query_params.get(self.page_query_param, 1), strict=True
+            )
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=self.request.query_params.get(self.page_query_param),
+                message=_('That page number is not an integer'),
+            ))
+
+        offset = (page_number - 1) * self.page_size
+        rows = list(queryset[offset:offset + self.page_size + 1])
+        if not rows and page_number > 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=_('That page contains no results'),
+            ))
+
+        url = self.request.build_absolute_uri()
+        self.next_link = None
+        if len(rows) > self.page_size:
+            self.next_link = replace_query_param(url, self.page_query_param, page_number + 1)
+        self.previous_link = None
+        if page_number == 2:
+            self.previous_link = remove_query_param(url, self.page_query_param)
+        elif page_number > 2:
+            self.previous_link = replace_query_param(url, self.page_query_param, page_number - 1)
+        return rows[:self.page_size]
+
+    # Keyset pagination
+
+    def get_ordering(self, queryset):
+        """
+        Return the ordering as ``(field, descending)`` pairs, ending with the
+        primary key so that every row has a unique position.
+        """
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not all(isinstance(field, str) for field in ordering):
+            raise NotFound(_('Cursor pagination is not available for this ordering.'))
+
+        pairs = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        pk_names = {'pk', queryset.model._meta.pk.name}
+        if not any(field in pk_names for field, _descending in pairs):
+            pairs.append(('pk', pairs[0][1] if pairs else False))
+        return pairs
+
+    def paginate_keyset(self, queryset):
+        ordering = self.get_ordering(queryset)
+        order_key = [('-' if descending else '') + field for field, descending in ordering]
+        position, reverse = self.decode_cursor(order_key)
+
+        if reverse:
+            order_by = [(field, not descending) for field, descending in ordering]
+        else:
+            order_by = ordering
+        queryset = queryset.order_by(*[('-' if descending else '') + field for field, descending in order_by])
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(order_by, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_link = None
+        self.previous_link = None
+        if rows:
+            if (has_more and not reverse) or (reverse and position is not None):
+                self.next_link = self.encode_cursor(order_key, self.row_position(rows[-1], ordering), False)
+            if (has_more and reverse) or (not reverse and position is not None):
+                self.previous_link = self.encode_cursor(order_key, self.row_position(rows[0], ordering), True)
+        return rows
+
+    @staticmethod
+    def keyset_filter(ordering, position):
+        """
+        Build the lexicographic "after this position" condition:
+        ``(a > x) OR (a = x AND b > y) OR ...``
+        """
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(ordering, position):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    @staticmethod
+    def row_position(row, ordering):
+        if isinstance(row, dict):
+            return [row['id' if field == 'pk' else field] for field, _descending in ordering]
+        return [getattr(row, field) for field, _descending in ordering]
+
+    def encode_cursor(self, order_key, position, reverse):
+        payload = json.dumps({'o': order_key, 'p': position, 'r': reverse}, cls=CursorEncoder)
+        cursor = urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, order_key):
+        cursor = self.request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(cursor.encode()))
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor is only meaningful for the ordering it was issued for
+        if payload.get('o') != order_key or len(position) != len(order_key):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
@@ -1,91 +1,150 @@
-from rest_framework import permissions
+"""
+Role-based permission classes.
 
+Each class declares which roles may use which HTTP methods in ``rules``;
+the declaration is compiled into a frozen set of allowed ``(role, method)``
+pairs when the class is defined, so a check is one set lookup on the role
+claim (answered from the token, without loading the user).
 
-class IsAdminRole(permissions.BasePermission):
+Ownership is decided by comparing ids: the object's own id for users, the
+owner foreign key column (``<owner_field>_id``) otherwise, so no related
+object is loaded. ``scope_queryset`` applies the same rule to a whole
+queryset; add ``PermissionScopeFilter`` to a list view's filter backends to
+return only the objects the user may act on instead of checking them one
+by one.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import filters, permissions
+
+from .models import User
+
+ROLES = tuple(dict.fromkeys(role for role, _ in User.ROLE_CHOICES))
+METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'})
+READ = frozenset(permissions.SAFE_METHODS)
+WRITE = METHODS - READ
+
+
+def compile_rules(rules):
+    """``{roles: methods}`` -> frozenset of the allowed ``(role, method)`` pairs"""
+    return frozenset(
+        (role, method)
+        for roles, methods in rules.items()
+        for role in roles
+        for method in methods
+    )
+
+
+@lru_cache(maxsize=None)
+def owner_column(model, owner_field):
+    """Column holding the owner's id on ``model``, or None if it has no owner"""
+    if model is User:
+        return 'pk'
+    try:
+        return model._meta.get_field(owner_field).attname
+    except FieldDoesNotExist:
+        return None
+
+
+class RolePermission(permissions.BasePermission):
     """
-    Permission class to check if user has admin role
+    Allows the requests whose (role, method) pair is granted by ``rules``
+    (``{roles: methods}``); anonymous users have no role
     """
-    
+    rules = {}
+    decisions = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.decisions = compile_rules(cls.rules)
+
     def has_permission(self, request, view):
-        return (
-            request.user and
-            request.user.is_authenticated and
-            request.user.is_admin
-        )
+        return (getattr(request.user, 'role', None), request.method) in self.decisions
+
+
+class OwnerPermission(RolePermission):
+    """
+    Any role passes the view check; objects are limited to their owner
+    unless the user's role is in ``bypass_roles``
+    """
+    rules = {ROLES: METHODS}
+    bypass_roles = frozenset()
+    owner_field = 'user'
+
+    def owner_id(self, obj):
+        column = owner_column(type(obj), self.owner_field)
+        return getattr(obj, column) if column else None
+
+    def has_object_permission(self, request, view, obj):
+        if request.user.role in self.bypass_roles:
+            return True
+        owner_id = self.owner_id(obj)
+        return owner_id is not None and owner_id == request.user.pk
+
+    def scope_queryset(self, request, queryset):
+        """``queryset`` narrowed to the objects ``has_object_permission`` allows"""
+        if getattr(request.user, 'role', None) in self.bypass_roles:
+            return queryset
+        column = owner_column(queryset.model, self.owner_field)
+        if column is None or not request.user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(**{column: request.user.pk})
 
 
-class IsAdminOrModerator(permissions.BasePermission):
+class PermissionScopeFilter(filters.BaseFilterBackend):
+    """
+    Narrows the view's queryset with the ``scope_queryset`` of each of its
+    permissions that has one
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for permission in view.get_permissions():
+            scope = getattr(permission, 'scope_queryset', None)
+            if scope is not None:
+                queryset = scope(request, queryset)
+        return queryset
+
+
+class IsAdminRole(RolePermission):
+    """
+    Permission class to check if user has admin role
+    """
+    rules = {('admin',): METHODS}
+
+
+class IsAdminOrModerator(RolePermission):
     """
     Permission class to check if user has admin or moderator role
     """
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and
-            request.user.is_authenticated and
-            (request.user.is_admin or request.user.is_moderator)
-        )
+    rules = {('admin', 'moderator'): METHODS}
 
 
-class IsOwnerOrAdmin(permissions.BasePermission):
+class IsOwnerOrAdmin(OwnerPermission):
     """
     Permission class to allow access to object owner or admin
     """
-    
-    def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated
-    
-    def has_object_permission(self, request, view, obj):
-        if request.user.is_admin:
-            return True
-        
-        return obj == request.user or (hasattr(obj, 'user') and obj.user == request.user)
+    bypass_roles = frozenset({'admin'})
 
 
-class IsOwnerOrAdminOrModerator(permissions.BasePermission):
+class IsOwnerOrAdminOrModerator(OwnerPermission):
     """
     Permission class to allow access to object owner, admin, or moderator
     """
-    
-    def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated
-    
-    def has_object_permission(self, request, view, obj):
-        if request.user.is_admin or request.user.is_moderator:
-            return True
-        
-        return obj == request.user or (hasattr(obj, 'user') and obj.user == request.user)
+    bypass_roles = frozenset({'admin', 'moderator'})
 
 
-class IsAdminOrReadOnly(permissions.BasePermission):
+class IsAdminOrReadOnly(RolePermission):
     """
     Permission class to allow read access to all users but write access only to admins
     """
-    
-    def has_permission(self, request, view):
-        if not (request.user and request.user.is_authenticated):
-            return False
-        
-        if request.method in permissions.SAFE_METHODS:
-            return True
-        
-        return request.user.is_admin
+    rules = {ROLES: READ, ('admin',): WRITE}
 
 
-class IsAdminOrModeratorForProducts(permissions.BasePermission):
+class IsAdminOrModeratorForProducts(RolePermission):
     """
     Permission class for products:
     - Admins & Moderators: Full CRUD access
     - Users: Read-only access
     """
-    
-    def has_permission(self, request, view):
-        if not (request.user and request.user.is_authenticated):
-            return False
-        
-        # Allow read access for all authenticated users
-        if request.method in permissions.SAFE_METHODS:
-            return True
-        
-        # Allow write access for admins and moderators
-        return request.user.is_admin or request.user.is_moderator
+    rules = {ROLES: READ, ('admin', 'moderator'): WRITE}
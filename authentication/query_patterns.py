@@ -0,0 +1,229 @@
+"""
+N+1 query detection.
+
+Every query of a tracked request is reduced to a fingerprint (the SQL with
+literals and ``IN`` lists normalized away); a fingerprint repeated
+``THRESHOLD`` times within the request is an N+1 pattern, usually a
+related object or a per-row method hit inside a loop. The first stack
+frame in project code that ran the repeated query is reported with it.
+
+``QueryPatternMiddleware`` tracks a ``SAMPLE_RATE`` share of requests and
+logs each pattern as one JSON line to the ``authentication.query_patterns``
+logger; with ``RAISE`` on (for test runs) it raises ``NPlusOneError``
+instead. Tests can also wrap any block in ``detect_n_plus_one()``. Code
+that repeats a query on purpose runs it in ``repeated_queries_expected()``,
+which leaves it out of the counts.
+"""
+import json
+import logging
+import os
+import random
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+QUERY_PATTERNS_DEFAULTS = {
+    'THRESHOLD': 5,
+    'SAMPLE_RATE': 0.0,
+    'RAISE': False,
+}
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Installed packages, even in a virtualenv inside the project
+LIBRARY_PATHS = ('site-packages', 'dist-packages')
+# The execute wrappers themselves
+WRAPPER_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics.py'),
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:[^()]*)\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+_current = ContextVar('query_patterns', default=None)
+
+
+def _setting(name):
+    return getattr(settings, 'QUERY_PATTERNS', {}).get(name, QUERY_PATTERNS_DEFAULTS[name])
+
+
+class NPlusOneError(AssertionError):
+    """Raised for a detected pattern when ``RAISE`` is on"""
+
+
+def fingerprint(sql):
+    """``sql`` with literals and ``IN`` lists replaced, for grouping queries"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def origin():
+    """
+    ``file:line in function`` of the innermost project frame on the stack,
+    else of the innermost frame outside Django and the wrappers
+    """
+    fallback = None
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = os.path.abspath(frame.filename)
+        if filename in WRAPPER_FILES:
+            continue
+        if filename.startswith(PROJECT_ROOT) and not any(path in filename for path in LIBRARY_PATHS):
+            return f'{os.path.relpath(filename, PROJECT_ROOT)}:{frame.lineno} in {frame.name}'
+        if fallback is None and f'{os.sep}django{os.sep}' not in filename:
+            fallback = f'{filename}:{frame.lineno} in {frame.name}'
+    return fallback
+
+
+class QueryTracker:
+    """Fingerprint counts of one request (or ``detect_n_plus_one`` block)"""
+    __slots__ = ('threshold', 'counts', 'patterns')
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.patterns = []
+
+    def add(self, sql):
+        key = fingerprint(sql)
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold:
+            # The stack is only walked once per pattern
+            self.patterns.append({'fingerprint': key, 'origin': origin()})
+
+    def report(self):
+        """Detected patterns with their final counts"""
+        return [
+            {**pattern, 'count': self.counts[pattern['fingerprint']]}
+            for pattern in self.patterns
+        ]
+
+
+def track_queries(execute, sql, params, many, context):
+    """Database execute wrapper feeding the current tracker, if any"""
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.add(sql)
+    return execute(sql, params, many, context)
+
+
+def install_tracker(connection, **kwargs):
+    if track_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_queries)
+
+
+def setup():
+    """Hook the tracker into every connection (from AppConfig.ready)"""
+    connection_created.connect(install_tracker, dispatch_uid='query_pattern_tracker')
+    for alias in connections:
+        install_tracker(connections[alias])
+
+
+def describe(patterns, where):
+    return '\n'.join(
+        f"N+1 query in {where}: {pattern['count']}x {pattern['fingerprint'][:200]}"
+        f" (from {pattern['origin'] or 'unknown'})"
+        for pattern in patterns
+    )
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None):
+    """
+    Raise ``NPlusOneError`` if the block repeats a query ``threshold``
+    times (``QUERY_PATTERNS['THRESHOLD']`` by default)
+    """
+    tracker = QueryTracker(threshold or _setting('THRESHOLD'))
+    token = _current.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current.reset(token)
+    patterns = tracker.report()
+    if patterns:
+        raise NPlusOneError(describe(patterns, 'block'))
+
+
+@contextmanager
+def repeated_queries_expected():
+    """Leave the queries of the block out of the current tracker"""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+class QueryPatternMiddleware:
+    """
+    Tracks a sampled share of requests and reports their N+1 patterns
+    (see module docstring)
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.raise_errors = _setting('RAISE')
+        self.sample_rate = 1.0 if self.raise_errors else _setting('SAMPLE_RATE')
+        self.threshold = _setting('THRESHOLD')
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        tracker = QueryTracker(self.threshold)
+        token = _current.set(tracker)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, tracker)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        tracker = QueryTracker(self.threshold)
+        token = _current.set(tracker)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, tracker)
+        return response
+
+    def report(self, request, tracker):
+        patterns = tracker.report()
+        if not patterns:
+            return
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match is not None else request.path
+        if self.raise_errors:
+            raise NPlusOneError(describe(patterns, f'{request.method} {route}'))
+        for pattern in patterns:
+            logger.warning(json.dumps({
+                'event': 'n_plus_one',
+                'method': request.method,
+                'route': route,
+                'path': request.path,
+                **pattern,
+            }))
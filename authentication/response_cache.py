@@ -0,0 +1,70 @@
+"""
+Versioned caching of rendered read responses
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .conditional import VersionedMixin
+
+RESPONSE_CACHE_DEFAULTS = {
+    'TTL': 300,
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'response',
+}
+
+
+def _setting(name):
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, RESPONSE_CACHE_DEFAULTS[name])
+
+
+class ResponseCacheMixin(VersionedMixin):
+    """
+    Caches rendered GET responses under the current data version.
+
+    The key combines the version counter named by ``version_key`` with the
+    view, the request path, the normalized ``cache_query_params`` (other
+    parameters do not change the response and are ignored), the user's role,
+    the host and the negotiated media type. A write bumps the version, so
+    entries are never invalidated individually: later reads simply miss and
+    the stale entries expire. Only successful JSON responses are cached; the
+    browsable API is always rendered.
+    """
+    cache_query_params = ()
+
+    def get_cache_key(self, request, version):
+        params = sorted(
+            (name, value.strip())
+            for name in self.cache_query_params
+            for value in request.query_params.getlist(name)
+            if value.strip()
+        )
+        parts = [
+            request.path,
+            repr(params),
+            getattr(request.user, 'role', ''),
+            f'{request.scheme}://{request.get_host()}',
+            request.accepted_media_type,
+        ]
+        digest = hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest()
+        return f"{_setting('KEY_PREFIX')}:{type(self).__name__}:{version}:{digest}"
+
+    def get(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().get(request, *args, **kwargs)
+
+        cache = caches[_setting('CACHE_ALIAS')]
+        key = self.get_cache_key(request, self.get_version()[0])
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, 'add_post_render_callback'):
+            def store(rendered):
+                cache.set(key, (rendered.content, rendered['Content-Type']), _setting('TTL'))
+            response.add_post_render_callback(store)
+        return response
@@ -0,0 +1,238 @@
+"""
+Revocation list for access and refresh tokens, by ``jti``.
+
+Every authenticated request asks whether its token was revoked. The answer
+comes from an in-process bloom filter of revoked ids: a miss (almost every
+request) is final and costs a few hash probes, a hit is confirmed against
+``RevokedToken`` through the Django cache. The filter is refreshed
+incrementally from the table every ``REFRESH_INTERVAL`` seconds and
+rebuilt from scratch every ``REBUILD_INTERVAL`` seconds, which drops
+purged ids and anything an incremental read missed.
+
+An incremental read takes the rows revoked since ``REFRESH_OVERLAP``
+seconds before the previous read started, not the rows above the highest
+primary key seen: ids are allocated when a row is inserted but become
+visible when its transaction commits, so a slow writer can commit a lower
+id after a higher one was already read. The overlap bounds how long such a
+write may take (plus clock skew between servers); the rows it reads again
+are already in the filter and are skipped.
+
+Rows are only kept until the token would have expired anyway; run
+``manage.py purge_revoked_tokens`` periodically to delete the rest.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+TOKEN_REVOCATION_DEFAULTS = {
+    'CAPACITY': 100000,
+    'ERROR_RATE': 0.001,
+    'REFRESH_INTERVAL': 5,
+    'REBUILD_INTERVAL': 3600,
+    'REFRESH_OVERLAP': 60,
+    'NEGATIVE_TTL': 60,
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'auth:revoked',
+}
+
+
+def _setting(name):
+    return getattr(settings, 'TOKEN_REVOCATION', {}).get(name, TOKEN_REVOCATION_DEFAULTS[name])
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter over strings, sized for ``capacity`` items at
+    ``error_rate`` false positives
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k probes from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    Bloom-filter front for ``RevokedToken``, one instance per process
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._read_at = None
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._counters = dict.fromkeys(['filter_hits', 'revoked', 'refreshes'], 0)
+
+    @property
+    def shared(self):
+        return caches[_setting('CACHE_ALIAS')]
+
+    def _key(self, jti):
+        return f"{_setting('KEY_PREFIX')}:{jti}"
+
+    def _stale(self):
+        now = time.monotonic()
+        return (
+            self._filter is None
+            or now - self._refreshed_at >= _setting('REFRESH_INTERVAL')
+            or now - self._rebuilt_at >= _setting('REBUILD_INTERVAL')
+        )
+
+    def refresh(self):
+        """Add ids revoked since the last read, or rebuild when due"""
+        if not self._lock.acquire(blocking=self._filter is None):
+            # Another thread is already refreshing; use the current filter
+            return
+        try:
+            now = time.monotonic()
+            rebuild = (
+                self._filter is None
+                or now - self._rebuilt_at >= _setting('REBUILD_INTERVAL')
+                or self._filter.count >= self._filter.capacity
+            )
+            read_at = timezone.now()
+            rows = RevokedToken.objects.filter(expires_at__gt=read_at)
+            if not rebuild:
+                rows = rows.filter(revoked_at__gte=self._read_at - timedelta(seconds=_setting('REFRESH_OVERLAP')))
+            jtis = list(rows.values_list('jti', flat=True))
+
+            if rebuild:
+                capacity = max(_setting('CAPACITY'), 2 * len(jtis))
+                bloom = BloomFilter(capacity, _setting('ERROR_RATE'))
+                self._rebuilt_at = now
+            else:
+                bloom = self._filter
+            for jti in jtis:
+                # Rows from the overlap are usually in the filter already
+                if jti not in bloom:
+                    bloom.add(jti)
+            self._filter = bloom
+            self._read_at = read_at
+            self._refreshed_at = now
+            self._counters['refreshes'] += 1
+        finally:
+            self._lock.release()
+
+    def might_be_revoked(self, jti):
+        """The bloom filter check; ``None`` when the filter needs a refresh first"""
+        if self._stale():
+            return None
+        return jti in self._filter
+
+    def is_revoked(self, jti):
+        if not jti:
+            return False
+        candidate = self.might_be_revoked(jti)
+        if candidate is None:
+            self.refresh()
+            candidate = jti in self._filter
+        if not candidate:
+            return False
+        return self._confirm(jti)
+
+    async def ais_revoked(self, jti):
+        """``is_revoked`` for async code: only refreshes and confirmations leave the loop"""
+        if not jti:
+            return False
+        candidate = self.might_be_revoked(jti)
+        if candidate is None:
+            await sync_to_async(self.refresh)()
+            candidate = jti in self._filter
+        if not candidate:
+            return False
+        return await sync_to_async(self._confirm)(jti)
+
+    def _confirm(self, jti):
+        key = self._key(jti)
+        revoked = self.shared.get(key)
+        if revoked is None:
+            expires_at = RevokedToken.objects.filter(jti=jti).values_list('expires_at', flat=True).first()
+            revoked = expires_at is not None
+            self.shared.set(key, revoked, timeout=self._ttl(expires_at) if revoked else _setting('NEGATIVE_TTL'))
+        with self._lock:
+            self._counters['filter_hits'] += 1
+            self._counters['revoked'] += revoked
+        return revoked
+
+    def revoke(self, token, user_id=None):
+        """
+        Revoke a validated token until it expires.
+
+        Returns False if it had already been revoked, which lets callers
+        treat a second use of a rotated refresh token as reuse.
+        """
+        jti = token[api_settings.JTI_CLAIM]
+        expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(
+                    jti=jti,
+                    token_type=token.get(api_settings.TOKEN_TYPE_CLAIM, ''),
+                    user_id=user_id or token.get(api_settings.USER_ID_CLAIM),
+                    expires_at=expires_at,
+                )
+        except IntegrityError:
+            return False
+
+        # Visible at once in this process, and in the others through the
+        # cache as soon as their filters pick the row up
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+        self.shared.set(self._key(jti), True, timeout=self._ttl(expires_at))
+        return True
+
+    @staticmethod
+    def _ttl(expires_at):
+        return max(1, int((expires_at - timezone.now()).total_seconds()))
+
+    def purge_expired(self):
+        """Delete rows for tokens past their expiry; returns how many"""
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['filter_size'] = self._filter.count if self._filter is not None else 0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._filter = None
+            self._read_at = None
+            self._refreshed_at = self._rebuilt_at = 0.0
+            self._counters = dict.fromkeys(self._counters, 0)
+
+
+revocation_list = RevocationList()
@@ -1,7 +1,13 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth.password_validation import validate_password
+from .authentication import StatelessJWTAuthentication, add_user_claims
+from .cache import token_versions, user_cache
 from .models import User
+from .revocation import revocation_list
+from .tokens import RefreshToken
 from .utils import validate_unique_email, validate_unique_username, validate_password_confirmation
 
 
@@ -9,24 +15,100 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Custom JWT token serializer that includes user role and details
     """
+    token_class = RefreshToken
+    
+    @classmethod
+    def get_token(cls, user):
+        """
+        Embed role, status and token version so requests can be authorized
+        without loading the user row
+        """
+        token_versions.prime(user)
+        return cls.claims_token(user)
+
+    @classmethod
+    def claims_token(cls, user):
+        """``get_token`` without priming the token version cache"""
+        return add_user_claims(super().get_token(user), user)
+    
+    @staticmethod
+    def user_data(user):
+        """User details returned alongside the tokens"""
+        return {
+            'id': user.id,
+            'email': user.email,
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'role': user.role,
+            'is_admin': user.is_admin,
+            'full_name': user.full_name,
+        }
     
     def validate(self, attrs):
         data = super().validate(attrs)
-        
-        data['user'] = {
-            'id': self.user.id,
-            'email': self.user.email,
-            'username': self.user.username,
-            'first_name': self.user.first_name,
-            'last_name': self.user.last_name,
-            'role': self.user.role,
-            'is_admin': self.user.is_admin,
-            'full_name': self.user.full_name,
-        }
-        
+        data['user'] = self.user_data(self.user)
         return data
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh backed by the revocation list instead of simplejwt's
+    blacklist app: revoked refresh tokens are rejected and, with
+    ``BLACKLIST_AFTER_ROTATION``, a rotated token is revoked so a second
+    use of it fails.
+
+    The user is read from the caches, but rotation still inserts one
+    ``RevokedToken`` row per refresh. That write is deliberate: the unique
+    ``jti`` insert is what makes two refreshes of the same token race safely
+    and exposes reuse, and the rows are purged once the old token expires.
+    Disable ``BLACKLIST_AFTER_ROTATION`` to trade reuse detection for a
+    write-free refresh.
+    """
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if revocation_list.is_revoked(refresh.get(api_settings.JTI_CLAIM)):
+            raise StatelessJWTAuthentication.revoked()
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id:
+            user_id = User._meta.pk.to_python(user_id)
+            version = token_versions.get(user_id)
+            user = user_cache.get(user_id, version) if version is not None else None
+            self.check_user(refresh, user, version)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not revocation_list.revoke(refresh):
+                # Lost a race with another refresh of the same token
+                raise StatelessJWTAuthentication.revoked()
+            self.rotate(refresh)
+            data['refresh'] = str(refresh)
+        return data
+
+    @classmethod
+    def check_user(cls, refresh, user, version):
+        """
+        Refuse inactive users and tokens from before the last version bump,
+        and carry the user's current claims into the new tokens
+        """
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                cls.default_error_messages['no_active_account'], 'no_active_account'
+            )
+        StatelessJWTAuthentication.check_token_version(refresh, version)
+        add_user_claims(refresh, user)
+
+    @staticmethod
+    def rotate(refresh):
+        """Turn ``refresh`` into a new token with the same claims"""
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """
     Serializer for user registration
@@ -69,11 +151,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         """
         Create user with hashed password
         """
-        password = validated_data.pop('password')
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
-        return user
+        # create_user hashes the password once and inserts the row once
+        return User.objects.create_user(**validated_data)
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import token_versions, user_cache
+from .models import CREDENTIAL_FIELDS, User
+from .stored_state import UNCHANGED, stored_state, track_fields
+
+track_fields(User, CREDENTIAL_FIELDS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, update_fields=None, **kwargs):
+    """Drop the cached copy (and token version, if written) whenever a user row changes"""
+    user_cache.invalidate(instance.pk)
+    if update_fields is None or 'token_version' in update_fields:
+        token_versions.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def bump_token_version_on_credential_change(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Invalidate the user's outstanding tokens when a save (from a view, the
+    admin or the shell) changed their role, status or password
+    """
+    previous = stored_state(instance, CREDENTIAL_FIELDS, update_fields)
+    if previous is None or previous is UNCHANGED:
+        return
+    if credentials_changed(previous, instance):
+        instance.token_version = token_versions.bump(instance.pk)
+
+
+def credentials_changed(previous, instance):
+    """
+    Whether the role or status changed, or a new password was set. A new
+    hash alone is not enough: ``check_password`` rehashes on login when the
+    hasher or its cost changed, and clears ``_password`` (which
+    ``set_password`` sets) so that the upgrade is not taken for a change.
+    """
+    if previous['role'] != instance.role or previous['is_active'] != instance.is_active:
+        return True
+    if previous['password'] == instance.password:
+        return False
+    return instance._password is not None or not instance.has_usable_password()
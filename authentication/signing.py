@@ -0,0 +1,214 @@
+"""
+Asymmetric JWT signing from a local JWKS file.
+
+With ``JWT_SIGNING['JWKS_FILE']`` set, tokens are signed with the active
+private key of the file (RS256, ES256 or EdDSA; ``cryptography`` must be
+installed) and carry its ``kid`` header. Every key in the file can verify,
+so keys are rotated by adding the new one, making it active and removing
+the old one once the tokens it signed have expired. Keys are parsed once
+and reloaded when the file changes; ``public_jwks()`` is what other
+services need to verify access tokens on their own.
+
+Without a JWKS file simplejwt's HS256 backend (``SECRET_KEY``) is used.
+"""
+import json
+import os
+import threading
+import time
+
+import jwt
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from jwt import ExpiredSignatureError, InvalidTokenError, algorithms
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+
+JWT_SIGNING_DEFAULTS = {
+    'JWKS_FILE': None,
+    'ACTIVE_KID': None,
+    'RELOAD_INTERVAL': 30,
+}
+
+# JWK members that must never leave this service
+PRIVATE_MEMBERS = {'d', 'p', 'q', 'dp', 'dq', 'qi', 'oth', 'k'}
+
+
+def _setting(name):
+    return getattr(settings, 'JWT_SIGNING', {}).get(name, JWT_SIGNING_DEFAULTS[name])
+
+
+class KeyRing:
+    """
+    Parsed keys of a JWKS file by ``kid``, reloaded at most every
+    ``RELOAD_INTERVAL`` seconds when the file has changed
+    """
+
+    def __init__(self, path, active_kid=None):
+        self.path = path
+        self.active_kid = active_kid
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._keys = {}
+        self._public = []
+        self._signing = None
+
+    def _load(self):
+        try:
+            with open(self.path) as fh:
+                document = json.load(fh)
+        except (OSError, ValueError) as exc:
+            raise ImproperlyConfigured(f'Cannot read JWKS file {self.path}: {exc}')
+
+        keys, public, signing = {}, [], None
+        for jwk in document.get('keys', []):
+            kid = jwk.get('kid')
+            if not kid:
+                raise ImproperlyConfigured(f'Every key in {self.path} needs a "kid"')
+            if jwk.get('kty') != 'oct' and not algorithms.has_crypto:
+                raise ImproperlyConfigured(
+                    f'Key {kid!r} is a {jwk.get("kty")} key; install "cryptography" to use it'
+                )
+            try:
+                parsed = jwt.PyJWK(jwk)
+            except (jwt.PyJWKError, jwt.InvalidKeyError) as exc:
+                raise ImproperlyConfigured(f'Key {kid!r} in {self.path}: {exc}')
+
+            private = 'd' in jwk or jwk.get('kty') == 'oct'
+            verifying = parsed.key.public_key() if hasattr(parsed.key, 'public_key') else parsed.key
+            keys[kid] = (parsed.algorithm_name, verifying)
+            if private and (self.active_kid is None or kid == self.active_kid):
+                # The last private key in the file unless one is named
+                signing = (kid, parsed.algorithm_name, parsed.key)
+            if jwk.get('kty') != 'oct':
+                public.append({
+                    **{name: value for name, value in jwk.items() if name not in PRIVATE_MEMBERS},
+                    'alg': parsed.algorithm_name,
+                    'use': 'sig',
+                })
+
+        if signing is None:
+            name = f' {self.active_kid!r}' if self.active_kid else ''
+            raise ImproperlyConfigured(f'No private key{name} to sign with in {self.path}')
+        self._keys, self._public, self._signing = keys, public, signing
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        if self._signing is not None and now - self._checked_at < _setting('RELOAD_INTERVAL'):
+            return
+        with self._lock:
+            if self._signing is not None and now - self._checked_at < _setting('RELOAD_INTERVAL'):
+                return
+            mtime = os.stat(self.path).st_mtime if os.path.exists(self.path) else None
+            if self._signing is None or mtime != self._mtime:
+                self._load()
+                self._mtime = mtime
+            self._checked_at = now
+
+    def signing_key(self):
+        """``(kid, algorithm, key)`` of the key new tokens are signed with"""
+        self._ensure_loaded()
+        return self._signing
+
+    def verifying_key(self, kid):
+        """``(algorithm, key)`` for ``kid``, or None for an unknown key"""
+        self._ensure_loaded()
+        return self._keys.get(kid)
+
+    def public_jwks(self):
+        """The JWKS document of the public keys"""
+        self._ensure_loaded()
+        return {'keys': list(self._public)}
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    simplejwt token backend signing with a ``KeyRing``: the ``kid`` header
+    selects the verifying key, and each key only accepts its own algorithm
+    """
+
+    def __init__(self, key_ring, audience=None, issuer=None, leeway=None, json_encoder=None):
+        self.key_ring = key_ring
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.json_encoder = json_encoder
+        self.jwks_client = None
+
+    @property
+    def algorithm(self):
+        return self.key_ring.signing_key()[1]
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        kid, algorithm, key = self.key_ring.signing_key()
+        return jwt.encode(
+            jwt_payload, key, algorithm=algorithm, headers={'kid': kid}, json_encoder=self.json_encoder
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except InvalidTokenError as exc:
+            raise TokenBackendError(_('Token is invalid')) from exc
+        entry = self.key_ring.verifying_key(kid) if kid else None
+        if entry is None:
+            raise TokenBackendError(_('Token is invalid'))
+        algorithm, key = entry
+
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={
+                    'verify_aud': self.audience is not None,
+                    'verify_signature': verify,
+                },
+            )
+        except ExpiredSignatureError as exc:
+            raise TokenBackendExpiredToken(_('Token is expired')) from exc
+        except InvalidTokenError as exc:
+            raise TokenBackendError(_('Token is invalid')) from exc
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_token_backend():
+    """The key ring backend when a JWKS file is configured, else simplejwt's"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = _setting('JWKS_FILE')
+                if path:
+                    _backend = KeyRingTokenBackend(
+                        KeyRing(path, _setting('ACTIVE_KID')),
+                        api_settings.AUDIENCE,
+                        api_settings.ISSUER,
+                        api_settings.LEEWAY,
+                        api_settings.JSON_ENCODER,
+                    )
+                else:
+                    from rest_framework_simplejwt.state import token_backend
+                    _backend = token_backend
+    return _backend
+
+
+def reset_token_backend():
+    """Forget the backend, e.g. after changing ``JWT_SIGNING`` in tests"""
+    global _backend
+    with _backend_lock:
+        _backend = None
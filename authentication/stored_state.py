@@ -0,0 +1,64 @@
+"""
+Stored values of a row, read once before it is saved.
+
+Several post_save receivers compare what a save wrote with what was stored
+before it: the counters, token versions, the search index and the catalogue
+version. Each declares the fields it needs with ``track_fields``; a single
+pre_save receiver per model reads all of them in one query and leaves them
+on the instance, where ``stored_state`` picks out the ones a receiver asked
+for. Saves with ``update_fields`` only read the fields of the receivers
+they can affect, and skip the query when they affect none.
+"""
+from collections import defaultdict
+
+from django.db.models.signals import pre_save
+
+# Marks a save that cannot have touched any of the requested fields
+UNCHANGED = object()
+
+_tracked = defaultdict(list)
+
+
+def attnames(model, fields):
+    """Column attribute names of ``fields`` (names or attnames) on ``model``"""
+    return [model._meta.get_field(field).attname for field in fields]
+
+
+def track_fields(model, fields):
+    """Read the stored values of ``fields`` before every save of ``model``"""
+    if model not in _tracked:
+        pre_save.connect(
+            remember_stored_state, sender=model, dispatch_uid=f'stored_state:{model._meta.label}'
+        )
+    _tracked[model].append(frozenset(attnames(model, fields)))
+
+
+def remember_stored_state(sender, instance, update_fields=None, **kwargs):
+    """Stash the stored values of every tracked field of ``instance`` (pre_save)"""
+    groups = _tracked[sender]
+    if update_fields is not None:
+        updated = set(attnames(sender, update_fields))
+        groups = [group for group in groups if group & updated]
+    fields = sorted(set().union(*groups))
+    if instance._state.adding:
+        state = None
+    elif not fields:
+        state = {}
+    else:
+        state = sender._base_manager.filter(pk=instance.pk).values(*fields).first()
+    instance._stored_state = state
+
+
+def stored_state(instance, fields, update_fields=None):
+    """
+    The values of ``fields`` stored before the save being handled (post_save):
+    ``UNCHANGED`` if ``update_fields`` excludes all of them, ``None`` if the
+    row is new
+    """
+    columns = attnames(type(instance), fields)
+    if update_fields is not None and not set(columns) & set(attnames(type(instance), update_fields)):
+        return UNCHANGED
+    state = instance.__dict__.get('_stored_state')
+    if state is None:
+        return None
+    return {field: state[column] for field, column in zip(fields, columns)}
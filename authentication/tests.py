@@ -0,0 +1,749 @@
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+import jwt
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .cache import token_versions, user_cache
+from .management.commands.benchmark_api import Command as BenchmarkCommand, percentile
+from .metrics import Histogram, registry
+from .counters import apply_deltas, read_counters, verify_counters
+from .models import Counter, RevokedToken, User
+from .permissions import IsOwnerOrAdmin, IsOwnerOrAdminOrModerator, PermissionScopeFilter
+from products.models import Category, Product
+from products.seeding import seed_catalogue
+from .query_patterns import NPlusOneError, QueryPatternMiddleware, detect_n_plus_one
+from .revocation import revocation_list
+from .signing import PRIVATE_MEMBERS, get_token_backend, reset_token_backend
+from .tokens import AccessToken
+from .verifier import IS_ACTIVE_CLAIM, ROLE_CLAIM, TOKEN_VERSION_CLAIM, InvalidToken, TokenVerifier
+from .throttling import CacheWindowStore, reset_throttles, throttle_stats
+
+PASSWORD = 'Str0ngPassw0rd!'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class APITestCase(TestCase):
+    """
+    Starts every test with empty caches, throttles and revocation filter,
+    and hashes passwords cheaply
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        user_cache.clear()
+        reset_throttles()
+        revocation_list.clear()
+        reset_token_backend()
+        self.client = APIClient()
+
+    @staticmethod
+    def create_user(email, role='user', **kwargs):
+        return User.objects.create_user(
+            username=email.split('@')[0], email=email, password=PASSWORD,
+            first_name='Test', last_name='User', role=role, **kwargs
+        )
+
+    def login(self, email, client=None, password=PASSWORD):
+        client = client or self.client
+        response = client.post('/api/auth/login/', {'email': email, 'password': password}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data
+
+
+class TokenVersionTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user@example.com')
+        self.access = self.login('user@example.com')['access']
+
+    def assertSignedOut(self):
+        self.assertEqual(self.client.get('/api/auth/user-info/').status_code, 401)
+
+    def test_role_change_outside_views_signs_out(self):
+        self.user.role = 'moderator'
+        self.user.save()
+        self.assertEqual(self.user.token_version, 1)
+        self.assertSignedOut()
+
+    def test_deactivation_outside_views_signs_out(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        self.assertSignedOut()
+
+    def test_password_change_outside_views_signs_out(self):
+        self.user.set_password('An0therPassw0rd!')
+        self.user.save()
+        self.assertSignedOut()
+
+    def test_unusable_password_signs_out(self):
+        self.user.set_unusable_password()
+        self.user.save()
+        self.assertSignedOut()
+
+    @override_settings(
+        PASSWORD_HASHERS=['authentication.hashing.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'],
+        PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000},
+    )
+    def test_hash_upgrade_on_login_keeps_sessions(self):
+        self.login('user@example.com', APIClient())
+        self.assertTrue(User.objects.get(pk=self.user.pk).password.startswith('pbkdf2_sha256$1000$'))
+        self.assertEqual(token_versions.get(self.user.pk), 0)
+        self.assertEqual(self.client.get('/api/auth/user-info/').status_code, 200)
+
+    @override_settings(
+        PASSWORD_HASHERS=['authentication.hashing.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'],
+        PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000},
+    )
+    async def test_hash_upgrade_on_async_login_keeps_sessions(self):
+        response = await self.async_client.post(
+            '/api/async/auth/login/', {'email': 'user@example.com', 'password': PASSWORD},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertEqual(user.token_version, 0)
+        # Read from the database rather than the version the login primed
+        token_versions.invalidate(self.user.pk)
+        for access in (response.json()['access'], self.access):
+            response = await self.async_client.get(
+                '/api/async/auth/user-info/', headers={'Authorization': f'Bearer {access}'}
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+
+    def test_queryset_update_signs_out(self):
+        User.objects.filter(pk=self.user.pk).update(role='admin')
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 1)
+        self.assertSignedOut()
+
+    def test_other_changes_keep_sessions(self):
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        User.objects.filter(pk=self.user.pk).update(last_name='Renamed')
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 0)
+        self.assertEqual(self.client.get('/api/auth/user-info/').status_code, 200)
+
+    def test_view_change_bumps_once(self):
+        admin = self.create_user('admin@example.com', role='admin')
+        admin_client = APIClient()
+        self.login(admin.email, admin_client)
+        response = admin_client.patch(f'/api/users/{self.user.pk}/', {'role': 'moderator'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(token_versions.get(self.user.pk), 1)
+        self.assertSignedOut()
+
+
+class SessionRevocationTests(APITestCase):
+    """Bumping the token version signs out every session of the user"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user@example.com')
+        self.tokens = self.login('user@example.com')
+
+    def refresh(self, refresh, path='/api/auth/token/refresh/'):
+        return APIClient().post(path, {'refresh': refresh}, format='json')
+
+    def test_password_change_issues_the_only_valid_pair(self):
+        other = APIClient()
+        self.login('user@example.com', other)
+        response = self.client.post('/api/auth/change-password/', {
+            'old_password': PASSWORD, 'new_password': 'An0therPassw0rd!', 'new_password_confirm': 'An0therPassw0rd!',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(other.get('/api/auth/user-info/').status_code, 401)
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/api/auth/user-info/').status_code, 200)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+
+    def test_bump_rejects_old_tokens_everywhere(self):
+        self.assertEqual(token_versions.bump(self.user.pk), 1)
+        for path in ('/api/auth/user-info/', '/api/async/auth/user-info/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 401)
+        for path in ('/api/auth/token/refresh/', '/api/async/auth/token/refresh/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.refresh(self.tokens['refresh'], path).status_code, 401)
+
+    def test_tokens_carry_the_version(self):
+        token_versions.bump(self.user.pk)
+        tokens = self.login('user@example.com', APIClient())
+        access = AccessToken(self.refresh(tokens['refresh']).data['access'])
+        self.assertEqual(
+            (access[ROLE_CLAIM], access[IS_ACTIVE_CLAIM], access[TOKEN_VERSION_CLAIM]), ('user', True, 1)
+        )
+
+    def test_login_primes_the_version(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(token_versions.get(self.user.pk), 0)
+
+
+class CredentialThrottleOrderTests(APITestCase):
+    """The credential throttles stop at the first rejection, IP first"""
+    paths = ('/api/auth/login/', '/api/async/auth/login/')
+
+    def setUp(self):
+        super().setUp()
+        self.rates = self.settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'login.ip': '2/min', 'login.identity': '4/min', 'login.global': '4/min'},
+        })
+        self.rates.enable()
+        self.addCleanup(self.rates.disable)
+
+    @staticmethod
+    def reset_windows():
+        for cache in caches.all():
+            cache.clear()
+        reset_throttles()
+
+    def attempt(self, path, email, ip):
+        return self.client.post(
+            path, {'email': email, 'password': 'wrong'}, format='json', REMOTE_ADDR=ip
+        ).status_code
+
+    def flood(self, path, email, ip, count=5):
+        return [self.attempt(path, email, ip) for _ in range(count)]
+
+    def test_ip_rejections_not_charged_globally(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                self.reset_windows()
+                self.assertEqual(self.flood(path, 'a@example.com', '10.0.0.1'), [401, 401, 429, 429, 429])
+                # Only the two admitted attempts used the global window
+                self.assertEqual(self.flood(path, 'b@example.com', '10.0.0.2', 2), [401, 401])
+
+    def test_ip_rejections_not_charged_to_identity(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                self.reset_windows()
+                self.flood(path, 'victim@example.com', '10.0.0.1')
+                self.assertEqual(self.flood(path, 'victim@example.com', '10.0.0.2', 2), [401, 401])
+
+    def test_rejection_counted_once(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                self.reset_windows()
+                # The third attempt is over both the IP and the identity limit
+                self.flood(path, 'a@example.com', '10.0.0.1', 2)
+                self.flood(path, 'a@example.com', '10.0.0.2', 2)
+                self.assertEqual(self.attempt(path, 'a@example.com', '10.0.0.1'), 429)
+                self.assertEqual(throttle_stats()['login'], {'rejected': 1, 'hashes_avoided': 1})
+
+
+class AsyncCacheCallTests(APITestCase):
+    """Async login awaits the throttle windows and the token version cache"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_user('user@example.com')
+        self.rates = self.settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'login.ip': '2/min'},
+        })
+        self.rates.enable()
+        self.addCleanup(self.rates.disable)
+        blocking = mock.Mock(side_effect=AssertionError('sync cache call on the event loop'))
+        for target in ('authentication.throttling.CacheWindowStore.hit', 'authentication.cache.TokenVersionMap.prime'):
+            patcher = mock.patch(target, blocking)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def login_async(self):
+        return await self.async_client.post(
+            '/api/async/auth/login/', {'email': 'user@example.com', 'password': PASSWORD},
+            content_type='application/json',
+        )
+
+    async def test_login_is_throttled_and_primes_the_version(self):
+        response = await self.login_async()
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(await user_cache.shared.aget(token_versions._key(response.json()['user']['id'])), 0)
+        self.assertEqual((await self.login_async()).status_code, 200)
+        self.assertEqual((await self.login_async()).status_code, 429)
+
+
+class CacheWindowStoreTests(APITestCase):
+
+    async def test_sync_and_async_hits_share_windows(self):
+        store = CacheWindowStore()
+        self.assertEqual(await sync_to_async(store.hit)('key', 2, 60, 30.0), (True, 0))
+        self.assertEqual(await store.ahit('key', 2, 60, 30.0), (True, 0))
+        self.assertFalse((await store.ahit('key', 2, 60, 30.0))[0])
+        self.assertFalse((await sync_to_async(store.hit)('key', 2, 60, 30.0))[0])
+
+
+class RevocationRefreshTests(APITestCase):
+    """Incremental refreshes pick up rows whatever order they commit in"""
+
+    def revoked(self, pk, jti, seconds_ago=0):
+        RevokedToken.objects.create(
+            pk=pk, jti=jti, token_type='access', expires_at=timezone.now() + timedelta(hours=1)
+        )
+        RevokedToken.objects.filter(pk=pk).update(revoked_at=timezone.now() - timedelta(seconds=seconds_ago))
+
+    def test_lower_pk_committed_after_refresh(self):
+        self.revoked(10, 'newer')
+        revocation_list.refresh()
+        # A slower writer that was allocated a lower id commits afterwards,
+        # with its revocation time before that read
+        self.revoked(5, 'older', seconds_ago=1)
+        revocation_list.refresh()
+        self.assertTrue(revocation_list.is_revoked('older'))
+        self.assertTrue(revocation_list.is_revoked('newer'))
+
+    def test_overlap_rows_added_once(self):
+        self.revoked(1, 'first')
+        revocation_list.refresh()
+        revocation_list.refresh()
+        self.assertEqual(revocation_list.stats()['filter_size'], 1)
+
+
+class QueryPatternTests(APITestCase):
+    """N+1 detection in blocks and requests"""
+
+    def setUp(self):
+        super().setUp()
+        for index in range(6):
+            user = self.create_user(f'user{index}@example.com')
+            RevokedToken.objects.create(
+                jti=f'jti-{index}', token_type='access', user=user,
+                expires_at=timezone.now() + timedelta(hours=1),
+            )
+
+    @staticmethod
+    def owner_emails(queryset):
+        return [token.user.email for token in queryset.order_by('pk')]
+
+    def test_block_raises_on_per_row_queries(self):
+        with self.assertRaisesMessage(NPlusOneError, 'authentication/tests.py'):
+            with detect_n_plus_one():
+                self.owner_emails(RevokedToken.objects.all())
+
+    def test_block_allows_select_related(self):
+        with detect_n_plus_one():
+            emails = self.owner_emails(RevokedToken.objects.select_related('user'))
+        self.assertEqual(len(emails), 6)
+
+    def test_counter_updates_are_not_reported(self):
+        deltas = {f'test:{index}': 1 for index in range(10)}
+        with detect_n_plus_one():
+            apply_deltas(deltas)
+        self.assertEqual(set(read_counters(list(deltas)).values()), {1})
+
+    def middleware(self):
+        def view(request):
+            self.owner_emails(RevokedToken.objects.all())
+            return HttpResponse()
+        return QueryPatternMiddleware(view)
+
+    @override_settings(QUERY_PATTERNS={'RAISE': True})
+    def test_middleware_raises(self):
+        with self.assertRaisesMessage(NPlusOneError, 'GET /tokens/'):
+            self.middleware()(RequestFactory().get('/tokens/'))
+
+    @override_settings(QUERY_PATTERNS={'RAISE': False, 'SAMPLE_RATE': 1.0})
+    def test_middleware_logs_sampled_requests(self):
+        with self.assertLogs('authentication.query_patterns', 'WARNING') as logs:
+            response = self.middleware()(RequestFactory().get('/tokens/'))
+        self.assertEqual(response.status_code, 200)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['event'], entry['path'], entry['count']), ('n_plus_one', '/tokens/', 6))
+        self.assertTrue(entry['origin'].startswith('authentication/tests.py:'))
+
+    @override_settings(QUERY_PATTERNS={'RAISE': False, 'SAMPLE_RATE': 0.0})
+    def test_middleware_skips_unsampled_requests(self):
+        with self.assertNoLogs('authentication.query_patterns', 'WARNING'):
+            self.middleware()(RequestFactory().get('/tokens/'))
+
+
+class UserCacheTests(APITestCase):
+    """Resolved users are served from the cache until their row changes"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user@example.com')
+
+    def test_repeat_lookups_skip_the_database(self):
+        user_cache.get(self.user.pk)
+        with self.assertNumQueries(0):
+            cached = user_cache.get(self.user.pk)
+        self.assertEqual(cached.email, 'user@example.com')
+        self.assertEqual(user_cache.stats()['local_hits'], 1)
+
+    def test_shared_tier_serves_other_processes(self):
+        user_cache.get(self.user.pk)
+        user_cache.clear()  # a process with an empty local tier
+        with self.assertNumQueries(0):
+            user_cache.get(self.user.pk)
+        self.assertEqual(user_cache.stats()['shared_hits'], 1)
+
+    def test_save_invalidates(self):
+        user_cache.get(self.user.pk)
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        self.assertEqual(user_cache.get(self.user.pk).first_name, 'Renamed')
+
+    def test_other_token_version_is_a_miss(self):
+        user_cache.get(self.user.pk)
+        with self.assertNumQueries(1):
+            user_cache.get(self.user.pk, token_version=5)
+
+    def test_callers_get_copies(self):
+        user_cache.get(self.user.pk).first_name = 'Changed'
+        self.assertEqual(user_cache.get(self.user.pk).first_name, 'Test')
+
+    def test_authenticated_requests_reuse_the_cached_user(self):
+        self.login('user@example.com')
+        self.client.get('/api/auth/profile/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 200)
+
+
+class RebuildCountersCommandTests(APITestCase):
+    """rebuild_counters reports drift with --verify and repairs it"""
+
+    def test_verify_then_rebuild(self):
+        self.create_user('user@example.com')
+        Counter.objects.filter(key='users:total').update(value=7)
+        with self.assertRaisesMessage(CommandError, 'out of sync'):
+            call_command('rebuild_counters', '--verify', stdout=StringIO())
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(verify_counters(), {})
+        output = StringIO()
+        call_command('rebuild_counters', '--verify', stdout=output)
+        self.assertIn('in sync', output.getvalue())
+
+
+def selects_from(queries, table):
+    """The SELECTs among ``queries`` that read ``table``"""
+    return [query['sql'] for query in queries if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']]
+
+
+class StoredStateTests(APITestCase):
+    """post_save receivers share one read of the stored row per save"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user@example.com')
+
+    def test_save_reads_the_row_once(self):
+        self.user.first_name = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+        self.assertEqual(len(selects_from(queries.captured_queries, 'auth_user')), 1)
+
+    def test_untracked_update_fields_skip_the_read(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save(update_fields=['last_login'])
+        self.assertEqual(selects_from(queries.captured_queries, 'auth_user'), [])
+
+    def test_partial_update_fields_still_see_related_fields(self):
+        # role alone is written, but the counters compare is_active too
+        self.user.role = 'moderator'
+        self.user.save(update_fields=['role'])
+        self.assertEqual(verify_counters(), {})
+
+
+@skipUnless(jwt.algorithms.has_crypto, 'needs the cryptography package')
+class KeyRingTestCase(APITestCase):
+    """Signs tokens from a temporary JWKS file holding the key ``first``"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_user('user@example.com')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.jwks_file = os.path.join(directory.name, 'jwks.json')
+        self.signing = self.settings(JWT_SIGNING={'JWKS_FILE': self.jwks_file, 'RELOAD_INTERVAL': 0})
+        self.signing.enable()
+        self.addCleanup(self.signing.disable)
+        self.addCleanup(reset_token_backend)
+        self.add_key('first')
+        reset_token_backend()
+
+    def add_key(self, kid, algorithm='EdDSA'):
+        call_command('generate_signing_key', algorithm=algorithm, kid=kid, jwks_file=self.jwks_file, stdout=StringIO())
+        # Make the change visible even within the file system's mtime resolution
+        modified = time.time() + len(kid)
+        os.utime(self.jwks_file, (modified, modified))
+
+
+class KeyRingSigningTests(KeyRingTestCase):
+    """Tokens are signed by the active key of the JWKS file and verified by any of its keys"""
+
+    def test_tokens_name_the_signing_key(self):
+        tokens = self.login('user@example.com')
+        self.assertEqual(jwt.get_unverified_header(tokens['access']), {'alg': 'EdDSA', 'kid': 'first', 'typ': 'JWT'})
+        self.assertEqual(self.client.get('/api/auth/user-info/').status_code, 200)
+
+    def test_rotation_keeps_earlier_tokens_valid(self):
+        tokens = self.login('user@example.com')
+        self.add_key('second', 'ES256')
+        self.assertEqual(self.client.get('/api/auth/user-info/').status_code, 200)
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(jwt.get_unverified_header(response.data['access'])['kid'], 'second')
+
+    def test_active_kid_overrides_the_last_key(self):
+        self.add_key('second')
+        with self.settings(JWT_SIGNING={'JWKS_FILE': self.jwks_file, 'ACTIVE_KID': 'first'}):
+            reset_token_backend()
+            self.assertEqual(get_token_backend().key_ring.signing_key()[0], 'first')
+
+    def test_unknown_kid_is_rejected(self):
+        forged = jwt.encode(
+            {'user_id': 1, 'token_type': 'access', 'exp': int(time.time()) + 60},
+            'x' * 32, algorithm='HS256', headers={'kid': 'first'},
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {forged}')
+        # A known kid only accepts its own algorithm
+        self.assertEqual(self.client.get('/api/auth/user-info/').status_code, 401)
+
+    def test_public_jwks_leaves_out_private_members(self):
+        keys = get_token_backend().key_ring.public_jwks()['keys']
+        self.assertEqual([key['kid'] for key in keys], ['first'])
+        self.assertFalse(PRIVATE_MEMBERS & keys[0].keys())
+
+    def test_generate_refuses_duplicate_kid(self):
+        with self.assertRaises(CommandError):
+            self.add_key('first')
+
+
+class JWKSTests(KeyRingTestCase):
+    """Other services verify access tokens with the published keys"""
+
+    def setUp(self):
+        super().setUp()
+        self.tokens = self.login('user@example.com')
+
+    def jwks(self):
+        response = self.client.get('/.well-known/jwks.json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_document(self):
+        response = self.client.get('/api/auth/jwks/')
+        self.assertEqual(response.json(), get_token_backend().key_ring.public_jwks())
+        self.assertEqual(response['Cache-Control'], 'public, max-age=300')
+        self.assertEqual(self.jwks(), response.json())
+
+    def test_shared_secret_publishes_nothing(self):
+        with self.settings(JWT_SIGNING={}):
+            reset_token_backend()
+            self.assertEqual(self.client.get('/.well-known/jwks.json').status_code, 404)
+
+    def test_verifier_accepts_access_tokens(self):
+        claims = TokenVerifier(jwks=self.jwks()).verify(self.tokens['access'])
+        self.assertEqual((claims.role, claims.token_version), ('user', 0))
+        self.assertEqual(claims.user_id, str(self.tokens['user']['id']))
+
+    def test_verifier_rejects(self):
+        verifier = TokenVerifier(jwks=self.jwks())
+        self.add_key('second')
+        other = self.login('user@example.com', APIClient())
+        for token in (self.tokens['refresh'], other['access'], 'not-a-token'):
+            with self.subTest(token=token[:20]):
+                with self.assertRaises(InvalidToken):
+                    verifier.verify(token)
+
+    def test_verifier_fetches_keys_for_unknown_kids(self):
+        self.add_key('second')
+        token = self.login('user@example.com', APIClient())['access']
+        document = json.dumps(self.jwks()).encode()
+        verifier = TokenVerifier('https://auth.example.com/.well-known/jwks.json', jwks={'keys': []})
+        with mock.patch('urllib.request.urlopen', return_value=BytesIO(document)) as urlopen:
+            self.assertEqual(verifier.verify(token).user_id, str(self.tokens['user']['id']))
+            verifier.verify(token)
+        urlopen.assert_called_once()
+
+    def test_verified_tokens_are_cached(self):
+        verifier = TokenVerifier(jwks=self.jwks())
+        verifier.verify(self.tokens['access'])
+        with mock.patch.object(verifier, '_decode') as decode:
+            verifier.verify(self.tokens['access'])
+        decode.assert_not_called()
+
+
+class RequestMetricsTests(APITestCase):
+    """Per-route request metrics, scraped in the Prometheus text format"""
+
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+        self.addCleanup(registry.clear)
+        self.create_user('admin@example.com', role='admin')
+        self.login('admin@example.com')
+
+    def scrape(self):
+        response = self.client.get('/api/auth/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return dict(line.rsplit(' ', 1) for line in response.content.decode().splitlines() if not line.startswith('#'))
+
+    def test_records_per_route(self):
+        self.client.get('/api/users/')
+        self.client.get('/api/users/')
+        self.client.get('/api/users/999999/')
+        samples = self.scrape()
+        self.assertEqual(samples['http_responses_total{route="users:user_list_create",status="200"}'], '2')
+        self.assertEqual(samples['http_responses_total{route="users:user_detail",status="404"}'], '1')
+        self.assertEqual(samples['http_request_duration_seconds_count{route="users:user_list_create"}'], '2')
+        self.assertGreater(int(samples['http_request_queries_sum{route="users:user_list_create"}']), 0)
+        self.assertGreater(float(samples['http_response_size_bytes_sum{route="users:user_list_create"}']), 0)
+        # Scrapes are not recorded
+        self.assertFalse(any('authentication:metrics' in sample for sample in samples))
+
+    def test_async_views_are_recorded(self):
+        self.client.get('/api/async/auth/user-info/')
+        samples = self.scrape()
+        self.assertEqual(samples['http_responses_total{route="authentication_async:user_info",status="200"}'], '1')
+
+    def test_gauges(self):
+        samples = self.scrape()
+        self.assertIn('user_cache_events{event="misses"}', samples)
+        self.assertIn('user_cache_hit_ratio', samples)
+
+    def test_admin_only(self):
+        self.create_user('user@example.com')
+        self.login('user@example.com')
+        self.assertEqual(self.client.get('/api/auth/metrics/').status_code, 403)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 3, 9):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.cumulative()), [(1, 2), (5, 3), ('+Inf', 4)])
+        self.assertEqual((histogram.sum, histogram.count), (13, 4))
+
+
+class BenchmarkApiCommandTests(APITestCase):
+    """benchmark_api measures each scenario against the seeded data"""
+
+    def options(self, **options):
+        return {
+            'scenario': None, 'warmup': 1, 'requests': 3, 'seconds': 10.0, 'bulk_size': 5,
+            'response_cache': False, 'seed': 0, **options,
+        }
+
+    def run_benchmark(self, **options):
+        options = self.options(**options)
+        command = BenchmarkCommand(stdout=StringIO(), stderr=StringIO())
+        with self.settings(**command.benchmark_settings(options['response_cache'])):
+            return command.run(options)
+
+    def test_every_scenario_succeeds(self):
+        seed_catalogue(users=3, categories=3, products=20)
+        results = self.run_benchmark()
+        self.assertEqual(results['meta']['data'], {'seed': 0, 'users': 3, 'categories': 3, 'products': 20})
+        for name, result in results['scenarios'].items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result['errors'], 0)
+                self.assertEqual(result['requests'], 3)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertGreater(results['scenarios']['products_list']['queries_per_request'], 0)
+
+    def test_scenario_selection(self):
+        seed_catalogue(users=3, categories=1, products=5)
+        results = self.run_benchmark(scenario=['products_order_price', 'user_'])
+        self.assertEqual(set(results['scenarios']), {'products_order_price', 'user_info'})
+        with self.assertRaises(CommandError):
+            self.run_benchmark(scenario=['missing'])
+
+    def test_needs_seeded_users(self):
+        with self.assertRaises(CommandError):
+            self.run_benchmark()
+
+    def test_compare(self):
+        stderr = StringIO()
+        BenchmarkCommand(stderr=stderr).compare(
+            {'meta': {'commit': 'abc123'}, 'scenarios': {'login': {'rps': 100, 'p50_ms': 2, 'p99_ms': 4, 'queries_per_request': 0}}},
+            {'scenarios': {
+                'login': {'rps': 150, 'p50_ms': 1, 'p99_ms': 4, 'queries_per_request': 2},
+                'refresh': {'rps': 10, 'p50_ms': 1, 'p99_ms': 1, 'queries_per_request': 1},
+            }},
+        )
+        self.assertEqual(stderr.getvalue().splitlines()[1:], [
+            'Against abc123:',
+            'login: rps 100 -> 150 (+50%), p50_ms 2 -> 1 (-50%), p99_ms 4 -> 4 (+0%), queries_per_request 0 -> 2',
+            'refresh: new',
+        ])
+
+    def test_unreadable_baseline(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', compare='/nonexistent/results.json', stdout=StringIO())
+
+    def test_percentile(self):
+        ordered = list(range(1, 101))
+        self.assertEqual([percentile(ordered, p) for p in (50, 99, 100)], [50, 99, 100])
+        self.assertEqual(percentile([7], 99), 7)
+
+
+class PermissionScopeTests(APITestCase):
+    """scope_queryset applies the ownership rule to a whole queryset in SQL"""
+
+    def setUp(self):
+        super().setUp()
+        self.owner = self.create_user('owner@example.com')
+        self.other = self.create_user('other@example.com')
+        self.moderator = self.create_user('moderator@example.com', role='moderator')
+        category = Category.objects.create(name='Tools', created_by=self.moderator)
+        for number, creator in enumerate((self.owner, self.owner, self.other)):
+            Product.objects.create(
+                name=f'Product {number}', sku=f'SKU-{number}', category=category, price='1.00',
+                stock_quantity=1, created_by=creator,
+            )
+
+    def scoped(self, permission, user, queryset):
+        request = RequestFactory().get('/')
+        request.user = user
+        return permission.scope_queryset(request, queryset)
+
+    def test_owners_get_their_objects(self):
+        permission = IsOwnerOrAdminOrModerator()
+        permission.owner_field = 'created_by'
+        products = self.scoped(permission, self.owner, Product.objects.all())
+        self.assertEqual(set(products.values_list('created_by', flat=True)), {self.owner.pk})
+        self.assertEqual(products.count(), 2)
+        self.assertEqual(self.scoped(permission, self.moderator, Product.objects.all()).count(), 3)
+
+    def test_users_scope_to_themselves(self):
+        users = self.scoped(IsOwnerOrAdmin(), self.other, User.objects.all())
+        self.assertEqual(list(users), [self.other])
+
+    def test_no_owner_means_nothing(self):
+        # Categories have no `user` field
+        self.assertFalse(self.scoped(IsOwnerOrAdmin(), self.owner, Category.objects.all()).exists())
+
+    def test_filter_applies_each_permission(self):
+        request = RequestFactory().get('/')
+        request.user = self.owner
+        view = mock.Mock(get_permissions=lambda: [IsOwnerOrAdmin(), mock.Mock(spec=[])])
+        with self.assertNumQueries(1):
+            users = list(PermissionScopeFilter().filter_queryset(request, User.objects.all(), view))
+        self.assertEqual(users, [self.owner])
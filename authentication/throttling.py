@@ -0,0 +1,322 @@
+"""
+Sliding-window throttles for the credential endpoints.
+
+Each check is O(1): a window keeps the hit count of the current and the
+previous fixed interval, and the previous count is weighted by how much of
+it still overlaps the sliding window. Counts live in a pluggable store
+(``THROTTLE_STORE['CLASS']``): in-process for tests and single-process
+deployments, or the shared Django cache.
+
+Throttles run in ``APIView.initial()``, before the view touches the
+database or hashes a password, so every rejected request is hashing work
+avoided; ``throttle_stats()`` reports it per scope. Credential views check
+their throttles in order and stop at the first rejection, so a client over
+its own limit is never charged to the shared identity and global windows
+and each rejected request is counted once. Async views use the ``a``
+variants (``ahit``, ``aallow_request``, ``afirst_rejection``), which await
+the cache instead of blocking the event loop.
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+THROTTLE_STORE_DEFAULTS = {
+    'CLASS': 'authentication.throttling.CacheWindowStore',
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'throttle',
+    'MAX_KEYS': 100000,
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def _setting(name):
+    return getattr(settings, 'THROTTLE_STORE', {}).get(name, THROTTLE_STORE_DEFAULTS[name])
+
+
+def parse_rate(rate):
+    """``'10/min'`` -> ``(10, 60)``, in DRF's rate format"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def sliding_window(limit, window, now, current, previous):
+    """
+    Decide a hit from the two interval counts.
+
+    Returns ``(allowed, wait)``: whether one more hit fits under ``limit``
+    and, if not, the seconds until it would.
+    """
+    elapsed = (now % window) / window
+    if previous * (1 - elapsed) + current + 1 <= limit:
+        return True, 0
+    if current + 1 <= limit:
+        # Wait until enough of the previous interval has slid out of the window
+        needed = 1 - (limit - 1 - current) / previous
+        return False, window * (needed - elapsed)
+    # Wait for the next interval, where this one's hits carry over as weight
+    needed = max(1 - (limit - 1) / current, 0)
+    return False, window * (1 - elapsed + needed)
+
+
+class LocalWindowStore:
+    """
+    In-process window counts, for tests and single-process deployments
+    """
+
+    def __init__(self):
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window, now):
+        interval = int(now // window)
+        with self._lock:
+            start, current, previous = self._windows.get(key, (interval, 0, 0))[:3]
+            if start != interval:
+                previous = current if start == interval - 1 else 0
+                current = 0
+            allowed, wait = sliding_window(limit, window, now, current, previous)
+            if allowed:
+                current += 1
+            self._windows[key] = (interval, current, previous, window)
+            if len(self._windows) > _setting('MAX_KEYS'):
+                self._prune(now)
+        return allowed, wait
+
+    async def ahit(self, key, limit, window, now):
+        # In memory and O(1): nothing to await
+        return self.hit(key, limit, window, now)
+
+    def _prune(self, now):
+        # Drop windows whose counts no longer affect any decision
+        self._windows = {
+            key: value for key, value in self._windows.items()
+            if (value[0] + 2) * value[3] > now
+        }
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+
+
+class CacheWindowStore:
+    """
+    Window counts in the Django cache named by ``THROTTLE_STORE['CACHE_ALIAS']``,
+    shared by every process using that cache
+    """
+
+    @property
+    def cache(self):
+        return caches[_setting('CACHE_ALIAS')]
+
+    @staticmethod
+    def _keys(key, window, now):
+        interval = int(now // window)
+        return (
+            f"{_setting('KEY_PREFIX')}:{key}:{interval}",
+            f"{_setting('KEY_PREFIX')}:{key}:{interval - 1}",
+        )
+
+    def hit(self, key, limit, window, now):
+        current_key, previous_key = self._keys(key, window, now)
+        counts = self.cache.get_many([current_key, previous_key])
+        allowed, wait = sliding_window(
+            limit, window, now, counts.get(current_key, 0), counts.get(previous_key, 0)
+        )
+        if allowed and not self.cache.add(current_key, 1, timeout=2 * window):
+            try:
+                self.cache.incr(current_key)
+            except ValueError:
+                # Expired between add() and incr()
+                self.cache.add(current_key, 1, timeout=2 * window)
+        return allowed, wait
+
+    async def ahit(self, key, limit, window, now):
+        """Async ``hit``: the cache calls are awaited"""
+        current_key, previous_key = self._keys(key, window, now)
+        counts = await self.cache.aget_many([current_key, previous_key])
+        allowed, wait = sliding_window(
+            limit, window, now, counts.get(current_key, 0), counts.get(previous_key, 0)
+        )
+        if allowed and not await self.cache.aadd(current_key, 1, timeout=2 * window):
+            try:
+                await self.cache.aincr(current_key)
+            except ValueError:
+                await self.cache.aadd(current_key, 1, timeout=2 * window)
+        return allowed, wait
+
+    def clear(self):
+        pass
+
+
+_store = None
+_store_lock = threading.Lock()
+_rejections = defaultdict(int)
+
+
+def get_store():
+    """The configured window store (one instance per process)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = import_string(_setting('CLASS'))()
+        return _store
+
+
+def reset_throttles():
+    """Forget the in-process windows, store and rejection counters"""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.clear()
+        _store = None
+        _rejections.clear()
+
+
+def throttle_stats():
+    """
+    Rejections per scope in this process, and the password hashes they
+    saved according to each view's ``throttle_hash_cost``
+    """
+    with _store_lock:
+        rejections = dict(_rejections)
+    stats = {}
+    for (scope, cost), count in rejections.items():
+        entry = stats.setdefault(scope, {'rejected': 0, 'hashes_avoided': 0})
+        entry['rejected'] += count
+        entry['hashes_avoided'] += count * cost
+    return stats
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Throttles a view by ``<throttle_scope>.<kind>`` from
+    ``DEFAULT_THROTTLE_RATES``; a missing rate disables that kind.
+
+    Views may set ``throttle_hash_cost``, the number of password hashes a
+    request costs, to weight the avoided-work counters.
+    """
+    kind = None
+
+    def get_identifier(self, request, view):
+        raise NotImplementedError
+
+    def get_window(self, request, view):
+        """``(key, limit, window)`` to charge, or None if not throttled"""
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f'{scope}.{self.kind}') if scope else None
+        if not rate:
+            return None
+        identifier = self.get_identifier(request, view)
+        if identifier is None:
+            return None
+        return (f'{scope}:{self.kind}:{identifier}', *parse_rate(rate))
+
+    def record(self, view, allowed, wait):
+        self._wait = wait
+        if not allowed:
+            with _store_lock:
+                _rejections[(view.throttle_scope, getattr(view, 'throttle_hash_cost', 1))] += 1
+        return allowed
+
+    def allow_request(self, request, view):
+        window = self.get_window(request, view)
+        if window is None:
+            return True
+        return self.record(view, *get_store().hit(*window, time.time()))
+
+    async def aallow_request(self, request, view):
+        """Async ``allow_request`` for async views"""
+        window = self.get_window(request, view)
+        if window is None:
+            return True
+        return self.record(view, *await get_store().ahit(*window, time.time()))
+
+    def wait(self):
+        return self._wait
+
+
+class IPSlidingWindowThrottle(SlidingWindowThrottle):
+    """Per client address"""
+    kind = 'ip'
+
+    def get_identifier(self, request, view):
+        return self.get_ident(request)
+
+
+class IdentitySlidingWindowThrottle(SlidingWindowThrottle):
+    """Per account: the authenticated user, else the submitted email"""
+    kind = 'identity'
+
+    def get_identifier(self, request, view):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'user:{user.pk}'
+        data = getattr(request, 'data', None)
+        if data is None:
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return None
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not email or not isinstance(email, str):
+            return None
+        return f'email:{email.strip().lower()}'
+
+
+class GlobalSlidingWindowThrottle(SlidingWindowThrottle):
+    """Across all clients"""
+    kind = 'global'
+
+    def get_identifier(self, request, view):
+        return 'all'
+
+
+# Narrowest first: later windows are only charged once the earlier ones pass
+CREDENTIAL_THROTTLES = [
+    IPSlidingWindowThrottle,
+    IdentitySlidingWindowThrottle,
+    GlobalSlidingWindowThrottle,
+]
+
+
+def first_rejection(throttles, request, view):
+    """
+    Check ``throttles`` in order and return the first that rejects the
+    request (None if all allow it); the ones after it are not charged
+    """
+    for throttle in throttles:
+        if not throttle.allow_request(request, view):
+            return throttle
+    return None
+
+
+async def afirst_rejection(throttles, request, view):
+    """Async ``first_rejection``; throttles without ``aallow_request`` are checked synchronously"""
+    for throttle in throttles:
+        if hasattr(throttle, 'aallow_request'):
+            allowed = await throttle.aallow_request(request, view)
+        else:
+            allowed = throttle.allow_request(request, view)
+        if not allowed:
+            return throttle
+    return None
+
+
+class OrderedThrottleMixin:
+    """
+    DRF view mixin: checks ``throttle_classes`` with ``first_rejection``
+    instead of charging every throttle
+    """
+
+    def check_throttles(self, request):
+        throttle = first_rejection(self.get_throttles(), request, self)
+        if throttle is not None:
+            self.throttled(request, throttle.wait())
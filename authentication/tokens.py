@@ -0,0 +1,21 @@
+"""
+simplejwt token classes signed by the configured backend (see
+authentication.signing)
+"""
+from rest_framework_simplejwt import tokens
+
+from .signing import get_token_backend
+
+
+class KeyRingTokenMixin:
+    @property
+    def token_backend(self):
+        return get_token_backend()
+
+
+class AccessToken(KeyRingTokenMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(KeyRingTokenMixin, tokens.RefreshToken):
+    access_token_class = AccessToken
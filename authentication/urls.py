@@ -1,12 +1,15 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     CustomTokenObtainPairView,
+    CustomTokenRefreshView,
     RegisterView,
     ProfileView,
     ChangePasswordView,
     LogoutView,
     UserInfoView,
+    ThrottleStatsView,
+    JWKSView,
+    MetricsView,
 )
 
 app_name = 'authentication'
@@ -16,10 +19,17 @@ urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', CustomTokenObtainPairView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     
     # User profile endpoints
     path('profile/', ProfileView.as_view(), name='profile'),
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
     path('user-info/', UserInfoView.as_view(), name='user_info'),
+
+    # Public signing keys
+    path('jwks/', JWKSView.as_view(), name='jwks'),
+
+    # Operations
+    path('throttle-stats/', ThrottleStatsView.as_view(), name='throttle_stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
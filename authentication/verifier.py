@@ -0,0 +1,173 @@
+"""
+Offline verification of this API's access tokens, for other services.
+
+Depends only on PyJWT (and ``cryptography`` for the asymmetric keys), not
+on Django, so the module can be imported from, or copied into, any Python
+service:
+
+    from authentication.verifier import TokenVerifier, InvalidToken
+
+    verifier = TokenVerifier('https://auth.example.com/.well-known/jwks.json')
+    try:
+        claims = verifier.verify(bearer_token)
+    except InvalidToken:
+        ...  # answer 401
+    if claims.role not in ('admin', 'moderator'):
+        ...  # answer 403
+
+Keys come from the API's JWKS document and are refetched when a token names
+an unknown ``kid``. Verified tokens are kept in an LRU keyed by the token's
+hash until they expire, so repeated requests with one token cost a hash and
+a dict lookup.
+
+A token revoked by logout, a password change or a deactivation stays
+accepted here until it expires (``JWT_ACCESS_TOKEN_MINUTES`` on the API).
+"""
+import hashlib
+import json
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+
+import jwt
+
+# Claims embedded by CustomTokenObtainPairSerializer
+USER_ID_CLAIM = 'user_id'
+TOKEN_TYPE_CLAIM = 'token_type'
+ROLE_CLAIM = 'role'
+IS_ACTIVE_CLAIM = 'is_active'
+TOKEN_VERSION_CLAIM = 'token_version'
+
+
+class InvalidToken(Exception):
+    """The token is malformed, expired, of the wrong type or badly signed"""
+
+
+class Claims(dict):
+    """Verified access token payload, with the user claims as attributes"""
+
+    @property
+    def user_id(self):
+        return self[USER_ID_CLAIM]
+
+    @property
+    def role(self):
+        return self.get(ROLE_CLAIM)
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_moderator(self):
+        return self.role == 'moderator'
+
+    @property
+    def token_version(self):
+        return self.get(TOKEN_VERSION_CLAIM)
+
+
+class TokenVerifier:
+    """
+    Verifies access tokens against the keys of a JWKS document, given as a
+    URL (``jwks_url``) or already loaded (``jwks``)
+    """
+
+    def __init__(self, jwks_url=None, jwks=None, audience=None, issuer=None, leeway=0,
+                 cache_size=10000, refetch_interval=60, timeout=5):
+        if not jwks_url and jwks is None:
+            raise ValueError('Pass jwks_url or jwks')
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.cache_size = cache_size
+        self.refetch_interval = refetch_interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._fetched_at = None
+        self._cache = OrderedDict()
+        if jwks is not None:
+            self._set_keys(jwks)
+
+    def _set_keys(self, jwks):
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            if jwk.get('kid') and jwk.get('use', 'sig') == 'sig':
+                parsed = jwt.PyJWK(jwk)
+                keys[jwk['kid']] = (parsed.algorithm_name, parsed.key)
+        self._keys = keys
+
+    def _fetch_keys(self):
+        with urllib.request.urlopen(self.jwks_url, timeout=self.timeout) as response:
+            self._set_keys(json.load(response))
+        self._fetched_at = time.monotonic()
+
+    def _key(self, kid):
+        key = self._keys.get(kid)
+        if key is not None or not self.jwks_url:
+            return key
+        with self._lock:
+            # Unknown kid: the API may have rotated keys; refetch, but not
+            # more often than refetch_interval for tokens with made-up kids
+            if kid not in self._keys and (
+                self._fetched_at is None or time.monotonic() - self._fetched_at >= self.refetch_interval
+            ):
+                try:
+                    self._fetch_keys()
+                except (OSError, ValueError, jwt.PyJWKError) as exc:
+                    raise InvalidToken(f'Cannot load signing keys: {exc}') from exc
+        return self._keys.get(kid)
+
+    def verify(self, token):
+        """Return the token's ``Claims``, or raise ``InvalidToken``"""
+        if isinstance(token, str):
+            token = token.encode()
+        digest = hashlib.sha256(token).digest()
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                if cached['exp'] + self.leeway > now:
+                    self._cache.move_to_end(digest)
+                    return cached
+                del self._cache[digest]
+
+        claims = Claims(self._decode(token))
+        with self._lock:
+            self._cache[digest] = claims
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+    def _decode(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as exc:
+            raise InvalidToken(str(exc)) from exc
+        key = self._key(kid) if kid else None
+        if key is None:
+            raise InvalidToken('Unknown signing key')
+        algorithm, key = key
+
+        try:
+            payload = jwt.decode(
+                token, key, algorithms=[algorithm], audience=self.audience, issuer=self.issuer,
+                leeway=self.leeway, options={'require': ['exp'], 'verify_aud': self.audience is not None},
+            )
+        except jwt.InvalidTokenError as exc:
+            raise InvalidToken(str(exc)) from exc
+        if payload.get(TOKEN_TYPE_CLAIM) != 'access':
+            raise InvalidToken('Not an access token')
+        if USER_ID_CLAIM not in payload:
+            raise InvalidToken('Token has no user')
+        if not payload.get(IS_ACTIVE_CLAIM, True):
+            raise InvalidToken('User is inactive')
+        return payload
+
+    def clear(self):
+        """Forget verified tokens"""
+        with self._lock:
+            self._cache.clear()
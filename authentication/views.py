@@ -1,36 +1,61 @@
+from django.http import HttpResponse
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
+from django.db import transaction
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from .serializers import (
     CustomTokenObtainPairSerializer,
+    CustomTokenRefreshSerializer,
     UserRegistrationSerializer,
     UserProfileSerializer,
     ChangePasswordSerializer
 )
+from .cache import user_cache
+from .metrics import registry
 from .models import User
+from .permissions import IsAdminRole
+from .revocation import revocation_list
+from .signing import get_token_backend
+from .throttling import CREDENTIAL_THROTTLES, OrderedThrottleMixin, throttle_stats
+from .tokens import RefreshToken
 
 
-class CustomTokenObtainPairView(TokenObtainPairView):
+class CustomTokenObtainPairView(OrderedThrottleMixin, TokenObtainPairView):
     """
     Custom JWT token obtain view with user details
     """
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = CREDENTIAL_THROTTLES
+    throttle_scope = 'login'
+    throttle_hash_cost = 1
 
 
-class RegisterView(generics.CreateAPIView):
+class CustomTokenRefreshView(TokenRefreshView):
+    """
+    JWT token refresh checked against the revocation list
+    """
+    serializer_class = CustomTokenRefreshSerializer
+
+
+class RegisterView(OrderedThrottleMixin, generics.CreateAPIView):
     """
     User registration view
     """
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = CREDENTIAL_THROTTLES
+    throttle_scope = 'register'
+    throttle_hash_cost = 1
     
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
         
-        refresh = RefreshToken.for_user(user)
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
         
         return Response({
             'access': str(refresh.access_token),
@@ -58,12 +83,16 @@ class ProfileView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
 
-class ChangePasswordView(generics.GenericAPIView):
+class ChangePasswordView(OrderedThrottleMixin, generics.GenericAPIView):
     """
     Change password view
     """
     serializer_class = ChangePasswordSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = CREDENTIAL_THROTTLES
+    throttle_scope = 'change_password'
+    # Verifies the old password and hashes the new one
+    throttle_hash_cost = 2
     
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -71,33 +100,43 @@ class ChangePasswordView(generics.GenericAPIView):
         
         user = request.user
         user.set_password(serializer.validated_data['new_password'])
+        # Saving the new password bumps the token version, signing out every
+        # session; then issue tokens for this one
         user.save()
+        refresh = CustomTokenObtainPairSerializer.get_token(user_cache.get(user.pk, user.token_version))
         
         return Response({
-            'message': 'Password changed successfully'
+            'message': 'Password changed successfully',
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
         }, status=status.HTTP_200_OK)
 
 
 class LogoutView(generics.GenericAPIView):
     """
-    Logout view - blacklist refresh token
+    Logout view - revoke the refresh token and the access token in use
     """
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
-        try:
-            refresh_token = request.data.get('refresh_token')
-            if refresh_token:
+        refresh_token = request.data.get('refresh_token')
+        if refresh_token:
+            try:
                 token = RefreshToken(refresh_token)
-                token.blacklist()
-            
-            return Response({
-                'message': 'Successfully logged out'
-            }, status=status.HTTP_200_OK)
-        except Exception:
-            return Response({
-                'error': 'Invalid token'
-            }, status=status.HTTP_400_BAD_REQUEST)
+            except TokenError:
+                token = None
+            if token is None or str(token.get(api_settings.USER_ID_CLAIM)) != str(request.user.pk):
+                return Response({
+                    'error': 'Invalid token'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            revocation_list.revoke(token, user_id=request.user.pk)
+        
+        if request.auth is not None:
+            revocation_list.revoke(request.auth, user_id=request.user.pk)
+        
+        return Response({
+            'message': 'Successfully logged out'
+        }, status=status.HTTP_200_OK)
 
 
 class UserInfoView(generics.GenericAPIView):
@@ -107,8 +146,11 @@ class UserInfoView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        user = request.user
-        return Response({
+        return Response(self.user_info(request.user), status=status.HTTP_200_OK)
+
+    @staticmethod
+    def user_info(user):
+        return {
             'id': user.id,
             'username': user.username,
             'email': user.email,
@@ -119,4 +161,67 @@ class UserInfoView(generics.GenericAPIView):
             'full_name': user.full_name,
             'created_at': user.created_at,
             'updated_at': user.updated_at,
-        }, status=status.HTTP_200_OK)
+        }
+
+
+class ThrottleStatsView(generics.GenericAPIView):
+    """
+    Credential requests rejected by the throttles in this process, and the
+    password hashing they avoided - admin only
+    """
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        return Response({'throttles': throttle_stats()}, status=status.HTTP_200_OK)
+
+
+class JWKSView(generics.GenericAPIView):
+    """
+    Public keys that verify access tokens (JWKS), for services that
+    authorize requests on their own (see authentication.verifier)
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        key_ring = getattr(get_token_backend(), 'key_ring', None)
+        if key_ring is None:
+            return Response({
+                'detail': 'Tokens are signed with a shared secret; no public keys are published.'
+            }, status=status.HTTP_404_NOT_FOUND)
+        response = Response(key_ring.public_jwks(), status=status.HTTP_200_OK)
+        # Verifiers refetch on unknown kids, so a short max-age is enough
+        response['Cache-Control'] = 'public, max-age=300'
+        return response
+
+
+class MetricsView(generics.GenericAPIView):
+    """
+    Per-route request metrics and cache counters of this process, in the
+    Prometheus text format - admin only
+    """
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        user_cache_stats = user_cache.stats()
+        throttles = throttle_stats()
+        gauges = [
+            ('user_cache_events', 'User cache lookups and invalidations', {
+                (('event', name),): user_cache_stats[name]
+                for name in ('local_hits', 'shared_hits', 'misses', 'invalidations')
+            }),
+            ('user_cache_entries', 'Users held in the local cache tier', {(): user_cache_stats['size']}),
+            ('user_cache_hit_ratio', 'Share of user lookups served from cache', {(): user_cache_stats['hit_ratio']}),
+            ('token_revocation_events', 'Revocation list filter hits, confirmed revocations and refreshes', {
+                (('event', name),): value for name, value in revocation_list.stats().items()
+            }),
+            ('throttle_rejections', 'Credential requests rejected by the throttles', {
+                (('scope', scope),): entry['rejected'] for scope, entry in throttles.items()
+            }),
+            ('throttle_hashes_avoided', 'Password hashes avoided by throttling', {
+                (('scope', scope),): entry['hashes_avoided'] for scope, entry in throttles.items()
+            }),
+        ]
+        return HttpResponse(
+            registry.render(gauges), content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
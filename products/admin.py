@@ -9,6 +9,7 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['name']
+    list_select_related = ['created_by']
 
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new object
@@ -23,6 +24,8 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description', 'sku', 'category__name']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['name']
+    # category and created_by are listed, and Product.__str__ reads category
+    list_select_related = ['category', 'created_by']
     
     fieldsets = (
         ('Basic Information', {
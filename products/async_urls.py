@@ -0,0 +1,10 @@
+from django.urls import path
+from . import async_views
+
+app_name = 'products_async'
+
+urlpatterns = [
+    path('products/', async_views.AsyncProductListView.as_view(), name='product-list'),
+    path('products/<int:pk>/', async_views.AsyncProductDetailView.as_view(), name='product-detail'),
+    path('products/stats/', async_views.AsyncProductStatsView.as_view(), name='product-stats'),
+]
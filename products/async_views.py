@@ -0,0 +1,77 @@
+"""
+Async views for the hottest catalogue endpoints (see authentication.async_views)
+"""
+from django.core.paginator import InvalidPage, Paginator
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from authentication.async_views import AsyncAPIView
+from authentication.permissions import IsAdminOrModeratorForProducts
+from .serializers import ProductSerializer, compiled_product_list
+from .stats import aget_product_stats
+from .views import ProductDetailView, ProductFilterMixin, ProductStatsView
+
+
+class AsyncProductListView(ProductFilterMixin, AsyncAPIView):
+    """
+    Async product list with the same filters and page-number pagination
+    as ``/api/products/``; rows are read with async iteration
+    """
+    permission_classes = [IsAdminOrModeratorForProducts]
+    page_query_param = 'page'
+
+    async def get(self, request):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        count = await queryset.acount()
+
+        page_size = api_settings.PAGE_SIZE
+        try:
+            page = Paginator(range(count), page_size, allow_empty_first_page=True).page(
+                request.GET.get(self.page_query_param, 1)
+            )
+        except InvalidPage:
+            raise exceptions.NotFound('Invalid page.')
+
+        offset = (page.number - 1) * page_size
+        rows = compiled_product_list.values(queryset)[offset:offset + page_size]
+        results = [compiled_product_list.to_representation(row) async for row in rows]
+        return self.render({
+            'count': count,
+            'next': self.page_link(page.next_page_number()) if page.has_next() else None,
+            'previous': self.page_link(page.previous_page_number()) if page.has_previous() else None,
+            'results': results,
+        })
+
+    def page_link(self, number):
+        url = self.request.build_absolute_uri()
+        if number == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, number)
+
+
+class AsyncProductDetailView(AsyncAPIView):
+    """
+    Async ``/api/products/{id}/`` (read only)
+    """
+    permission_classes = [IsAdminOrModeratorForProducts]
+    queryset = ProductDetailView.queryset
+
+    async def get(self, request, pk):
+        product = await self.get_queryset().filter(pk=pk).afirst()
+        if product is None:
+            raise exceptions.NotFound()
+        return self.render(ProductSerializer(product).data)
+
+
+class AsyncProductStatsView(AsyncAPIView):
+    """
+    Async ``/api/products/stats/``; cached snapshots are read without
+    leaving the event loop
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        stats = ProductStatsView.visible_stats(await aget_product_stats(), request.user)
+        return self.render({'stats': stats})
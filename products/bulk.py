@@ -0,0 +1,155 @@
+"""
+Batched product upserts
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.counters import (
+    apply_deltas, bump_version, get_deltas, merge_deltas, rebuild_counters, row_state,
+)
+from .counters import CATALOGUE_VERSION_KEY, PREFIX as CATALOGUE_PREFIX, PRODUCT_COUNTED_FIELDS, product_contribution
+from .models import Category, Product
+from .search import get_search_backend
+from .serializers import ProductBulkItemSerializer
+from .stats import invalidate_catalogue_stats
+
+UPSERT_FIELDS = ('name', 'description', 'category_id', 'price', 'stock_quantity', 'is_active')
+REQUIRED_FOR_CREATE = ('name', 'category', 'price')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def upsert_products(rows, user, chunk_size=None):
+    """
+    Create or update products by SKU.
+
+    ``rows`` may be any iterable (including a lazily parsed stream). Each
+    chunk is validated with one category lookup and one SKU lookup, then
+    written with ``bulk_create``/``bulk_update`` in its own transaction.
+    Returns the number of created and updated rows and per-row errors,
+    indexed by the row's position in the input.
+    """
+    chunk_size = chunk_size or getattr(settings, 'PRODUCT_BULK_CHUNK_SIZE', 500)
+    summary = {'created': 0, 'updated': 0, 'errors': []}
+    for chunk in chunked(enumerate(rows), chunk_size):
+        created, updated, errors = _upsert_chunk(chunk, user)
+        summary['created'] += created
+        summary['updated'] += updated
+        summary['errors'].extend(errors)
+    return summary
+
+
+def _lost_insert_race(created):
+    """
+    Whether any of the ``created`` products was inserted by another writer
+    before this upsert, which then updated it: its stored ``created_at`` is
+    not the one set here
+    """
+    if not created:
+        return False
+    stored = dict(
+        Product.objects.filter(sku__in=[product.sku for product in created]).values_list('sku', 'created_at')
+    )
+    return any(stored.get(product.sku) != product.created_at for product in created)
+
+
+def _row_error(index, row, errors):
+    sku = row.get('sku') if isinstance(row, dict) else None
+    return {'index': index, 'sku': sku, 'errors': errors}
+
+
+def _upsert_chunk(chunk, user):
+    errors = []
+    valid = []
+    seen_skus = set()
+    for index, row in chunk:
+        if isinstance(row, Exception):
+            errors.append(_row_error(index, row, {'non_field_errors': [str(row)]}))
+            continue
+        if not isinstance(row, dict):
+            errors.append(_row_error(index, row, {'non_field_errors': ['Expected an object.']}))
+            continue
+        serializer = ProductBulkItemSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append(_row_error(index, row, serializer.errors))
+            continue
+        data = serializer.validated_data
+        if data['sku'] in seen_skus:
+            errors.append(_row_error(index, row, {'sku': ['Duplicate SKU in the same batch.']}))
+            continue
+        seen_skus.add(data['sku'])
+        valid.append((index, row, data))
+
+    category_ids = {data['category'] for _, _, data in valid if 'category' in data}
+    active_categories = set(
+        Category.objects.filter(id__in=category_ids, is_active=True).values_list('id', flat=True)
+    )
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    with transaction.atomic():
+        # Read (and lock) the existing rows in the write transaction, so the
+        # counter deltas start from the state being overwritten
+        existing = {
+            product.sku: product
+            for product in Product.objects.select_for_update().filter(sku__in=seen_skus)
+        }
+        deltas = []
+        for index, row, data in valid:
+            if 'category' in data and data['category'] not in active_categories:
+                errors.append(_row_error(index, row, {'category': ['Category does not exist or is inactive.']}))
+                continue
+            values = {('category_id' if key == 'category' else key): value for key, value in data.items()}
+
+            product = existing.get(data['sku'])
+            if product is None:
+                missing = [field for field in REQUIRED_FOR_CREATE if field not in data]
+                if missing:
+                    errors.append(_row_error(index, row, {field: ['This field is required.'] for field in missing}))
+                    continue
+                product = Product(created_by_id=user.pk, **values)
+                to_create.append(product)
+                deltas.append(get_deltas(product_contribution, None, row_state(product, PRODUCT_COUNTED_FIELDS)))
+            else:
+                previous = row_state(product, PRODUCT_COUNTED_FIELDS)
+                for field, value in values.items():
+                    setattr(product, field, value)
+                product.updated_at = now
+                to_update.append(product)
+                deltas.append(get_deltas(product_contribution, previous, row_state(product, PRODUCT_COUNTED_FIELDS)))
+
+        if to_create or to_update:
+            # Upsert on sku so a row inserted concurrently since the lookup
+            # is updated instead of failing the whole chunk
+            Product.objects.bulk_create(
+                to_create,
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=UPSERT_FIELDS + ('updated_at',),
+            )
+            Product.objects.bulk_update(to_update, UPSERT_FIELDS + ('updated_at',))
+            if _lost_insert_race(to_create):
+                # Rows counted as new already existed, in a state this
+                # transaction never saw: recount instead of guessing deltas
+                rebuild_counters([CATALOGUE_PREFIX])
+            else:
+                # Bulk writes bypass the model signals; keep derived data in step
+                apply_deltas(merge_deltas(*deltas))
+            product_ids = [product.pk for product in to_create + to_update]
+            if any(product_id is None for product_id in product_ids):
+                product_ids = Product.objects.filter(sku__in=seen_skus).values_list('id', flat=True)
+            get_search_backend().index(product_ids)
+            bump_version(CATALOGUE_VERSION_KEY)
+
+    if to_create or to_update:
+        invalidate_catalogue_stats()
+
+    errors.sort(key=lambda error: error['index'])
+    return len(to_create), len(to_update), errors
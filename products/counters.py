@@ -0,0 +1,75 @@
+"""
+Catalogue counters maintained on every product and category write
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from authentication.counters import register_source
+from .models import Category, Product
+
+PREFIX = 'catalogue:'
+PRODUCTS_TOTAL = 'catalogue:products:total'
+PRODUCTS_ACTIVE = 'catalogue:products:active'
+PRODUCTS_IN_STOCK = 'catalogue:products:active_in_stock'
+PRODUCTS_OUT_OF_STOCK = 'catalogue:products:active_out_of_stock'
+PRODUCTS_PRICE_SUM = 'catalogue:products:active_price_sum'
+CATEGORIES_TOTAL = 'catalogue:categories:total'
+CATEGORIES_ACTIVE = 'catalogue:categories:active'
+
+# Bumped on every catalogue write; outside PREFIX so rebuilds leave it alone
+CATALOGUE_VERSION_KEY = 'version:catalogue'
+
+# Fields whose changes move the counters
+PRODUCT_COUNTED_FIELDS = ('is_active', 'stock_quantity', 'price', 'category_id')
+CATEGORY_COUNTED_FIELDS = ('is_active',)
+
+
+def category_products_key(category_id):
+    """Counter of active products in one category"""
+    return f'catalogue:category:{category_id}:active_products'
+
+
+def product_contribution(state):
+    """Counters a product row with the given field values adds to"""
+    active = bool(state['is_active'])
+    contribution = {PRODUCTS_TOTAL: 1}
+    if active:
+        contribution.update({
+            PRODUCTS_ACTIVE: 1,
+            PRODUCTS_IN_STOCK if state['stock_quantity'] > 0 else PRODUCTS_OUT_OF_STOCK: 1,
+            PRODUCTS_PRICE_SUM: Decimal(str(state['price'])),
+            category_products_key(state['category_id']): 1,
+        })
+    return contribution
+
+
+def category_contribution(state):
+    """Counters a category row with the given field values adds to"""
+    return {CATEGORIES_TOTAL: 1, CATEGORIES_ACTIVE: int(bool(state['is_active']))}
+
+
+def compute_catalogue_counters():
+    """Compute every catalogue counter from the tables"""
+    active = Q(is_active=True)
+    counters = Product.objects.aggregate(**{
+        PRODUCTS_TOTAL: Count('id'),
+        PRODUCTS_ACTIVE: Count('id', filter=active),
+        PRODUCTS_IN_STOCK: Count('id', filter=active & Q(stock_quantity__gt=0)),
+        PRODUCTS_OUT_OF_STOCK: Count('id', filter=active & Q(stock_quantity=0)),
+        PRODUCTS_PRICE_SUM: Sum('price', filter=active, default=Decimal(0)),
+    })
+    counters.update(Category.objects.aggregate(**{
+        CATEGORIES_TOTAL: Count('id'),
+        CATEGORIES_ACTIVE: Count('id', filter=active),
+    }))
+    per_category = (
+        Product.objects.filter(active).order_by()
+        .values_list('category_id').annotate(count=Count('id'))
+    )
+    for category_id, count in per_category:
+        counters[category_products_key(category_id)] = count
+    return counters
+
+
+register_source(PREFIX, compute_catalogue_counters)
@@ -0,0 +1,55 @@
+"""
+Filter backends for product listings
+"""
+from rest_framework import filters
+
+from .search import get_search_backend
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Search products through the configured full-text backend.
+
+    A single term equal to an existing SKU short-circuits to that product
+    through the unique SKU index.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        if len(terms) == 1:
+            exact = queryset.filter(sku=terms[0])
+            if exact.exists():
+                return exact
+
+        return get_search_backend().search(queryset, terms)
+
+    async def afilter_queryset(self, request, queryset, view):
+        """``filter_queryset`` for async views"""
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        if len(terms) == 1:
+            exact = queryset.filter(sku=terms[0])
+            if await exact.aexists():
+                return exact
+
+        return get_search_backend().search(queryset, terms)
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """
+    Ordering filter that sorts ranked search results by relevance unless the
+    client asked for an explicit ordering
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if (
+            self.ordering_param not in request.query_params
+            and 'search_rank' in queryset.query.annotations
+        ):
+            return ['-search_rank', 'id']
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def populate_catalogue_counters(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Category = apps.get_model('products', 'Category')
+    Counter = apps.get_model('authentication', 'Counter')
+
+    active = Q(is_active=True)
+    products = Product.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=active),
+        in_stock=Count('id', filter=active & Q(stock_quantity__gt=0)),
+        out_of_stock=Count('id', filter=active & Q(stock_quantity=0)),
+        price_sum=Sum('price', filter=active, default=Decimal(0)),
+    )
+    categories = Category.objects.aggregate(total=Count('id'), active=Count('id', filter=active))
+    counters = {
+        'catalogue:products:total': products['total'],
+        'catalogue:products:active': products['active'],
+        'catalogue:products:active_in_stock': products['in_stock'],
+        'catalogue:products:active_out_of_stock': products['out_of_stock'],
+        'catalogue:products:active_price_sum': products['price_sum'],
+        'catalogue:categories:total': categories['total'],
+        'catalogue:categories:active': categories['active'],
+    }
+    per_category = Product.objects.filter(active).order_by().values_list('category_id').annotate(count=Count('id'))
+    for category_id, count in per_category:
+        counters[f'catalogue:category:{category_id}:active_products'] = count
+
+    Counter.objects.filter(key__startswith='catalogue:').delete()
+    Counter.objects.bulk_create(Counter(key=key, value=value) for key, value in counters.items())
+
+
+def remove_catalogue_counters(apps, schema_editor):
+    Counter = apps.get_model('authentication', 'Counter')
+    Counter.objects.filter(key__startswith='catalogue:').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0005_counter'),
+        ('products', '0002_catalogue_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_catalogue_counters, remove_catalogue_counters),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+FTS_TABLE = 'products_product_fts'
+GIN_INDEX = 'product_search_gin_idx'
+TSVECTOR_SQL = (
+    "to_tsvector('simple', coalesce(\"name\", '') || ' ' || "
+    "coalesce(\"description\", '') || ' ' || \"sku\")"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            f'USING fts5(name, description, sku, category_name)'
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, sku, category_name) '
+            f"SELECT p.id, p.name, coalesce(p.description, ''), p.sku, c.name "
+            f'FROM products_product p JOIN products_category c ON c.id = p.category_id'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {GIN_INDEX} ON products_product USING GIN ({TSVECTOR_SQL})'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_populate_catalogue_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
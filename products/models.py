@@ -1,9 +1,32 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+class CategoryQuerySet(models.QuerySet):
+    """
+    QuerySet helpers for categories
+    """
+
+    def with_products_count(self):
+        """
+        Annotate each category with its number of active products.
+
+        A correlated subquery rather than a join and GROUP BY, which would
+        keep the listing from walking the ordering's index.
+        """
+        active_products = (
+            Product.objects.filter(category=OuterRef('pk'), is_active=True)
+            .order_by().values('category').annotate(count=Count('id')).values('count')
+        )
+        return self.annotate(
+            products_count=Coalesce(Subquery(active_products), 0)
+        )
+
+
 class Category(models.Model):
     """
     Category model for organizing products
@@ -19,10 +42,17 @@ class Category(models.Model):
     )
     is_active = models.BooleanField(default=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
         ordering = ['name']
+        indexes = [
+            # Partial indexes for the active-category listing orderings
+            models.Index(fields=['name', 'id'], name='category_active_name_idx', condition=Q(is_active=True)),
+            models.Index(fields=['created_at', 'id'], name='category_active_created_idx', condition=Q(is_active=True)),
+        ]
 
     def __str__(self):
         return self.name
@@ -55,6 +85,43 @@ class Product(models.Model):
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
         ordering = ['name']
+        indexes = [
+            # Partial indexes for the active-product listing: one per
+            # filterable/orderable column, with `id` as the tiebreaker. They
+            # serve every ordering unfiltered, `min_price`/`max_price` with
+            # the price ordering, `in_stock` with the id ordering, and the
+            # category filter and category product counts in id order
+            models.Index(fields=['id'], name='product_active_id_idx', condition=Q(is_active=True)),
+            models.Index(fields=['name', 'id'], name='product_active_name_idx', condition=Q(is_active=True)),
+            models.Index(fields=['price', 'id'], name='product_active_price_idx', condition=Q(is_active=True)),
+            models.Index(fields=['stock_quantity', 'id'], name='product_active_stock_idx', condition=Q(is_active=True)),
+            models.Index(fields=['created_at', 'id'], name='product_active_created_idx', condition=Q(is_active=True)),
+            models.Index(fields=['category', 'id'], name='product_active_category_idx', condition=Q(is_active=True)),
+            # `category=<id>` ordered by name, price or created_at
+            models.Index(
+                fields=['category', 'name', 'id'], name='product_active_cat_name_idx', condition=Q(is_active=True)
+            ),
+            models.Index(
+                fields=['category', 'price', 'id'], name='product_active_cat_price_idx', condition=Q(is_active=True)
+            ),
+            models.Index(
+                fields=['category', 'created_at', 'id'], name='product_active_cat_created_idx',
+                condition=Q(is_active=True)
+            ),
+            # `in_stock=false` (stock_quantity = 0) ordered by name, price or created_at
+            models.Index(
+                fields=['stock_quantity', 'name', 'id'], name='product_active_stk_name_idx',
+                condition=Q(is_active=True)
+            ),
+            models.Index(
+                fields=['stock_quantity', 'price', 'id'], name='product_active_stk_price_idx',
+                condition=Q(is_active=True)
+            ),
+            models.Index(
+                fields=['stock_quantity', 'created_at', 'id'], name='product_active_stk_created_idx',
+                condition=Q(is_active=True)
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.category.name}"
@@ -0,0 +1,36 @@
+"""
+Request parsers for product endpoints
+"""
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON lazily, one object per line.
+
+    Returns a generator so that large uploads are consumed as they are
+    processed. A line that is not valid JSON is yielded as a ParseError
+    so the caller can report it against that row.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self.iter_rows(codecs.getreader(encoding)(stream))
+
+    @staticmethod
+    def iter_rows(lines):
+        for number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                yield ParseError(f'Line {number}: {exc}')
@@ -0,0 +1,154 @@
+"""
+Full-text search backends for products.
+
+The backend is picked from ``settings.PRODUCT_SEARCH_BACKEND`` (a dotted
+path) or, when unset, from the database vendor:
+
+- SQLite: an FTS5 table (``products_product_fts``) ranked with bm25,
+  kept in sync by the product and category signals.
+- PostgreSQL: a GIN expression index over ``to_tsvector`` of the product
+  columns, ranked with ``ts_rank``; the index is maintained by PostgreSQL.
+- Anything else: the previous ``icontains`` matching.
+
+Ranked backends annotate ``search_rank`` (higher is better).
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Category
+
+FTS_TABLE = 'products_product_fts'
+TSVECTOR_SQL = (
+    "to_tsvector('simple', coalesce(\"products_product\".\"name\", '') || ' ' || "
+    "coalesce(\"products_product\".\"description\", '') || ' ' || \"products_product\".\"sku\")"
+)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class IcontainsSearchBackend:
+    """
+    Unindexed fallback: every term must appear in one of the searched fields
+    """
+    fields = ('name', 'description', 'sku', 'category__name')
+
+    def search(self, queryset, terms):
+        for term in terms:
+            condition = Q()
+            for field in self.fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def index(self, product_ids):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def reindex_category(self, category_id):
+        pass
+
+
+class SQLiteFTSSearchBackend(IcontainsSearchBackend):
+    """
+    SQLite FTS5 search over name, description, SKU and category name
+    """
+
+    @staticmethod
+    def match_expression(terms):
+        """Quote every term and match it as a prefix, all terms required"""
+        return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+    def search(self, queryset, terms):
+        expression = self.match_expression(terms)
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (expression,))
+        # FTS5 `rank` is bm25, where lower is better
+        rank = RawSQL(
+            f'SELECT -rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = "products_product"."id"',
+            (expression,),
+            output_field=FloatField(),
+        )
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+    def index(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', product_ids)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description, sku, category_name) '
+                f'SELECT p.id, p.name, coalesce(p.description, \'\'), p.sku, c.name '
+                f'FROM products_product p JOIN products_category c ON c.id = p.category_id '
+                f'WHERE p.id IN ({placeholders})',
+                product_ids,
+            )
+
+    def remove(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', product_ids)
+
+    def reindex_category(self, category_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {FTS_TABLE} SET category_name = (SELECT name FROM products_category WHERE id = %s) '
+                f'WHERE rowid IN (SELECT id FROM products_product WHERE category_id = %s)',
+                (category_id, category_id),
+            )
+
+
+class PostgresSearchBackend(IcontainsSearchBackend):
+    """
+    PostgreSQL full-text search using the GIN expression index on products
+    """
+
+    @staticmethod
+    def tsquery(terms):
+        """Prefix-match every word of every term, all words required"""
+        words = [word for term in terms for word in WORD_RE.findall(term)]
+        return ' & '.join(f'{word}:*' for word in words)
+
+    def search(self, queryset, terms):
+        query = self.tsquery(terms)
+        if not query:
+            return super().search(queryset, terms)
+        matches = RawSQL(
+            f"{TSVECTOR_SQL} @@ to_tsquery('simple', %s)", (query,), output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f"ts_rank({TSVECTOR_SQL}, to_tsquery('simple', %s))", (query,), output_field=FloatField()
+        )
+        # Category names live in another table; match them through the
+        # (small) category table instead of joining on every product
+        categories = Category.objects.all()
+        for term in terms:
+            categories = categories.filter(name__icontains=term)
+        return queryset.annotate(search_match=matches, search_rank=rank).filter(
+            Q(search_match=True) | Q(category_id__in=categories.values('id'))
+        )
+
+
+BACKENDS_BY_VENDOR = {
+    'sqlite': SQLiteFTSSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    """Return the configured product search backend"""
+    path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return BACKENDS_BY_VENDOR.get(connection.vendor, IcontainsSearchBackend)()
@@ -0,0 +1,227 @@
+"""
+Deterministic synthetic users and catalogue data, for benchmarks and
+local load tests.
+
+Rows are generated from a seeded ``random.Random`` (the same seed gives the
+same data) and written with ``bulk_create`` in batches, one transaction per
+batch. Every synthetic user shares one precomputed password hash. Bulk
+inserts bypass the model signals, so the catalogue counters and the search
+index are rebuilt once at the end. With ``drop_indexes`` the models'
+secondary indexes (``Meta.indexes`` and the indexes of foreign keys and
+``db_index`` fields) are dropped for the load and built once afterwards,
+which is much faster than maintaining them row by row. Primary keys and
+unique constraints stay, as they guard the data being loaded.
+"""
+import random
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Index
+
+from authentication.counters import rebuild_counters
+from authentication.models import User
+from .bulk import chunked
+from .models import Category, Product
+from .search import get_search_backend
+from .stats import invalidate_catalogue_stats
+
+SEED_PASSWORD = 'seed-password'
+SEED_DOMAIN = 'seed.example.com'
+SKU_PREFIX = 'SEED-'
+
+WORDS = (
+    'alpha', 'amber', 'arctic', 'atlas', 'bamboo', 'basic', 'breeze', 'bright', 'canvas', 'carbon',
+    'cedar', 'classic', 'cobalt', 'compact', 'copper', 'coral', 'crystal', 'delta', 'desert', 'eco',
+    'ember', 'falcon', 'forest', 'fusion', 'glacier', 'granite', 'harbor', 'horizon', 'indigo', 'ivory',
+    'jade', 'lunar', 'maple', 'marble', 'meadow', 'nova', 'ocean', 'onyx', 'orbit', 'pixel',
+    'polar', 'prime', 'quartz', 'river', 'sierra', 'silver', 'solar', 'summit', 'terra', 'velvet',
+)
+NOUNS = (
+    'backpack', 'blender', 'bottle', 'cable', 'camera', 'chair', 'charger', 'desk', 'drill', 'headphones',
+    'jacket', 'kettle', 'keyboard', 'lamp', 'monitor', 'mouse', 'mug', 'notebook', 'pan', 'pillow',
+    'router', 'scarf', 'shoes', 'speaker', 'tent', 'toaster', 'towel', 'umbrella', 'watch', 'wallet',
+)
+FIRST_NAMES = ('Ada', 'Ben', 'Chloe', 'Dan', 'Eva', 'Finn', 'Grace', 'Hugo', 'Iris', 'Jon', 'Kira', 'Leo')
+LAST_NAMES = ('Adams', 'Brown', 'Clark', 'Diaz', 'Evans', 'Fox', 'Garcia', 'Hill', 'Ito', 'Jones', 'Khan', 'Lee')
+
+# One admin, then one moderator per MODERATOR_EVERY users
+MODERATOR_EVERY = 50
+
+
+def user_role(index):
+    if index == 0:
+        return 'admin'
+    if index % MODERATOR_EVERY == 1:
+        return 'moderator'
+    return 'user'
+
+
+def seed_email(index):
+    """Email of the ``index``-th synthetic user, e.g. ``moderator1@seed.example.com``"""
+    return f'{user_role(index)}{index}@{SEED_DOMAIN}'
+
+
+def generate_users(count, rng, password_hash):
+    for index in range(count):
+        email = seed_email(index)
+        role = user_role(index)
+        yield User(
+            username=email.split('@')[0],
+            email=email,
+            password=password_hash,
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            role=role,
+            is_staff=role == 'admin',
+        )
+
+
+def generate_categories(count, rng, creator_ids):
+    for index in range(count):
+        word = WORDS[index % len(WORDS)]
+        yield Category(
+            name=f'{word.title()} {NOUNS[index % len(NOUNS)].title()} {index}',
+            description=f'{word} {rng.choice(NOUNS)} collection',
+            created_by_id=rng.choice(creator_ids),
+            is_active=rng.random() >= 0.05,
+        )
+
+
+def generate_products(count, rng, category_ids, creator_ids):
+    for index in range(count):
+        noun = rng.choice(NOUNS)
+        adjective = rng.choice(WORDS)
+        yield Product(
+            name=f'{adjective.title()} {noun} {index}',
+            description=f'{rng.choice(WORDS)} {adjective} {noun} for everyday use',
+            category_id=rng.choice(category_ids),
+            price=Decimal(rng.randrange(99, 100000)) / 100,
+            # About one product in ten is out of stock
+            stock_quantity=0 if rng.random() < 0.1 else rng.randrange(1, 500),
+            sku=f'{SKU_PREFIX}{index:09d}',
+            created_by_id=rng.choice(creator_ids),
+            is_active=rng.random() >= 0.05,
+        )
+
+
+def bulk_insert(model, objects, batch_size, progress=None):
+    """
+    Insert ``objects`` in ``batch_size`` batches; returns the new primary
+    keys (None where the backend does not return them)
+    """
+    pks = []
+    for batch in chunked(objects, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=batch_size)
+        pks.extend(obj.pk for obj in batch)
+        if progress is not None:
+            progress(model, len(pks))
+    return pks
+
+
+def seeded_ids(pks, queryset):
+    """``pks``, or the ids from ``queryset`` when the backend returned none"""
+    if pks and None not in pks:
+        return pks
+    return list(queryset.order_by('id').values_list('id', flat=True))
+
+
+def indexed_fields(model):
+    """Fields of ``model`` with an index of their own: foreign keys and ``db_index``"""
+    return [
+        field for field in model._meta.local_concrete_fields
+        if field.db_index and not field.unique
+    ]
+
+
+@contextmanager
+def indexes_dropped(models):
+    """
+    Drop the secondary indexes of ``models`` (``Meta.indexes`` and those of
+    ``indexed_fields``) for the duration of the block and create them
+    again afterwards, even if the block fails
+    """
+    if not models:
+        # No schema editor, which SQLite cannot open inside a transaction
+        yield []
+        return
+    dropped = []
+    try:
+        with connection.schema_editor() as editor:
+            for model in models:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+                    dropped.append((model, index))
+                for field in indexed_fields(model):
+                    # Includes PostgreSQL's extra ``_like`` index on text columns
+                    names = editor._constraint_names(
+                        model, [field.column], index=True, unique=False, primary_key=False
+                    )
+                    for name in names:
+                        editor.execute(editor._delete_index_sql(model, name))
+                    if names:
+                        dropped.append((model, field))
+        yield dropped
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in dropped:
+                if isinstance(index, Index):
+                    editor.add_index(model, index)
+                else:
+                    for statement in editor._field_indexes_sql(model, index):
+                        editor.execute(statement)
+
+
+def reindex_products(product_ids, batch_size):
+    """Add ``product_ids`` to the search index"""
+    backend = get_search_backend()
+    for batch in chunked(product_ids, batch_size):
+        with transaction.atomic():
+            backend.index(batch)
+
+
+def seed_catalogue(users, categories, products, seed=0, batch_size=2000, password=SEED_PASSWORD,
+                   drop_indexes=False, progress=None):
+    """
+    Insert ``users`` users, ``categories`` categories and ``products``
+    products generated from ``seed``; returns the number of rows inserted
+    per model. ``progress(model, inserted)`` is called after every batch.
+    """
+    if (
+        User.objects.filter(email__endswith=f'@{SEED_DOMAIN}').exists()
+        or Product.objects.filter(sku__startswith=SKU_PREFIX).exists()
+    ):
+        raise ValueError('The database already holds seeded data')
+
+    rng = random.Random(seed)
+    # Hashing is the slow part of creating users: hash once, share it
+    password_hash = make_password(password)
+
+    models = (User, Category, Product) if drop_indexes else ()
+    with indexes_dropped(models):
+        user_ids = seeded_ids(
+            bulk_insert(User, generate_users(users, rng, password_hash), batch_size, progress),
+            User.objects.filter(email__endswith=f'@{SEED_DOMAIN}'),
+        )
+        # Ids come back in generation order, so roles follow from the position
+        creator_ids = [pk for index, pk in enumerate(user_ids) if user_role(index) != 'user']
+        if (categories or products) and not creator_ids:
+            raise ValueError('Categories and products need at least one user')
+
+        category_ids = seeded_ids(
+            bulk_insert(Category, generate_categories(categories, rng, creator_ids), batch_size, progress),
+            Category.objects.filter(created_by_id__in=creator_ids),
+        )
+        if products and not category_ids:
+            raise ValueError('Products need at least one category')
+        product_ids = seeded_ids(
+            bulk_insert(Product, generate_products(products, rng, category_ids, creator_ids), batch_size, progress),
+            Product.objects.filter(sku__startswith=SKU_PREFIX),
+        )
+        reindex_products(product_ids, batch_size)
+
+    rebuild_counters()
+    invalidate_catalogue_stats()
+    return {'users': len(user_ids), 'categories': len(category_ids), 'products': len(product_ids)}
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from authentication.compiled import CompiledSerializer
 from .models import Category, Product
 
 
@@ -31,6 +32,9 @@ class CategorySerializer(serializers.ModelSerializer):
 
     def get_products_count(self, obj):
         """Get count of active products in this category"""
+        # Views annotate this via Category.objects.with_products_count()
+        if hasattr(obj, 'products_count'):
+            return obj.products_count
         return obj.products.filter(is_active=True).count()
 
     def create(self, validated_data):
@@ -115,3 +119,28 @@ class ProductListSerializer(serializers.ModelSerializer):
             'id', 'name', 'category_name', 'price', 
             'stock_quantity', 'sku', 'is_active', 'is_in_stock'
         ]
+
+
+compiled_product_list = CompiledSerializer(
+    ProductListSerializer,
+    computed={
+        'is_in_stock': (['stock_quantity'], lambda row: row['stock_quantity'] > 0),
+    },
+)
+
+
+class ProductBulkItemSerializer(serializers.Serializer):
+    """
+    Validates one row of a bulk product upsert.
+
+    Only `sku` is always required; rows for new SKUs must also carry
+    `name`, `category` and `price`. Category existence and SKU uniqueness
+    are checked per chunk by `products.bulk`.
+    """
+    sku = serializers.CharField(max_length=50)
+    name = serializers.CharField(max_length=200, required=False)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    category = serializers.IntegerField(required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    stock_quantity = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
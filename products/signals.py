@@ -0,0 +1,94 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentication.counters import apply_deleted_state, apply_saved_state, bump_version
+from authentication.models import User
+from authentication.stored_state import UNCHANGED, stored_state, track_fields
+from .counters import (
+    CATALOGUE_VERSION_KEY, CATEGORY_COUNTED_FIELDS, PRODUCT_COUNTED_FIELDS, category_contribution, product_contribution
+)
+from .models import Category, Product
+from .search import get_search_backend
+from .stats import invalidate_catalogue_stats
+
+# User fields nested in catalogue responses as ``created_by``
+CREATOR_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+COUNTED = {
+    Product: (PRODUCT_COUNTED_FIELDS, product_contribution),
+    Category: (CATEGORY_COUNTED_FIELDS, category_contribution),
+}
+
+track_fields(Product, PRODUCT_COUNTED_FIELDS)
+track_fields(Category, (*CATEGORY_COUNTED_FIELDS, 'name'))
+track_fields(User, CREATOR_FIELDS)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+def update_counters_on_save(sender, instance, update_fields=None, **kwargs):
+    """Move the catalogue counters by the difference the save made"""
+    apply_saved_state(instance, *COUNTED[sender], update_fields)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Remove a deleted row's contribution from the catalogue counters"""
+    apply_deleted_state(instance, *COUNTED[sender])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_stats_on_catalogue_change(sender, instance, **kwargs):
+    """Recompute catalogue statistics after any product or category write"""
+    invalidate_catalogue_stats()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalogue_version(sender, instance, **kwargs):
+    """Invalidate the ETags of catalogue reads"""
+    bump_version(CATALOGUE_VERSION_KEY)
+
+
+@receiver(post_save, sender=User)
+def bump_catalogue_version_on_creator_change(sender, instance, update_fields=None, **kwargs):
+    """Invalidate catalogue ETags and cached responses that embed the old user fields"""
+    previous = stored_state(instance, CREATOR_FIELDS, update_fields)
+    if previous is None or previous is UNCHANGED:
+        return
+    if any(previous[field] != getattr(instance, field) for field in CREATOR_FIELDS):
+        bump_version(CATALOGUE_VERSION_KEY)
+
+
+@receiver(post_delete, sender=User)
+def bump_catalogue_version_on_creator_delete(sender, instance, **kwargs):
+    """A deleted user's products and categories leave the catalogue with them"""
+    bump_version(CATALOGUE_VERSION_KEY)
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    """Keep the search index in sync with the product row"""
+    get_search_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    """Drop a deleted product from the search index"""
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_renamed_category(sender, instance, created, update_fields=None, **kwargs):
+    """Update the category name indexed with its products after a rename"""
+    previous = stored_state(instance, ('name',), update_fields)
+    if previous is None or previous is UNCHANGED:
+        return
+    if previous['name'] != instance.name:
+        get_search_backend().reindex_category(instance.pk)
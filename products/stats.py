@@ -0,0 +1,68 @@
+"""
+Aggregate statistics for products and categories
+"""
+from django.db.models import Count, Exists, OuterRef, Q
+
+from authentication.cache import acached_snapshot, cached_snapshot, invalidate_snapshots
+from authentication.counters import read_counters
+from .counters import (
+    CATEGORIES_ACTIVE, PRODUCTS_ACTIVE, PRODUCTS_IN_STOCK, PRODUCTS_OUT_OF_STOCK,
+    PRODUCTS_PRICE_SUM, PRODUCTS_TOTAL,
+)
+from .models import Category, Product
+
+PRODUCT_STATS_KEY = 'stats:products'
+CATEGORY_STATS_KEY = 'stats:categories'
+
+# Stats visible to every authenticated user; the rest are admin/moderator only
+BASIC_PRODUCT_STATS = ('total_products', 'products_in_stock', 'products_out_of_stock')
+
+
+def compute_product_stats():
+    """Read product statistics from the maintained catalogue counters"""
+    counters = read_counters([
+        PRODUCTS_TOTAL, PRODUCTS_ACTIVE, PRODUCTS_IN_STOCK, PRODUCTS_OUT_OF_STOCK,
+        PRODUCTS_PRICE_SUM, CATEGORIES_ACTIVE,
+    ])
+    active = int(counters[PRODUCTS_ACTIVE])
+    return {
+        'total_products': active,
+        'products_in_stock': int(counters[PRODUCTS_IN_STOCK]),
+        'products_out_of_stock': int(counters[PRODUCTS_OUT_OF_STOCK]),
+        'total_products_including_inactive': int(counters[PRODUCTS_TOTAL]),
+        'inactive_products': int(counters[PRODUCTS_TOTAL]) - active,
+        'categories_count': int(counters[CATEGORIES_ACTIVE]),
+        'average_price': counters[PRODUCTS_PRICE_SUM] / active if active else None,
+    }
+
+
+def compute_category_stats():
+    """Compute category statistics with a single aggregation query"""
+    return Category.objects.annotate(
+        has_products=Exists(Product.objects.filter(category=OuterRef('pk')))
+    ).aggregate(
+        total_categories=Count('id'),
+        active_categories=Count('id', filter=Q(is_active=True)),
+        inactive_categories=Count('id', filter=Q(is_active=False)),
+        categories_with_products=Count('id', filter=Q(has_products=True)),
+    )
+
+
+def get_product_stats():
+    """Cached product statistics"""
+    return cached_snapshot(PRODUCT_STATS_KEY, compute_product_stats)
+
+
+async def aget_product_stats():
+    """Cached product statistics, for async views"""
+    return await acached_snapshot(PRODUCT_STATS_KEY, compute_product_stats)
+
+
+def get_category_stats():
+    """Cached category statistics"""
+    return cached_snapshot(CATEGORY_STATS_KEY, compute_category_stats)
+
+
+def invalidate_catalogue_stats():
+    """Drop the cached product and category statistics"""
+    invalidate_snapshots(PRODUCT_STATS_KEY, CATEGORY_STATS_KEY)
@@ -0,0 +1,597 @@
+import csv
+import io
+import json
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from authentication.counters import read_counters, verify_counters
+from authentication.models import User
+from authentication.tests import APITestCase, selects_from
+from .bulk import upsert_products
+from .counters import PRODUCTS_IN_STOCK, PRODUCTS_PRICE_SUM, category_products_key
+from .models import Category, Product
+from .search import PostgresSearchBackend, SQLiteFTSSearchBackend
+from .seeding import SEED_PASSWORD, indexed_fields, seed_catalogue
+from .serializers import ProductListSerializer, compiled_product_list
+from .stats import BASIC_PRODUCT_STATS, compute_category_stats
+
+
+def listing_query(queries, table):
+    """The row query (not the COUNT) a listing ran against ``table``"""
+    for query in queries:
+        sql = query['sql']
+        if sql.startswith('SELECT') and not sql.startswith('SELECT COUNT(*)') and f'FROM "{table}"' in sql:
+            return sql
+    raise AssertionError(f'No listing query on {table}')
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return ' | '.join(row[-1] for row in cursor.fetchall())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class CatalogueIndexPlanTests(APITestCase):
+    """The listing queries are served by the partial indexes on active rows"""
+
+    def setUp(self):
+        super().setUp()
+        seed_catalogue(users=5, categories=5, products=50)
+        self.create_user('moderator@example.com', role='moderator')
+        self.login('moderator@example.com')
+
+    def assertListingUses(self, path, table, index):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        plan = query_plan(listing_query(queries.captured_queries, table))
+        self.assertIn(f'USING INDEX {index}', plan)
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_product_orderings(self):
+        orderings = {
+            'id': 'product_active_id_idx',
+            'name': 'product_active_name_idx',
+            'price': 'product_active_price_idx',
+            '-price': 'product_active_price_idx',
+            'stock_quantity': 'product_active_stock_idx',
+            '-created_at': 'product_active_created_idx',
+        }
+        for ordering, index in orderings.items():
+            with self.subTest(ordering=ordering):
+                self.assertListingUses(f'/api/products/?ordering={ordering}', 'products_product', index)
+
+    def test_product_cursor_page(self):
+        self.assertListingUses(
+            '/api/products/?pagination=cursor&ordering=price', 'products_product', 'product_active_price_idx'
+        )
+
+    def test_filtered_orderings(self):
+        category = Product.objects.filter(is_active=True).values_list('category_id', flat=True).first()
+        filters = {
+            f'category={category}': {
+                'name': 'product_active_cat_name_idx',
+                'price': 'product_active_cat_price_idx',
+                '-created_at': 'product_active_cat_created_idx',
+                'id': 'product_active_category_idx',
+            },
+            'in_stock=false': {
+                'name': 'product_active_stk_name_idx',
+                '-price': 'product_active_stk_price_idx',
+                '-created_at': 'product_active_stk_created_idx',
+                'id': 'product_active_stock_idx',
+            },
+        }
+        for query, orderings in filters.items():
+            for ordering, index in orderings.items():
+                with self.subTest(query=query, ordering=ordering):
+                    self.assertListingUses(
+                        f'/api/products/?{query}&ordering={ordering}', 'products_product', index
+                    )
+
+    def test_category_filter(self):
+        category = Category.objects.filter(products__is_active=True).first()
+        for value in (category.pk, category.name.upper()):
+            with self.subTest(category=value):
+                response = self.client.get(f'/api/products/?category={value}&pagination=cursor')
+                names = {row['category_name'] for row in response.data['results']}
+                self.assertEqual(names, {category.name})
+
+    def test_category_orderings(self):
+        orderings = {
+            'name': 'category_active_name_idx',
+            '-created_at': 'category_active_created_idx',
+        }
+        for ordering, index in orderings.items():
+            with self.subTest(ordering=ordering):
+                self.assertListingUses(f'/api/categories/?ordering={ordering}', 'products_category', index)
+
+
+class CategoryListQueryTests(APITestCase):
+    """products_count is annotated, not counted per category"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_user('moderator@example.com', role='moderator')
+        self.login('moderator@example.com')
+
+    def test_query_count_does_not_grow_with_rows(self):
+        seed_catalogue(users=3, categories=15, products=60)
+        self.client.get('/api/categories/')
+        with self.assertNumQueries(3):
+            # Catalogue version, page count, rows with their counts
+            response = self.client.get('/api/categories/?ordering=-created_at')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertGreater(len(results), 10)
+        for category in results:
+            expected = Product.objects.filter(category_id=category['id'], is_active=True).count()
+            self.assertEqual(category['products_count'], expected)
+
+
+class BulkUpsertCounterTests(APITestCase):
+    """Bulk upserts keep the catalogue counters exact"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('moderator@example.com', role='moderator')
+        self.category = Category.objects.create(name='Tools', created_by=self.user)
+
+    def row(self, sku, **values):
+        return {'sku': sku, 'name': sku, 'category': self.category.pk, 'price': '10.00', **values}
+
+    def test_creates_and_updates(self):
+        upsert_products([self.row('A', stock_quantity=3), self.row('B')], self.user)
+        result = upsert_products([self.row('A', stock_quantity=0, price='2.50'), self.row('C')], self.user)
+        self.assertEqual((result['created'], result['updated']), (1, 1))
+        self.assertEqual(verify_counters(), {})
+
+    def test_sku_inserted_concurrently(self):
+        bulk_create = Product.objects.bulk_create
+
+        def insert_first(objs, **kwargs):
+            # Another writer inserts the SKU after it was looked up
+            Product.objects.create(
+                sku=objs[0].sku, name='Theirs', category=self.category, price='99.00',
+                stock_quantity=0, created_by=self.user,
+            )
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Product.objects, 'bulk_create', side_effect=insert_first):
+            upsert_products([self.row('RACE', stock_quantity=4)], self.user)
+        self.assertEqual(Product.objects.filter(sku='RACE').count(), 1)
+        self.assertEqual(verify_counters(), {})
+
+
+class ProductExportTests(APITestCase):
+    """The export streams the filtered list as NDJSON or CSV"""
+
+    def setUp(self):
+        super().setUp()
+        self.moderator = self.create_user('moderator@example.com', role='moderator')
+        category = Category.objects.create(name='Tools', created_by=self.moderator)
+        for index, price in enumerate(['5.00', '15.00', '25.00']):
+            Product.objects.create(
+                name=f'Item {index}', sku=f'SKU-{index}', category=category, price=price,
+                stock_quantity=index, created_by=self.moderator,
+            )
+        self.login('moderator@example.com')
+
+    def export(self, query):
+        response = self.client.get(f'/api/products/export/?{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, body = self.export('format=ndjson&min_price=10')
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['sku'] for row in rows], ['SKU-1', 'SKU-2'])
+        self.assertEqual((rows[0]['price'], rows[0]['category_name']), ('15.00', 'Tools'))
+
+    def test_csv(self):
+        response, body = self.export('format=csv&in_stock=true')
+        self.assertIn('attachment; filename="products-', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row['sku'] for row in rows], ['SKU-1', 'SKU-2'])
+        self.assertEqual(rows[0]['stock_quantity'], '1')
+
+    def test_rows_are_not_loaded_as_models(self):
+        with mock.patch.object(Product, '__init__', side_effect=AssertionError('model instance built')):
+            self.export('format=csv')
+
+
+class ProductExportPermissionTests(APITestCase):
+    """The export is readable by the same roles as the product list"""
+
+    def test_every_role_can_export(self):
+        for role in ('admin', 'moderator', 'user', 'guest'):
+            with self.subTest(role=role):
+                self.create_user(f'{role}@example.com', role=role)
+                self.login(f'{role}@example.com')
+                response = self.client.get('/api/products/export/?format=csv')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.client.get('/api/products/').status_code, 200)
+
+    def test_anonymous_is_rejected(self):
+        self.assertEqual(self.client.get('/api/products/export/').status_code, 401)
+
+
+class CompiledProductListTests(APITestCase):
+    """The compiled product list renders the same JSON as the serializer"""
+
+    def test_parity_with_serializer(self):
+        seed_catalogue(users=3, categories=4, products=40)
+        queryset = Product.objects.filter(is_active=True).select_related('category', 'created_by').order_by('id')
+        expected = ProductListSerializer(list(queryset), many=True).data
+        actual = compiled_product_list.serialize(compiled_product_list.values(queryset))
+        self.assertTrue(any(not row['is_in_stock'] for row in actual))
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+
+class CatalogueCreatorChangeTests(APITestCase):
+    """Catalogue responses embed their creator, so creator changes are writes"""
+
+    def setUp(self):
+        super().setUp()
+        self.creator = self.create_user('moderator@example.com', role='moderator')
+        Category.objects.create(name='Tools', created_by=self.creator)
+        self.login('moderator@example.com')
+
+    def rename_creator(self):
+        self.creator.first_name = 'Renamed'
+        self.creator.save()
+
+    def test_rename_changes_etag(self):
+        response = self.client.get('/api/categories/')
+        etag = response['ETag']
+        self.rename_creator()
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['created_by']['first_name'], 'Renamed')
+
+    def test_unrelated_user_save_keeps_etag(self):
+        etag = self.client.get('/api/categories/')['ETag']
+        self.creator.save(update_fields=['last_login'])
+        self.create_user('other@example.com')
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_rename_misses_response_cache(self):
+        product = Product.objects.create(
+            name='Hammer', sku='HAM-1', category=Category.objects.get(), price='10.00',
+            stock_quantity=1, created_by=self.creator,
+        )
+        path = f'/api/products/{product.pk}/'
+        self.assertEqual(self.client.get(path).json()['created_by']['first_name'], 'Test')
+        with self.assertNumQueries(1):
+            # Version read only: served from the response cache
+            self.client.get(path)
+        self.rename_creator()
+        self.assertEqual(self.client.get(path).json()['created_by']['first_name'], 'Renamed')
+
+
+class ProductCursorPaginationTests(APITestCase):
+    """Keyset pages visit every product once, in order, both ways"""
+
+    def setUp(self):
+        super().setUp()
+        seed_catalogue(users=3, categories=3, products=50)
+        # Ties on the ordering column are broken by the primary key
+        Product.objects.filter(pk__in=Product.objects.order_by('pk').values('pk')[:10]).update(price='5.00')
+        self.create_user('user@example.com')
+        self.login('user@example.com')
+
+    def walk(self, url, link='next'):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data[link]
+        return pages
+
+    def test_pages_cover_the_listing_in_order(self):
+        expected = list(
+            Product.objects.filter(is_active=True).order_by('-price', '-id').values_list('id', flat=True)
+        )
+        pages = self.walk('/api/products/?pagination=cursor&ordering=-price')
+        self.assertEqual([row['id'] for page in pages for row in page['results']], expected)
+        self.assertTrue(all(page['count'] == len(expected) for page in pages))
+
+        backwards = self.walk(pages[-1]['previous'], link='previous')
+        self.assertEqual(
+            [row['id'] for page in reversed(backwards) for row in page['results']],
+            expected[:-len(pages[-1]['results'])],
+        )
+
+    def test_count_can_be_skipped(self):
+        self.client.get('/api/products/')
+        with self.assertNumQueries(2):
+            # Catalogue version and the page rows, no COUNT(*)
+            response = self.client.get('/api/products/?pagination=cursor&count=false')
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_cursor_is_tied_to_its_ordering(self):
+        cursor = self.client.get('/api/products/?pagination=cursor&ordering=price').data['next']
+        other = cursor.replace('ordering=price', 'ordering=name')
+        self.assertEqual(self.client.get(other).status_code, 404)
+        self.assertEqual(self.client.get('/api/products/?cursor=not-a-cursor').status_code, 404)
+
+
+class CatalogueStatsTests(APITestCase):
+    """Statistics snapshots are cached until a catalogue write"""
+
+    def setUp(self):
+        super().setUp()
+        self.moderator = self.create_user('moderator@example.com', role='moderator')
+        self.category = Category.objects.create(name='Tools', created_by=self.moderator)
+        self.add_product('A-1', stock_quantity=0)
+        self.login('moderator@example.com')
+
+    def add_product(self, sku, **values):
+        return Product.objects.create(
+            name=sku, sku=sku, category=self.category, price='10.00', created_by=self.moderator,
+            **{'stock_quantity': 1, **values}
+        )
+
+    def stats(self, path='/api/products/stats/'):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.data['stats']
+
+    def test_snapshot_is_cached(self):
+        self.stats()
+        self.stats('/api/categories/stats/')
+        with self.assertNumQueries(0):
+            self.stats()
+            self.stats('/api/categories/stats/')
+
+    def test_writes_invalidate_the_snapshot(self):
+        self.assertEqual(self.stats()['total_products'], 1)
+        self.assertEqual(self.stats('/api/categories/stats/')['categories_with_products'], 1)
+        product = self.add_product('A-2')
+        Category.objects.create(name='Empty', created_by=self.moderator)
+        stats = self.stats()
+        self.assertEqual((stats['total_products'], stats['products_in_stock']), (2, 1))
+        self.assertEqual(self.stats('/api/categories/stats/')['total_categories'], 2)
+        product.is_active = False
+        product.save()
+        self.assertEqual(self.stats()['inactive_products'], 1)
+
+    def test_category_stats_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = compute_category_stats()
+        self.assertEqual(stats, {
+            'total_categories': 1, 'active_categories': 1,
+            'inactive_categories': 0, 'categories_with_products': 1,
+        })
+
+    def test_users_see_basic_stats(self):
+        self.create_user('user@example.com')
+        self.login('user@example.com')
+        self.assertEqual(set(self.stats()), set(BASIC_PRODUCT_STATS))
+
+
+class CatalogueCounterTests(APITestCase):
+    """Every kind of catalogue write keeps the counters equal to the tables"""
+
+    def setUp(self):
+        super().setUp()
+        self.moderator = self.create_user('moderator@example.com', role='moderator')
+        self.tools = Category.objects.create(name='Tools', created_by=self.moderator)
+        self.garden = Category.objects.create(name='Garden', created_by=self.moderator)
+        self.product = Product.objects.create(
+            name='Hammer', sku='HAM-1', category=self.tools, price='12.50',
+            stock_quantity=3, created_by=self.moderator,
+        )
+        self.login('moderator@example.com')
+
+    def assertInSync(self):
+        self.assertEqual(verify_counters(), {})
+
+    def test_field_changes(self):
+        self.product.stock_quantity = 0
+        self.product.price = '20.00'
+        self.product.category = self.garden
+        self.product.save()
+        self.assertInSync()
+        counters = read_counters([
+            PRODUCTS_IN_STOCK, PRODUCTS_PRICE_SUM,
+            category_products_key(self.tools.pk), category_products_key(self.garden.pk),
+        ])
+        self.assertEqual(list(counters.values()), [0, 20, 0, 1])
+
+    def test_api_writes(self):
+        response = self.client.post('/api/products/', {
+            'name': 'Rake', 'sku': 'RAKE-1', 'category': self.garden.pk, 'price': '8.00', 'stock_quantity': 2,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertInSync()
+        for method, path, data in [
+            ('patch', f'/api/products/{self.product.pk}/', {'stock_quantity': 0}),
+            ('post', f'/api/products/{self.product.pk}/toggle-status/', None),
+            ('delete', f'/api/categories/{self.garden.pk}/', None),
+        ]:
+            with self.subTest(method=method, path=path):
+                response = getattr(self.client, method)(path, data, format='json')
+                self.assertLess(response.status_code, 300, response.content)
+                self.assertInSync()
+
+    def test_deletes(self):
+        self.product.delete()
+        self.assertInSync()
+        self.tools.delete()
+        self.assertInSync()
+
+
+class ProductSearchTests(APITestCase):
+    """Search through the full-text backend (FTS5 here) and the fallback"""
+
+    def setUp(self):
+        super().setUp()
+        self.moderator = self.create_user('moderator@example.com', role='moderator')
+        self.tools = Category.objects.create(name='Power Tools', created_by=self.moderator)
+        self.garden = Category.objects.create(name='Garden', created_by=self.moderator)
+        self.drill = self.add_product('Cordless drill', 'DRL-1', self.tools, 'Compact drill with two batteries')
+        self.saw = self.add_product('Circular saw', 'SAW-1', self.tools, 'Cuts wood and plastic')
+        self.hose = self.add_product('Garden hose', 'HOSE-1', self.garden, 'Drill-free wall mount')
+        self.login('moderator@example.com')
+
+    def add_product(self, name, sku, category, description):
+        return Product.objects.create(
+            name=name, sku=sku, category=category, description=description,
+            price='10.00', stock_quantity=1, created_by=self.moderator,
+        )
+
+    def search(self, terms):
+        response = self.client.get('/api/products/', {'search': terms})
+        self.assertEqual(response.status_code, 200)
+        return [row['sku'] for row in response.data['results']]
+
+    def test_matches(self):
+        cases = {
+            'cordless': ['DRL-1'],
+            'cord': ['DRL-1'],              # prefix
+            'plastic': ['SAW-1'],           # description
+            'power': ['DRL-1', 'SAW-1'],    # category name
+            'tools wood': ['SAW-1'],        # every term required
+            'SAW-1': ['SAW-1'],             # exact SKU
+            'nothing': [],
+        }
+        for terms, expected in cases.items():
+            with self.subTest(terms=terms):
+                self.assertCountEqual(self.search(terms), expected)
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 ranking')
+    def test_ranked_by_relevance(self):
+        # The drill is named after the term; the hose only mentions it
+        self.assertEqual(self.search('drill'), ['DRL-1', 'HOSE-1'])
+
+    def test_index_follows_writes(self):
+        self.saw.name = 'Mitre saw'
+        self.saw.save()
+        self.assertEqual(self.search('mitre'), ['SAW-1'])
+        self.garden.name = 'Outdoor'
+        self.garden.save()
+        self.assertEqual(self.search('outdoor'), ['HOSE-1'])
+        self.drill.delete()
+        self.assertEqual(self.search('cordless'), [])
+
+    @override_settings(PRODUCT_SEARCH_BACKEND='products.search.IcontainsSearchBackend')
+    def test_fallback_backend(self):
+        self.assertCountEqual(self.search('power saw'), ['SAW-1'])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(SQLiteFTSSearchBackend.match_expression(['a"b', 'c']), '"a""b"* "c"*')
+        self.assertEqual(PostgresSearchBackend.tsquery(["o'neil", 'x']), 'o:* & neil:* & x:*')
+        self.assertEqual(self.search('"OR drill'), [])
+
+
+class ConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.creator = self.create_user('moderator@example.com', role='moderator')
+        self.category = Category.objects.create(name='Tools', created_by=self.creator)
+        self.login('moderator@example.com')
+
+    def test_if_none_match(self):
+        etag = self.client.get('/api/categories/')['ETag']
+        with self.assertNumQueries(1):
+            # Version read only
+            response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/api/categories/')['Last-Modified']
+        response = self.client.get('/api/categories/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_varies_with_the_query(self):
+        etag = self.client.get('/api/products/')['ETag']
+        self.assertNotEqual(self.client.get('/api/products/?ordering=price')['ETag'], etag)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get('/api/categories/')['ETag']
+        self.client.patch(f'/api/categories/{self.category.pk}/', {'name': 'Hardware'}, format='json')
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['name'], 'Hardware')
+
+    def test_category_save_reads_the_row_once(self):
+        self.category.name = 'Hardware'
+        with CaptureQueriesContext(connection) as queries:
+            self.category.save()
+        self.assertEqual(len(selects_from(queries.captured_queries, Category._meta.db_table)), 1)
+
+
+class SeedDataCommandTests(APITestCase):
+
+    def seed(self, **options):
+        stdout = io.StringIO()
+        call_command('seed_data', **{'users': 3, 'categories': 2, 'products': 10, **options}, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_seeds_consistent_data(self):
+        self.assertIn('Created 3 users, 2 categories and 10 products', self.seed())
+        self.assertEqual(User.objects.get(email='admin0@seed.example.com').role, 'admin')
+        self.login('user2@seed.example.com', password=SEED_PASSWORD)
+        self.assertEqual(verify_counters(), {})
+        self.assertEqual(self.client.get('/api/products/?search=SEED-000000003').json()['count'], 1)
+
+    def test_same_seed_same_data(self):
+        self.seed(seed=7)
+        first = list(Product.objects.order_by('sku').values_list('sku', 'name', 'price', 'stock_quantity'))
+        Product.objects.all().delete()
+        Category.objects.all().delete()
+        User.objects.all().delete()
+        self.seed(seed=7)
+        self.assertEqual(list(Product.objects.order_by('sku').values_list('sku', 'name', 'price', 'stock_quantity')), first)
+
+    def test_refuses_to_seed_twice(self):
+        self.seed()
+        with self.assertRaisesMessage(CommandError, 'manage.py flush'):
+            self.seed()
+
+    def test_invalid_options(self):
+        for options in ({'batch_size': 0}, {'users': 0}, {'categories': 0}):
+            with self.subTest(**options):
+                with self.assertRaises(CommandError):
+                    self.seed(**options)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SeedDropIndexesTests(TransactionTestCase):
+    """--drop-indexes loads without secondary indexes; SQLite needs it outside a transaction"""
+
+    @staticmethod
+    def index_names(model):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        return {name for name, info in constraints.items() if info['index'] and not info['unique']}
+
+    def test_indexes_are_dropped_and_rebuilt(self):
+        before = {model: self.index_names(model) for model in (User, Category, Product)}
+        self.assertTrue(before[Product] > {index.name for index in Product._meta.indexes})
+        during = {}
+
+        def progress(model, inserted):
+            during.setdefault(model, self.index_names(model))
+
+        seed_catalogue(3, 2, 10, drop_indexes=True, progress=progress)
+        self.assertEqual(during, {User: set(), Category: set(), Product: set()})
+        self.assertEqual({model: self.index_names(model) for model in before}, before)
+        self.assertEqual([field.name for field in indexed_fields(Product)], ['category', 'created_by'])
@@ -12,6 +12,8 @@ urlpatterns = [
     
     # Product URLs
     path('products/', views.ProductListCreateView.as_view(), name='product-list-create'),
+    path('products/export/', views.ProductExportView.as_view(), name='product-export'),
+    path('products/bulk/', views.ProductBulkUpsertView.as_view(), name='product-bulk'),
     path('products/<int:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
     path('products/stats/', views.ProductStatsView.as_view(), name='product-stats'),
     path('products/<int:pk>/toggle-status/', views.ProductToggleStatusView.as_view(), name='toggle-product-status'),
@@ -1,26 +1,43 @@
+from types import GeneratorType
+
 from rest_framework import generics, status, filters
 from rest_framework.response import Response
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Avg
+from django.db import transaction
+from django.db.models import F, Prefetch
 
+from .bulk import upsert_products
+from .counters import CATALOGUE_VERSION_KEY
+from .filters import ProductOrderingFilter, ProductSearchFilter
 from .models import Category, Product
+from .parsers import NDJSONParser
 from .serializers import (
     CategorySerializer, CategoryCreateSerializer,
-    ProductSerializer, ProductCreateSerializer, ProductListSerializer
+    ProductSerializer, ProductCreateSerializer, ProductListSerializer,
+    compiled_product_list
 )
+from .stats import BASIC_PRODUCT_STATS, get_category_stats, get_product_stats
+from authentication.compiled import CompiledListMixin
+from authentication.conditional import ConditionalGetMixin
+from authentication.export import ExportView
+from authentication.pagination import FlexiblePagination
 from authentication.permissions import (
     IsAdminOrModerator, IsAdminOrModeratorForProducts
 )
+from authentication.response_cache import ResponseCacheMixin
 
 
 # Category Views
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(ConditionalGetMixin, ResponseCacheMixin, generics.ListCreateAPIView):
     """
     List all categories or create a new category.
     Admins and moderators can access categories.
     """
-    queryset = Category.objects.filter(is_active=True)
+    queryset = Category.objects.filter(is_active=True).select_related('created_by').with_products_count()
     permission_classes = [IsAdminOrModerator]
+    version_key = CATALOGUE_VERSION_KEY
+    cache_query_params = ['search', 'ordering', 'page']
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
@@ -31,16 +48,22 @@ class CategoryListCreateView(generics.ListCreateAPIView):
             return CategoryCreateSerializer
         return CategorySerializer
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+
 
-class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetailView(ConditionalGetMixin, ResponseCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update, or delete a category.
     Admins and moderators can access categories.
     """
-    queryset = Category.objects.all()
+    queryset = Category.objects.select_related('created_by').with_products_count()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrModerator]
+    version_key = CATALOGUE_VERSION_KEY
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         """Soft delete by setting is_active to False"""
         instance = self.get_object()
@@ -50,29 +73,27 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Product Views
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductFilterMixin:
     """
-    List all products or create a new product.
-    Admins and Moderators: Full access
-    Users: Read-only access
+    Active products narrowed by the search, ordering, category, price and
+    stock query parameters; shared by the product list and export
     """
     queryset = Product.objects.filter(is_active=True).select_related('category', 'created_by')
-    permission_classes = [IsAdminOrModeratorForProducts]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [ProductSearchFilter, ProductOrderingFilter]
     search_fields = ['name', 'description', 'sku', 'category__name']
     ordering_fields = ['id', 'name', 'price', 'created_at', 'stock_quantity']
     ordering = ['id']
 
-    def get_serializer_class(self):
-        if self.request.method == 'POST':
-            return ProductCreateSerializer
-        if self.request.method == 'GET':
-            return ProductListSerializer
-        return ProductSerializer
-
     def get_queryset(self):
         """Filter products based on query parameters"""
         queryset = super().get_queryset()
+
+        # Filter by category id or name
+        category = self.request.query_params.get('category', '').strip()
+        if category.isdigit():
+            queryset = queryset.filter(category_id=category)
+        elif category:
+            queryset = queryset.filter(category__name__iexact=category)
         
         # Filter by price range
         min_price = self.request.query_params.get('min_price')
@@ -94,16 +115,83 @@ class ProductListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProductListCreateView(ConditionalGetMixin, ResponseCacheMixin, CompiledListMixin, ProductFilterMixin, generics.ListCreateAPIView):
+    """
+    List all products or create a new product.
+    Admins and Moderators: Full access
+    Users: Read-only access
+    """
+    permission_classes = [IsAdminOrModeratorForProducts]
+    version_key = CATALOGUE_VERSION_KEY
+    cache_query_params = [
+        'search', 'ordering', 'category', 'min_price', 'max_price', 'in_stock',
+        'page', 'pagination', 'cursor', 'count'
+    ]
+    pagination_class = FlexiblePagination
+    compiled_serializer = compiled_product_list
+
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return ProductCreateSerializer
+        if self.request.method == 'GET':
+            return ProductListSerializer
+        return ProductSerializer
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+
+
+class ProductExportView(ProductFilterMixin, ExportView):
+    """
+    Stream the product list as NDJSON or CSV
+    Readable by every role, like the product list; accepts the same filters
+    """
+    permission_classes = [IsAdminOrModeratorForProducts]
+    export_fields = (
+        'id', 'name', 'description', 'sku', 'category_id', 'price',
+        'stock_quantity', 'is_active', 'created_at', 'updated_at'
+    )
+    export_expressions = {'category_name': F('category__name')}
+    export_filename = 'products'
+
+
+class ProductBulkUpsertView(generics.GenericAPIView):
+    """
+    Create or update many products by SKU (Admin and Moderator only)
+    Accepts a JSON array or an NDJSON stream (application/x-ndjson)
+    """
+    permission_classes = [IsAdminOrModeratorForProducts]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        rows = request.data
+        if not isinstance(rows, (list, GeneratorType)):
+            return Response(
+                {'error': 'Expected a list of products'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = upsert_products(rows, request.user)
+        if result['errors'] and not (result['created'] or result['updated']):
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+
+class ProductDetailView(ConditionalGetMixin, ResponseCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update, or delete a product.
     Admins and Moderators: Full access
     Users: Read-only access
     """
-    queryset = Product.objects.select_related('category', 'created_by')
+    queryset = Product.objects.select_related('created_by').prefetch_related(
+        Prefetch('category', queryset=Category.objects.select_related('created_by').with_products_count())
+    )
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrModeratorForProducts]
+    version_key = CATALOGUE_VERSION_KEY
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         """Soft delete by setting is_active to False"""
         instance = self.get_object()
@@ -120,15 +208,7 @@ class CategoryStatsView(generics.GenericAPIView):
     permission_classes = [IsAdminOrModerator]
     
     def get(self, request):
-        categories = Category.objects.all()
-        stats = {
-            'total_categories': categories.count(),
-            'active_categories': categories.filter(is_active=True).count(),
-            'inactive_categories': categories.filter(is_active=False).count(),
-            'categories_with_products': categories.filter(products__isnull=False).distinct().count(),
-        }
-        
-        return Response({'stats': stats})
+        return Response({'stats': get_category_stats()})
 
 
 class ProductStatsView(generics.GenericAPIView):
@@ -140,26 +220,24 @@ class ProductStatsView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        products = Product.objects.all()
-        basic_stats = {
-            'total_products': products.filter(is_active=True).count(),
-            'products_in_stock': products.filter(is_active=True, stock_quantity__gt=0).count(),
-            'products_out_of_stock': products.filter(is_active=True, stock_quantity=0).count(),
-        }
+        return Response({'stats': self.visible_stats(get_product_stats(), request.user)})
+
+    @staticmethod
+    def visible_stats(product_stats, user):
+        """The part of the statistics snapshot ``user`` may see"""
+        basic_stats = {key: product_stats[key] for key in BASIC_PRODUCT_STATS}
         
-        if request.user.is_admin or request.user.is_moderator:
+        if user.is_admin or user.is_moderator:
             # Additional stats for admins and moderators
             admin_stats = {
-                'total_products_including_inactive': products.count(),
-                'inactive_products': products.filter(is_active=False).count(),
-                'categories_count': Category.objects.filter(is_active=True).count(),
-                'average_price': products.filter(is_active=True).aggregate(
-                    avg_price=Avg('price')
-                )['avg_price'] or 0,
+                'total_products_including_inactive': product_stats['total_products_including_inactive'],
+                'inactive_products': product_stats['inactive_products'],
+                'categories_count': product_stats['categories_count'],
+                'average_price': product_stats['average_price'] or 0,
             }
             basic_stats.update(admin_stats)
         
-        return Response({'stats': basic_stats})
+        return basic_stats
 
 
 class CategoryToggleStatusView(generics.GenericAPIView):
@@ -168,6 +246,7 @@ class CategoryToggleStatusView(generics.GenericAPIView):
     """
     permission_classes = [IsAdminOrModerator]
     
+    @transaction.atomic
     def post(self, request, pk):
         try:
             category = Category.objects.get(pk=pk)
@@ -191,6 +270,7 @@ class ProductToggleStatusView(generics.GenericAPIView):
     """
     permission_classes = [IsAdminOrModeratorForProducts]
     
+    @transaction.atomic
     def post(self, request, pk):
         try:
             product = Product.objects.get(pk=pk)
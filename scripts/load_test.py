@@ -0,0 +1,127 @@
+"""
+Compare the throughput of the sync (WSGI) and async (ASGI) endpoints.
+
+Start both servers against the same database, for example:
+
+    gunicorn user_auth_project.wsgi -w 4 -b 127.0.0.1:8000
+    uvicorn user_auth_project.asgi:application --workers 4 --port 8001
+
+then run:
+
+    python scripts/load_test.py --email admin@example.com --password ... \\
+        --target wsgi=http://127.0.0.1:8000/api/products/ \\
+        --target asgi=http://127.0.0.1:8001/api/async/products/
+
+Each target is loaded with the same number of concurrent keep-alive
+clients for the same duration; requests/sec and latency percentiles are
+printed per target. Use ``--login`` to load the login endpoints instead
+(POST with the credentials, no token). Only the standard library is used.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def request(connection, method, path, body=None, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def connect(url):
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    return connection_class(parts.netloc, timeout=30), path
+
+
+def obtain_token(url, email, password):
+    parts = urlsplit(url)
+    connection, _ = connect(url)
+    login_path = '/api/async/auth/login/' if '/api/async/' in parts.path else '/api/auth/login/'
+    status, body = request(connection, 'POST', login_path, json.dumps({'email': email, 'password': password}))
+    if status != 200:
+        raise SystemExit(f'Login to {parts.netloc} failed ({status}): {body[:200]!r}')
+    return json.loads(body)['access']
+
+
+def worker(url, method, body, token, deadline, latencies, errors, lock):
+    connection, path = connect(url)
+    local_latencies, local_errors = [], 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            status, _ = request(connection, method, path, body, token)
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection, path = connect(url)
+            local_errors += 1
+            continue
+        if status >= 400:
+            local_errors += 1
+        else:
+            local_latencies.append(time.perf_counter() - start)
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def run(name, url, args):
+    if args.login:
+        method, token = 'POST', None
+        body = json.dumps({'email': args.email, 'password': args.password})
+    else:
+        method, body = 'GET', None
+        token = obtain_token(url, args.email, args.password)
+
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(url, method, body, token, deadline, latencies, errors, lock))
+        for _ in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if not latencies:
+        print(f'{name}: no successful requests ({sum(errors)} errors)')
+        return
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    print(
+        f'{name}: {len(latencies) / elapsed:,.1f} req/s | '
+        f'p50 {statistics.median(latencies) * 1000:.1f} ms | '
+        f'p95 {percentile(0.95):.1f} ms | p99 {percentile(0.99):.1f} ms | '
+        f'{sum(errors)} errors'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                        help='Endpoint to load, e.g. asgi=http://127.0.0.1:8001/api/async/products/')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--login', action='store_true', help='POST the credentials to the target (login endpoints)')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per target')
+    args = parser.parse_args()
+
+    for target in args.target:
+        name, _, url = target.partition('=')
+        run(name, url or name, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'authentication.metrics.RequestMetricsMiddleware',
+    'authentication.query_patterns.QueryPatternMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -106,6 +109,38 @@ else:
         }
     }
 
+# Cache configuration
+# Defaults to a per-process memory cache; point CACHE_BACKEND/CACHE_LOCATION
+# at a shared cache (e.g. Redis or Memcached) in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Password hashing (see authentication.hashing). The preferred hasher comes
+# first; the others only verify existing hashes, which are upgraded on login.
+# 'argon2' needs the argon2-cffi package.
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'authentication.hashing.PBKDF2PasswordHasher',
+    'scrypt': 'authentication.hashing.ScryptPasswordHasher',
+    'argon2': 'authentication.hashing.Argon2PasswordHasher',
+}
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+PASSWORD_HASHING = {
+    'MAX_WORKERS': int(os.getenv('PASSWORD_HASHING_MAX_WORKERS', '0')) or None,
+    'PBKDF2_ITERATIONS': int(os.getenv('PBKDF2_ITERATIONS', '0')) or None,
+    'SCRYPT_WORK_FACTOR': int(os.getenv('SCRYPT_WORK_FACTOR', '0')) or None,
+    'ARGON2_TIME_COST': int(os.getenv('ARGON2_TIME_COST', '0')) or None,
+    'ARGON2_MEMORY_COST': int(os.getenv('ARGON2_MEMORY_COST', '0')) or None,
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -150,25 +185,108 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Sliding-window limits for the credential endpoints, as
+    # '<scope>.<ip|identity|global>' (see authentication.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'login.ip': os.getenv('THROTTLE_LOGIN_IP', '20/min'),
+        'login.identity': os.getenv('THROTTLE_LOGIN_IDENTITY', '5/min'),
+        'login.global': os.getenv('THROTTLE_LOGIN_GLOBAL', '1000/min'),
+        'register.ip': os.getenv('THROTTLE_REGISTER_IP', '10/hour'),
+        'register.global': os.getenv('THROTTLE_REGISTER_GLOBAL', '500/min'),
+        'change_password.ip': os.getenv('THROTTLE_CHANGE_PASSWORD_IP', '20/hour'),
+        'change_password.identity': os.getenv('THROTTLE_CHANGE_PASSWORD_IDENTITY', '5/hour'),
+    },
+}
+
+# Where the throttle windows are counted: the shared cache, or
+# authentication.throttling.LocalWindowStore for a single process
+THROTTLE_STORE = {
+    'CLASS': os.getenv('THROTTLE_STORE_CLASS', 'authentication.throttling.CacheWindowStore'),
+    'CACHE_ALIAS': os.getenv('THROTTLE_CACHE_ALIAS', 'default'),
 }
 
 # JWT Configuration
 from datetime import timedelta
 
 SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(hours=10),
-    'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
-    'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': True,
+    # Short-lived access tokens: revocation and token versions cover the gap
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', '15'))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', '7'))),
+    'ROTATE_REFRESH_TOKENS': os.getenv('JWT_ROTATE_REFRESH_TOKENS', 'True').lower() == 'true',
+    'BLACKLIST_AFTER_ROTATION': os.getenv('JWT_BLACKLIST_AFTER_ROTATION', 'True').lower() == 'true',
+    'AUTH_TOKEN_CLASSES': ('authentication.tokens.AccessToken',),
+}
+
+# Asymmetric signing keys (see authentication.signing); HS256 with
+# SECRET_KEY when no JWKS file is given
+JWT_SIGNING = {
+    'JWKS_FILE': os.getenv('JWT_JWKS_FILE') or None,
+    'ACTIVE_KID': os.getenv('JWT_ACTIVE_KID') or None,
+}
+
+# Revoked token ids (see authentication.revocation); purge expired rows
+# with `manage.py purge_revoked_tokens`
+TOKEN_REVOCATION = {
+    'CAPACITY': int(os.getenv('TOKEN_REVOCATION_CAPACITY', '100000')),
+    'REFRESH_INTERVAL': int(os.getenv('TOKEN_REVOCATION_REFRESH_INTERVAL', '5')),
+    'REFRESH_OVERLAP': int(os.getenv('TOKEN_REVOCATION_REFRESH_OVERLAP', '60')),
+    'CACHE_ALIAS': 'default',
 }
 
+# Resolved user cache (see authentication.cache.UserCache)
+USER_CACHE = {
+    'MAX_ENTRIES': int(os.getenv('USER_CACHE_MAX_ENTRIES', '10000')),
+    'TTL': int(os.getenv('USER_CACHE_TTL', '300')),
+    'VERSION_TTL': int(os.getenv('USER_CACHE_VERSION_TTL', '300')),
+    'CACHE_ALIAS': 'default',
+}
+
+# Cached snapshots for the statistics endpoints
+STATS_CACHE = {
+    'TTL': int(os.getenv('STATS_CACHE_TTL', '30')),
+    'CACHE_ALIAS': 'default',
+}
+
+# Versioned cache of catalogue read responses
+# (see authentication.response_cache.ResponseCacheMixin)
+RESPONSE_CACHE = {
+    'TTL': int(os.getenv('RESPONSE_CACHE_TTL', '300')),
+    'CACHE_ALIAS': os.getenv('RESPONSE_CACHE_ALIAS', 'default'),
+}
+
+# Product search backend (dotted path); picked from the database vendor when unset
+PRODUCT_SEARCH_BACKEND = os.getenv('PRODUCT_SEARCH_BACKEND') or None
+
+# Rows written per transaction by the bulk product endpoint
+PRODUCT_BULK_CHUNK_SIZE = int(os.getenv('PRODUCT_BULK_CHUNK_SIZE', 500))
+
+# Per-route request metrics (see authentication.metrics), served at
+# /api/auth/metrics/
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', 'True').lower() == 'true',
+}
+
+# N+1 query detection (see authentication.query_patterns): log a sampled
+# share of requests in production, raise on every request under test
+QUERY_PATTERNS = {
+    'THRESHOLD': int(os.getenv('QUERY_PATTERNS_THRESHOLD', '5')),
+    'SAMPLE_RATE': float(os.getenv('QUERY_PATTERNS_SAMPLE_RATE', '0.01')),
+    'RAISE': (
+        os.getenv('QUERY_PATTERNS_RAISE', 'False').lower() == 'true'
+        or sys.argv[1:2] == ['test']
+    ),
+}
+
+# Rows fetched per round trip when streaming exports
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
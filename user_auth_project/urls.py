@@ -1,10 +1,17 @@
 from django.contrib import admin
 from django.urls import path, include
+from authentication.views import JWKSView
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('.well-known/jwks.json', JWKSView.as_view(), name='jwks'),
     path('api/auth/', include('authentication.urls')),
     path('api/users/', include('users.urls')),
     path('api/', include('products.urls')),
+
+    # Async versions of the hot endpoints, for ASGI deployments
+    path('api/async/auth/', include('authentication.async_urls')),
+    path('api/async/users/', include('users.async_urls')),
+    path('api/async/', include('products.async_urls')),
 ]
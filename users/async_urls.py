@@ -0,0 +1,8 @@
+from django.urls import path
+from .async_views import AsyncUserStatsView
+
+app_name = 'users_async'
+
+urlpatterns = [
+    path('stats/', AsyncUserStatsView.as_view(), name='user_stats'),
+]
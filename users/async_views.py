@@ -0,0 +1,16 @@
+"""
+Async views for the user endpoints (see authentication.async_views)
+"""
+from authentication.async_views import AsyncAPIView
+from authentication.permissions import IsAdminRole
+from .stats import aget_user_stats
+
+
+class AsyncUserStatsView(AsyncAPIView):
+    """
+    Async ``/api/users/stats/`` (Admin only)
+    """
+    permission_classes = [IsAdminRole]
+
+    async def get(self, request):
+        return self.render(await aget_user_stats())
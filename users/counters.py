@@ -0,0 +1,42 @@
+"""
+User counters maintained on every user write
+"""
+from django.db.models import Count, Q
+
+from authentication.counters import register_source
+from authentication.models import User
+
+PREFIX = 'users:'
+USERS_TOTAL = 'users:total'
+USERS_ACTIVE = 'users:active'
+
+# Fields whose changes move the counters
+USER_COUNTED_FIELDS = ('is_active', 'role')
+
+
+def role_key(role):
+    """Counter of users with the given role"""
+    return f'users:role:{role}'
+
+
+def user_contribution(state):
+    """Counters a user row with the given field values adds to"""
+    return {
+        USERS_TOTAL: 1,
+        USERS_ACTIVE: int(bool(state['is_active'])),
+        role_key(state['role']): 1,
+    }
+
+
+def compute_user_counters():
+    """Compute every user counter from the table"""
+    counters = User.objects.aggregate(**{
+        USERS_TOTAL: Count('id'),
+        USERS_ACTIVE: Count('id', filter=Q(is_active=True)),
+    })
+    for role, count in User.objects.order_by().values_list('role').annotate(count=Count('id')):
+        counters[role_key(role)] = count
+    return counters
+
+
+register_source(PREFIX, compute_user_counters)
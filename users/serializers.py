@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from authentication.compiled import CompiledSerializer
 from authentication.models import User
 from authentication.utils import validate_unique_email, validate_unique_username, validate_password_confirmation
 from django.contrib.auth.password_validation import validate_password
@@ -19,6 +20,18 @@ class UserListSerializer(serializers.ModelSerializer):
         ]
 
 
+compiled_user_list = CompiledSerializer(
+    UserListSerializer,
+    computed={
+        'full_name': (
+            ['first_name', 'last_name'],
+            lambda row: f"{row['first_name']} {row['last_name']}".strip(),
+        ),
+        'is_admin': (['role'], lambda row: row['role'] == 'admin'),
+    },
+)
+
+
 class UserDetailSerializer(serializers.ModelSerializer):
     """
     Serializer for detailed user information
@@ -75,11 +88,8 @@ class UserCreateSerializer(serializers.ModelSerializer):
         """
         Create user with hashed password
         """
-        password = validated_data.pop('password')
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
-        return user
+        # create_user hashes the password once and inserts the row once
+        return User.objects.create_user(**validated_data)
 
 
 class UserUpdateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentication.counters import apply_deleted_state, apply_saved_state
+from authentication.models import User
+from authentication.stored_state import track_fields
+from .counters import USER_COUNTED_FIELDS, user_contribution
+from .stats import invalidate_user_stats
+
+track_fields(User, USER_COUNTED_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def update_counters_on_save(sender, instance, update_fields=None, **kwargs):
+    """Move the user counters by the difference the save made"""
+    apply_saved_state(instance, USER_COUNTED_FIELDS, user_contribution, update_fields)
+
+
+@receiver(post_delete, sender=User)
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Remove a deleted user's contribution from the user counters"""
+    apply_deleted_state(instance, USER_COUNTED_FIELDS, user_contribution)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_stats_on_user_change(sender, instance, **kwargs):
+    """Recompute user statistics after any user write"""
+    invalidate_user_stats()
@@ -0,0 +1,48 @@
+"""
+Aggregate statistics for users
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from authentication.cache import acached_snapshot, cached_snapshot, invalidate_snapshots
+from authentication.counters import read_counters
+from authentication.models import User
+from .counters import USERS_ACTIVE, USERS_TOTAL, role_key
+
+USER_STATS_KEY = 'stats:users'
+
+
+def compute_user_stats():
+    """
+    Read user statistics from the maintained counters; only the recent
+    registrations window is counted, using the created_at index
+    """
+    counters = read_counters([
+        USERS_TOTAL, USERS_ACTIVE, role_key('admin'), role_key('moderator'), role_key('user'),
+    ])
+    seven_days_ago = timezone.now() - timedelta(days=7)
+    return {
+        'total_users': int(counters[USERS_TOTAL]),
+        'active_users': int(counters[USERS_ACTIVE]),
+        'inactive_users': int(counters[USERS_TOTAL] - counters[USERS_ACTIVE]),
+        'admin_users': int(counters[role_key('admin')]),
+        'moderator_users': int(counters[role_key('moderator')]),
+        'regular_users': int(counters[role_key('user')]),
+        'recent_registrations': User.objects.filter(created_at__gte=seven_days_ago).count(),
+    }
+
+
+def get_user_stats():
+    """Cached user statistics"""
+    return cached_snapshot(USER_STATS_KEY, compute_user_stats)
+
+
+async def aget_user_stats():
+    """Cached user statistics, for async views"""
+    return await acached_snapshot(USER_STATS_KEY, compute_user_stats)
+
+
+def invalidate_user_stats():
+    """Drop the cached user statistics"""
+    invalidate_snapshots(USER_STATS_KEY)
@@ -0,0 +1,173 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from authentication.counters import verify_counters
+from authentication.models import User
+from authentication.tests import APITestCase
+from .serializers import UserListSerializer, compiled_user_list
+
+
+class CompiledUserListTests(APITestCase):
+    """The compiled user list renders the same JSON as the serializer"""
+
+    def test_parity_with_serializer(self):
+        for role in ('admin', 'moderator', 'user', 'guest'):
+            self.create_user(f'{role}@example.com', role=role)
+        self.create_user('inactive@example.com', is_active=False)
+        queryset = User.objects.order_by('-created_at', '-id')
+        expected = UserListSerializer(list(queryset), many=True).data
+        actual = compiled_user_list.serialize(compiled_user_list.values(queryset))
+        self.assertEqual(len(actual), 5)
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+
+class UserCursorPaginationTests(APITestCase):
+    """Keyset pages of the newest-first user listing"""
+
+    def test_pages_cover_the_listing(self):
+        admin = self.create_user('admin@example.com', role='admin')
+        for index in range(44):
+            self.create_user(f'user{index}@example.com')
+        # Identical timestamps must neither repeat nor skip rows
+        User.objects.filter(pk__lte=admin.pk + 10).update(created_at=admin.created_at)
+        self.login('admin@example.com')
+
+        seen, url = [], '/api/users/?pagination=cursor'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        expected = list(User.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+
+class UserStatsTests(APITestCase):
+    """The user statistics snapshot is cached until a user write"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_user('admin@example.com', role='admin')
+        self.login('admin@example.com')
+
+    def stats(self):
+        response = self.client.get('/api/users/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_snapshot_is_cached(self):
+        self.stats()
+        with self.assertNumQueries(0):
+            self.stats()
+
+    def test_user_writes_invalidate_the_snapshot(self):
+        self.assertEqual(self.stats()['total_users'], 1)
+        user = self.create_user('user@example.com')
+        stats = self.stats()
+        self.assertEqual((stats['total_users'], stats['regular_users'], stats['recent_registrations']), (2, 1, 2))
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.stats()['inactive_users'], 1)
+
+
+class UserCounterTests(APITestCase):
+    """User writes keep the user counters equal to the table"""
+
+    def test_writes(self):
+        user = self.create_user('user@example.com')
+        self.assertEqual(verify_counters(), {})
+        user.role = 'moderator'
+        user.is_active = False
+        user.save()
+        self.assertEqual(verify_counters(), {})
+        user.delete()
+        self.assertEqual(verify_counters(), {})
+
+
+class UserExportTests(APITestCase):
+    """The user directory export is admin only"""
+
+    def test_admin_exports_every_user(self):
+        self.create_user('admin@example.com', role='admin')
+        self.create_user('user@example.com')
+        self.login('admin@example.com')
+        response = self.client.get('/api/users/export/?format=ndjson')
+        self.assertEqual(response.status_code, 200)
+        emails = [json.loads(line)['email'] for line in b''.join(response.streaming_content).splitlines()]
+        self.assertCountEqual(emails, ['admin@example.com', 'user@example.com'])
+
+    def test_other_roles_are_refused(self):
+        self.create_user('moderator@example.com', role='moderator')
+        self.login('moderator@example.com')
+        self.assertEqual(self.client.get('/api/users/export/').status_code, 403)
+
+
+class SessionRevocationTests(APITestCase):
+    """Admin changes to a user's status or role sign them out"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user@example.com')
+        self.create_user('admin@example.com', role='admin')
+        self.user_client = APIClient()
+        self.login('user@example.com', self.user_client)
+        self.login('admin@example.com')
+
+    def assertSignedOut(self):
+        self.assertEqual(self.user_client.get('/api/auth/user-info/').status_code, 401)
+
+    def test_deactivation_signs_out(self):
+        response = self.client.post(f'/api/users/{self.user.pk}/toggle-status/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertSignedOut()
+
+    def test_reactivated_user_signs_in_again(self):
+        self.client.post(f'/api/users/{self.user.pk}/toggle-status/')
+        self.client.post(f'/api/users/{self.user.pk}/toggle-status/')
+        self.assertSignedOut()
+        self.login('user@example.com', self.user_client)
+        self.assertEqual(self.user_client.get('/api/auth/user-info/').status_code, 200)
+
+    def test_role_change_signs_out(self):
+        response = self.client.patch(f'/api/users/{self.user.pk}/', {'role': 'moderator'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertSignedOut()
+        self.login('user@example.com', self.user_client)
+        self.assertEqual(self.user_client.get('/api/auth/user-info/').data['role'], 'moderator')
+
+
+class UserListScopeTests(APITestCase):
+    """The user list is filtered to what the caller may see, not refused per object"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user@example.com')
+        self.moderator = self.create_user('moderator@example.com', role='moderator')
+        self.create_user('admin@example.com', role='admin')
+
+    def listed(self, email, query=''):
+        self.login(email)
+        response = self.client.get(f'/api/users/{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_non_admins_list_only_themselves(self):
+        for user in (self.user, self.moderator):
+            with self.subTest(role=user.role):
+                data = self.listed(user.email)
+                self.assertEqual(data['count'], 1)
+                self.assertEqual([row['id'] for row in data['results']], [user.pk])
+
+    def test_cursor_pages_are_scoped(self):
+        data = self.listed('user@example.com', '?pagination=cursor')
+        self.assertEqual([row['id'] for row in data['results']], [self.user.pk])
+
+    def test_admins_list_everyone(self):
+        self.assertEqual(self.listed('admin@example.com')['count'], 3)
+
+    def test_other_users_stay_forbidden(self):
+        self.login('user@example.com')
+        self.assertEqual(self.client.get(f'/api/users/{self.moderator.pk}/').status_code, 403)
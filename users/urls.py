@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     UserListCreateView,
     UserDetailView,
+    UserExportView,
     UserStatsView,
     UserToggleStatusView,
 )
@@ -11,6 +12,7 @@ app_name = 'users'
 urlpatterns = [
     path('', UserListCreateView.as_view(), name='user_list_create'),
     path('<int:pk>/', UserDetailView.as_view(), name='user_detail'),
+    path('export/', UserExportView.as_view(), name='user_export'),
     path('stats/', UserStatsView.as_view(), name='user_stats'),
     path('<int:user_id>/toggle-status/', UserToggleStatusView.as_view(), name='toggle_user_status'),
 ]
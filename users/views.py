@@ -1,25 +1,33 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
-from django.utils import timezone
-from datetime import timedelta
+from django.db import transaction
+from authentication.compiled import CompiledListMixin
+from authentication.export import ExportView
 from authentication.models import User
-from authentication.permissions import IsAdminRole, IsOwnerOrAdmin
+from authentication.pagination import FlexiblePagination
+from authentication.permissions import IsAdminRole, IsOwnerOrAdmin, PermissionScopeFilter
+from .stats import get_user_stats
 from .serializers import (
     UserListSerializer,
     UserDetailSerializer,
     UserCreateSerializer,
-    UserUpdateSerializer
+    UserUpdateSerializer,
+    compiled_user_list
 )
 
 
-class UserListCreateView(generics.ListCreateAPIView):
+class UserListCreateView(CompiledListMixin, generics.ListCreateAPIView):
     """
     List all users or create a new user
-    GET: Available to all authenticated users
+    GET: Admins see every user, other users only themselves
     POST: Available only to Admin users
     """
     queryset = User.objects.all().order_by('-created_at')
     permission_classes = [IsOwnerOrAdmin]
+    # Narrowed in SQL by IsOwnerOrAdmin.scope_queryset
+    filter_backends = [PermissionScopeFilter]
+    pagination_class = FlexiblePagination
+    compiled_serializer = compiled_user_list
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -31,6 +39,7 @@ class UserListCreateView(generics.ListCreateAPIView):
             return [IsAdminRole()]
         return [IsOwnerOrAdmin()]
     
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -39,6 +48,19 @@ class UserListCreateView(generics.ListCreateAPIView):
         return Response(UserDetailSerializer(user).data, status=status.HTTP_201_CREATED)
 
 
+class UserExportView(ExportView):
+    """
+    Stream the user directory as NDJSON or CSV (Admin only)
+    """
+    queryset = User.objects.all().order_by('-created_at', '-id')
+    permission_classes = [IsAdminRole]
+    export_fields = (
+        'id', 'email', 'username', 'first_name', 'last_name', 'role',
+        'is_active', 'created_at', 'updated_at', 'last_login'
+    )
+    export_filename = 'users'
+
+
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a user
@@ -57,6 +79,7 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [IsAdminRole()]
         return [IsOwnerOrAdmin()]
     
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         user = self.get_object()
         
@@ -80,6 +103,8 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
                     'error': 'You cannot change your own role'
                 }, status=status.HTTP_403_FORBIDDEN)
         
+        # A role or status change bumps the token version (see
+        # authentication.signals): outstanding tokens carry the old claims
         self.perform_update(serializer)
         return Response(UserDetailSerializer(instance).data, status=status.HTTP_200_OK)
 
@@ -91,25 +116,7 @@ class UserStatsView(generics.GenericAPIView):
     permission_classes = [IsAdminRole]
     
     def get(self, request):
-        total_users = User.objects.count()
-        active_users = User.objects.filter(is_active=True).count()
-        inactive_users = User.objects.filter(is_active=False).count()
-        admin_users = User.objects.filter(role='admin').count()
-        moderator_users = User.objects.filter(role='moderator').count()
-        regular_users = User.objects.filter(role='user').count()
-        
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        recent_registrations = User.objects.filter(created_at__gte=seven_days_ago).count()
-        
-        return Response({
-            'total_users': total_users,
-            'active_users': active_users,
-            'inactive_users': inactive_users,
-            'admin_users': admin_users,
-            'moderator_users': moderator_users,
-            'regular_users': regular_users,
-            'recent_registrations': recent_registrations,
-        }, status=status.HTTP_200_OK)
+        return Response(get_user_stats(), status=status.HTTP_200_OK)
 
 
 class UserToggleStatusView(generics.GenericAPIView):
@@ -120,6 +127,7 @@ class UserToggleStatusView(generics.GenericAPIView):
     queryset = User.objects.all()
     lookup_url_kwarg = 'user_id'
     
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         user = self.get_object()
         